@@ -0,0 +1,74 @@
+"""
+Memory benchmark for the world and character objects.
+Prints how many bytes each object takes up, including its own attribute storage, once as the slotted class and
+once with the same attributes kept in an instance __dict__ like before the classes had __slots__, run from the
+repository root:
+    python bench_memory.py
+"""
+
+import sys
+import tracemalloc
+from array import array
+
+import game
+
+COUNT = 20000
+
+
+def bytes_per_object(factory, count=COUNT):
+    """create count objects with the factory and return the average bytes allocated for each one"""
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    objects = [factory(i) for i in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - start - sys.getsizeof(objects)
+    tracemalloc.stop()
+    return used / count
+
+
+def slot_names(cls):
+    """every slot a class and its bases define"""
+    return [name for klass in reversed(cls.__mro__) for name in getattr(klass, "__slots__", ())]
+
+
+def unslotted(factory):
+    """wrap a factory so it returns a plain object holding the same attributes in its __dict__"""
+    classes = {}
+
+    def make(i):
+        obj = factory(i)
+        cls = type(obj)
+        if cls not in classes:
+            names = [name for name in slot_names(cls) if name not in ("__dict__", "__weakref__")]
+
+            def __init__(self, source):
+                for name in names:
+                    if hasattr(source, name):
+                        setattr(self, name, getattr(source, name))
+
+            classes[cls] = type(cls.__name__, (), {"__init__": __init__})
+        return classes[cls](obj)
+    return make
+
+
+def main():
+    """ run the benchmark """
+    world = game.WorldRegistry()
+    factories = {
+        "Item": lambda i: game.Item(i, "Item", "Description", 5),
+        "Weapon": lambda i: game.Weapon(i, "Sword", "Description", 5, 10),
+        "Consumable": lambda i: game.Consumable(i, "Potion", "Description", 5, 0, 0, 15),
+        "Spells": lambda i: game.Spells(i, "Spell", "Description", 3, 3),
+        "Buff": lambda i: game.Buff(i, "Buff", "Description", 3, 5, 0, 2, 3),
+        "Location": lambda i: game.Location(str(i), "Room", "Description", array("i", [i, i + 1]), "",
+                                              array("i"), array("i"), 0, i, world),
+        "Character": lambda i: game.Character("Name", 1, 0, 20, 5, 5, 0, [], 20, []),
+        "Player": lambda i: game.Player("Name", 1, 0, 20, 5, 5, "A", 0, [], None, None, [], 1, 20),
+        "Enemy": lambda i: game.Enemy(i, "Goblin", 1, 5, 20, 5, 5, 3, None, 20, [], False),
+    }
+    print(f"{'class':<12}{'before':>10}{'after':>10}")
+    for name, factory in factories.items():
+        print(f"{name:<12}{bytes_per_object(unslotted(factory)):>10.0f}{bytes_per_object(factory):>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2927 @@
+"""
+The rules, world and session of the RPG text-adventure, with no GUI so they can run headless.
+marcus.py builds the Tkinter game on top of this module.
+"""
+
+import gc
+import io
+import os
+import struct
+import pickle
+import hashlib
+from itertools import chain, product, repeat
+from collections import namedtuple, deque
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import random
+import math
+import json
+import heapq
+
+
+def load_numpy():
+    """import NumPy the first time it is needed, only the location queries and batch simulations use it"""
+    import numpy
+    return numpy
+
+
+class EffectScheduler:
+    """Per character clock for spell cooldowns, buffs and effects that last a number of turns
+
+    Timed actions are kept in a heap by the turn they are due, so advancing a turn only touches the effects
+    that run out on it. Cooldowns are stored as the turn the spell is ready again.
+    """
+    __slots__ = ("turn", "_queue", "_count", "_ready")
+
+    def __init__(self, turn=0):
+        self.turn = turn
+        self._queue = []
+        self._count = 0  # keeps actions due on the same turn in the order they were scheduled
+        self._ready = {}
+
+    def schedule(self, turns, action):
+        """call action once the clock has advanced this many turns"""
+        heapq.heappush(self._queue, (self.turn + turns, self._count, action))
+        self._count += 1
+
+    def advance(self):
+        """add a turn and run every action due on it"""
+        self.turn += 1
+        while self._queue and self._queue[0][0] <= self.turn:
+            _, _, action = heapq.heappop(self._queue)
+            action()
+
+    def cooldown(self, spell):
+        """turns left until the spell can be cast again, the starting cooldown counts from turn 0"""
+        return max(self._ready.get(spell.id, spell.cooldown) - self.turn, 0)
+
+    def start_cooldown(self, spell):
+        self._ready[spell.id] = self.turn + spell.max_cd
+
+
+StatModifier = namedtuple("StatModifier", "attack defence max_hp", defaults=(0, 0, 0))
+NO_MODIFIER = StatModifier()
+
+# the layers of modifiers a character's stats are built from on top of the base stats
+STAT_LAYERS = ("level", "equipment", "buff", "consumable")
+
+
+class Character:
+    """Character class that represents the player and enemy stats
+
+    Attack, defence and max hp are the base stats plus every StatModifier in the layers, each keyed by
+    where it came from such as the equipped weapon or the active buff. The sums are cached in _attack,
+    _defence and _max_hp and only added up again on the first read after a modifier changed, so taking a
+    modifier away always returns the stats to what they were.
+    """
+    __slots__ = ("_name", "_level", "_xp", "_health", "_max_hp", "_attack", "_defence", "_coins", "_inv", "_spells",
+                 "_block", "_buff_ends", "_base", "_modifiers", "_dirty", "_turn", "_timers", "_effects",
+                 "speed")
+
+    def __init__(self, name, level, xp, health, attack, defence, coins, inv, max_hp, spells):
+        self._name = name
+        self._level = int(level)
+        self._xp = int(xp)
+        self._health = int(health)
+        self._attack, self._defence, self._max_hp = int(attack), int(defence), int(max_hp)
+        # most characters never get a modifier, so until the first one the cached stats are the base stats and
+        # _base and _modifiers stay None
+        self._base = None
+        self._modifiers = None
+        self._dirty = False
+        self._coins = int(coins)
+        self._inv = inv
+        self._spells = spells
+        self._block = False
+        self._buff_ends = None  # turn the active buff runs out
+
+        # most enemies never cast or get an effect, so the scheduler and the effects list are made on first use
+        # until then _turn counts the turns that went by
+        self._turn = 0
+        self._timers = None
+        self._effects = None
+        self.speed = BASE_SPEED
+
+    @property
+    def block(self):
+        return self._block
+
+    @property
+    def attk_buff(self):
+        return self.modifier("buff", "spell").attack
+
+    @property
+    def def_buff(self):
+        return self.modifier("buff", "spell").defence
+
+    @property
+    def attack(self):
+        if self._dirty:
+            self.derive_stats()
+        return self._attack
+
+    @attack.setter
+    def attack(self, new_attack):
+        self.set_stat("attack", new_attack)
+
+    @property
+    def defence(self):
+        if self._dirty:
+            self.derive_stats()
+        return self._defence
+
+    @defence.setter
+    def defence(self, new_defence):
+        self.set_stat("defence", new_defence)
+
+    @property
+    def max_hp(self):
+        if self._dirty:
+            self.derive_stats()
+        return self._max_hp
+
+    @max_hp.setter
+    def max_hp(self, new_max_hp):
+        self.set_stat("max_hp", new_max_hp)
+
+    def modifier(self, layer, source):
+        """the stats a source adds in a layer"""
+        if self._modifiers is None:
+            return NO_MODIFIER
+        return self._modifiers.get((layer, source), NO_MODIFIER)
+
+    def set_modifier(self, layer, source, attack=0, defence=0, max_hp=0):
+        """add or replace the stats a source adds in a layer"""
+        if layer not in STAT_LAYERS:
+            raise KeyError(layer)
+        if self._modifiers is None:
+            self._base = [self._attack, self._defence, self._max_hp]
+            self._modifiers = {}
+        self._modifiers[layer, source] = StatModifier(attack, defence, max_hp)
+        self._dirty = True
+
+    def add_modifier(self, layer, source, attack=0, defence=0, max_hp=0):
+        """stack more stats onto what a source already adds in a layer"""
+        old = self.modifier(layer, source)
+        self.set_modifier(layer, source, old.attack + attack, old.defence + defence, old.max_hp + max_hp)
+
+    def remove_modifier(self, layer, source):
+        """take away the stats a source adds in a layer, returns them"""
+        if self._modifiers is None or (layer, source) not in self._modifiers:
+            return NO_MODIFIER
+        removed = self._modifiers.pop((layer, source))
+        self._dirty = True
+        if not self._modifiers:
+            # the last one went, go back to keeping the base stats in the cache
+            self.derive_stats()
+            self._base = None
+            self._modifiers = None
+        return removed
+
+    def derive_stats(self):
+        """add the modifiers onto the base stats and cache the totals"""
+        self._dirty = False
+        if self._base is None:
+            return
+        attack, defence, max_hp = self._base
+        for modifier in self._modifiers.values():
+            attack += modifier.attack
+            defence += modifier.defence
+            max_hp += modifier.max_hp
+        self._attack, self._defence, self._max_hp = attack, defence, max_hp
+
+    def set_stat(self, stat, value):
+        """move a base stat so that with its modifiers it comes to value"""
+        if self._base is None:
+            setattr(self, "_" + stat, value)
+            return
+        self._base[StatModifier._fields.index(stat)] += value - getattr(self, stat)
+        self._dirty = True
+
+    @property
+    def timers(self):
+        """the character's EffectScheduler, made on first use"""
+        if self._timers is None:
+            self._timers = EffectScheduler(self._turn)
+        return self._timers
+
+    @property
+    def effects(self):
+        """the active timed effects such as poison or regen"""
+        return self._effects or ()
+
+    def advance_turn(self):
+        """count a turn on the character's timers, without making a scheduler when there is nothing on it"""
+        if self._timers is None:
+            self._turn += 1
+        else:
+            self._timers.advance()
+
+    @property
+    def buff_duration(self):
+        if self._buff_ends is None:
+            return 0
+        return max(self._buff_ends - self.timers.turn, 0)
+
+    def cooldown(self, spell):
+        """turns left until this character can cast the spell again"""
+        if self._timers is None:
+            return max(spell.cooldown - self._turn, 0)
+        return self._timers.cooldown(spell)
+
+    def is_alive(self):
+        """checks if character is still alive"""
+        return self._health > 0
+
+    def take_damage(self, raw_damage):
+        """takes damage calculating raw_damage - defence"""
+        defence = self.defence
+        if self._block:
+            defence *= 2
+        realised_damage = raw_damage - defence
+        math.ceil(realised_damage)
+        if realised_damage < 0:
+            realised_damage = 0
+        self._health -= realised_damage
+        return realised_damage
+
+    def action_block(self):
+        if not self._block:
+            self._block = True
+        else:
+            self._block = False
+
+    def get_coins(self, coins):
+        """add coins"""
+        self._coins += coins
+
+    def get_xp(self, xp):
+        """add xp"""
+        self._xp += xp
+        if self._xp >= self.xp_required():
+            self.level_up()
+            return True
+
+    def level_up(self):
+        """level up character if xp meets threshold"""
+        self._xp = self._xp - self.xp_required()
+        self._level += 1
+        self.add_modifier("level", "level", attack=2, defence=1, max_hp=20 if self._level % 5 == 0 else 0)
+
+    def xp_required(self):
+        """calculates the amount of xp required for level up"""
+        if self._level == 1:
+            xp_required = 1
+        else:
+            xp_required = 30 + (self._level * 10)  # increase threshold depending on current level
+        return int(xp_required)
+
+    def link_spells(self, registry=None):
+        """link spell id to spell object"""
+        registry = registry or WORLD
+        self._spells = registry.lookup("spells", self._spells)
+
+    def use_spell(self, spell):
+        """uses the spell and updates character stats depending on the spell type"""
+        if isinstance(spell, Buff):
+            if self.buff_duration == 0:
+                # set buff durations and buff amount
+                if spell.attack > 0 or spell.defence > 0:
+                    self.set_modifier("buff", "spell", attack=max(spell.attack, 0), defence=max(spell.defence, 0))
+                    self._buff_ends = self.timers.turn + spell.duration
+                    self.timers.schedule(spell.duration, self.end_buff)
+            else:
+                return False
+        # if heal add heal amount to current health
+        elif isinstance(spell, Heal):
+            if self._health != self.max_hp:
+                old_health = self._health
+                self._health += spell.health
+                if self._health > self.max_hp:
+                    self._health = self.max_hp
+                print(f"Healed {self._health - old_health} health!")
+            else:
+                print("Already max health!")
+                return False
+        return True
+
+    def revert_spell(self):
+        """revert spell effects"""
+        self.remove_modifier("buff", "spell")
+
+    def end_buff(self):
+        """timer for the active buff running out"""
+        if self._buff_ends is not None and self._buff_ends <= self.timers.turn:
+            self._buff_ends = None
+            self.revert_spell()
+
+    def add_effect(self, name, health, turns):
+        """change health every turn for a number of turns, negative for poison and positive for regen"""
+        effect = TimedEffect(name, health, turns)
+        if self._effects is None:
+            self._effects = []
+        self._effects.append(effect)
+        self.timers.schedule(1, lambda: self.tick_effect(effect))
+        return effect
+
+    def tick_effect(self, effect):
+        """apply one turn of a timed effect and schedule the next"""
+        self._health = min(self._health + effect.health, self.max_hp)
+        effect.turns -= 1
+        if effect.turns > 0:
+            self.timers.schedule(1, lambda: self.tick_effect(effect))
+        else:
+            self._effects.remove(effect)
+
+
+class TimedEffect:
+    """An effect that changes a character's health every turn until it runs out"""
+    __slots__ = ("name", "health", "turns")
+
+    def __init__(self, name, health, turns):
+        self.name = name
+        self.health = int(health)
+        self.turns = int(turns)
+
+
+class Player(Character):
+    """Player class that represents the player character"""
+    __slots__ = ("_weapon", "_armour", "_location", "max_inv_size", "_floor")
+
+    def __init__(self, name, level, xp, health, attack, defence, location, coins, inv, weapon, armour, spells, floor,
+                 max_hp=20):
+        super().__init__(name, level, xp, health, attack, defence, coins, inv, max_hp, spells)
+        self._inv = ItemBag(inv)
+
+        self._weapon = weapon
+        self._armour = armour
+        self._location = location
+        self.max_inv_size = 9
+        self._floor = floor
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, new_name):
+        self._name = new_name
+
+    @property
+    def level(self):
+        return self._level
+
+    @property
+    def xp(self):
+        return self._xp
+
+    @property
+    def health(self):
+        return self._health
+
+    @health.setter
+    def health(self, new_health):
+        self._health = new_health
+
+    @property
+    def location(self):
+        return self._location
+
+    @location.setter
+    def location(self, new_location):
+        self._location = new_location
+
+    @property
+    def coins(self):
+        return self._coins
+
+    @coins.setter
+    def coins(self, new_coins):
+        self._coins = new_coins
+
+    @property
+    def inv(self):
+        return self._inv
+
+    @inv.setter
+    def inv(self, new_inv):
+        self._inv = ItemBag(new_inv)
+
+    @property
+    def weapon(self):
+        return self._weapon
+
+    @weapon.setter
+    def weapon(self, new_weapon):
+        self._weapon = new_weapon
+
+    @property
+    def armour(self):
+        return self._armour
+
+    @armour.setter
+    def armour(self, new_armour):
+        self._armour = new_armour
+
+    @property
+    def spells(self):
+        return self._spells
+
+    @spells.setter
+    def spells(self, new_spells):
+        self._spells = new_spells
+
+    @property
+    def floor(self):
+        return self._floor
+
+    @floor.setter
+    def floor(self, new_floor):
+        self._floor = new_floor
+
+    def current_location(self):
+        """take the current location and return it as an object from the locations list."""
+        return WORLD.graph.get(self._location)
+
+    def check_max_inv(self):
+        """checks if player is over the max inventory size"""
+        if self._inv.slots > self.max_inv_size:
+            return True
+        else:
+            return False
+
+    def take_item(self, item, location):
+        """take item and add to player inventory"""
+        if not self.check_max_inv():
+            add_item = item
+            self._inv.append(add_item)
+            print(f"Successfully added {add_item.name} to inventory!")
+            location.remove_item(item)
+            return add_item.name
+        return False
+
+    def combat_take_item(self, item):
+        """take item from enemy inv"""
+        self._inv.append(item)
+        print(f"Successfully added {item.name} to inventory!")
+
+    def heal(self, healing):
+        """heals the player based on certain amount of health prevent overhealing"""
+        if self._health == self.max_hp:
+            print("Already max health!")
+            return False
+        old_health = self._health
+        self._health += healing
+        if self._health > self.max_hp:
+            self.health = self.max_hp
+        print(f"Healed {self._health - old_health} health!")
+
+    def use_item(self, item):
+        """use item in player inv - only consumable type"""
+        print(f"Used {item.name}")
+        self.add_modifier("consumable", item.id, attack=item.attack, defence=item.defence)
+        self.heal(item.health)
+        self._inv.remove(item)
+
+    def unequip_item(self, item):
+        """unequip item from inventory"""
+        if isinstance(item, Weapon) and self._weapon:
+            self.remove_modifier("equipment", "weapon")
+            self._weapon = None
+            print(f"Successfully unequipped {item.name}!")
+            return True
+        elif isinstance(item, Armour):
+            self.remove_modifier("equipment", "armour")
+            self._armour = None
+            print(f"Successfully unequipped {item.name}!")
+            return True
+        else:
+            print(f"Item {item.name} cannot be unequipped!")
+            return False
+
+    def remove_item(self, item):
+        """unequip item from inventory"""
+        self._inv.remove(item)
+
+    def equip_item(self, item):
+        """equips item and change player attributes"""
+        if isinstance(item, Weapon) and not self._weapon:
+            self.set_modifier("equipment", "weapon", attack=item.attack)
+            self._weapon = item
+            print(f"Successfully equipped {item.name}!")
+            return True
+        elif isinstance(item, Armour):
+            self.set_modifier("equipment", "armour", defence=item.defence)
+            self._armour = item
+        else:
+            print(f"Item {item.name} cannot be equipped!")
+            return False
+
+
+class Enemy(Character):
+    """Enemy class that represents the enemy character"""
+    __slots__ = ("_id", "_boss")
+
+    def __init__(self, enemy_id, name, level, xp, health, attack, defence, coins, inv, max_hp, spells, boss):
+        super().__init__(name, level, xp, health, attack, defence, coins, inv, max_hp, spells)
+        self._id = int(enemy_id)
+        self._boss = boss
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, new_name):
+        self._name = new_name
+
+    @property
+    def level(self):
+        return self._level
+
+    @level.setter
+    def level(self, new_level):
+        self._level = new_level
+
+    @property
+    def xp(self):
+        return self._xp
+
+    @xp.setter
+    def xp(self, new_xp):
+        self._xp = new_xp
+
+    @property
+    def health(self):
+        return self._health
+
+    @health.setter
+    def health(self, new_health):
+        self._health = new_health
+
+    @property
+    def coins(self):
+        return self._coins
+
+    @coins.setter
+    def coins(self, new_coins):
+        self._coins = new_coins
+
+    @property
+    def inv(self):
+        return self._inv
+
+    @inv.setter
+    def inv(self, new_inv):
+        self._inv = new_inv
+
+    @property
+    def spells(self):
+        return self._spells
+
+    @spells.setter
+    def spells(self, new_spells):
+        self._spells = new_spells
+
+    @property
+    def boss(self):
+        return self._boss
+
+    @boss.setter
+    def boss(self, new_boss):
+        self._boss = new_boss
+
+
+class EnemyTemplate(namedtuple("EnemyTemplate", "id name level xp health attack defence coins inv chance spells "
+                                                "boss speed", defaults=(None,))):
+    """Immutable enemy definition from enemy.txt that the enemies in a fight are spawned from
+
+    The xp, health, attack, defence and coins are (min, max) ranges that are rolled when an enemy is spawned.
+    The speed column is optional, enemies without one act as often as the player.
+    Locations only refer to templates, so memory grows with the fights going on and not with the map.
+    """
+    __slots__ = ()
+
+    @staticmethod
+    def parse_range(text):
+        """turn a '(min-max)' column into a (min, max) tuple"""
+        stat_range = text.strip().split('(')[1].split(')')[0].split('-')
+        return int(stat_range[0].strip()), int(stat_range[1].strip())
+
+    @classmethod
+    def parse_enemy_data(cls, line):
+        """Split the line into the enemy's stat ranges and the ids of its items and spells"""
+        data = line.strip().split(',')
+        return {
+            "enemy_id": int(data[0].strip()),
+            "name": data[1].strip(),
+            "level": int(data[2].strip()),
+            "xp": cls.parse_range(data[3]),
+            "health": cls.parse_range(data[4]),
+            "attack": cls.parse_range(data[5]),
+            "defence": cls.parse_range(data[6]),
+            "coins": cls.parse_range(data[7]),
+            "inv": [int(item.strip()) for item in data[8].strip().split(';')],
+            # the chance of getting an item from an enemy
+            "chance": int(data[9].strip()),
+            "spells": [int(item.strip()) for item in data[10].strip().split(';')],
+            "boss": int(data[11].strip()) == 1,  # checks if enemy is boss
+            "speed": int(data[12].strip()) if len(data) > 12 else BASE_SPEED
+        }
+
+    @classmethod
+    def from_record(cls, record, registry=None):
+        """link the record's items and spells to their objects"""
+        registry = registry or WORLD
+        return cls(record["enemy_id"], record["name"], record["level"], record["xp"], record["health"],
+                   record["attack"], record["defence"], record["coins"],
+                   tuple(registry.lookup("items", record["inv"])), record["chance"],
+                   tuple(registry.lookup("spells", record["spells"])), record["boss"], record["speed"])
+
+    @classmethod
+    def read_records(cls, in_file):
+        """ read the enemy records from enemy.txt file without linking them """
+        with open(in_file, 'r') as enemies:
+            for enemy in enemies:
+                if enemy.strip():
+                    yield cls.parse_enemy_data(enemy)
+
+    @classmethod
+    def generate_from_file(cls, in_file, registry=None):
+        """ generate enemy templates from enemy.csv file """
+        for record in cls.read_records(in_file):
+            yield cls.from_record(record, registry)
+
+    def spawn(self, rng=random):
+        """roll a new enemy from this template"""
+        return spawn(self, rng)
+
+
+def spawn(template, rng=random):
+    """roll a new enemy from its template for one fight
+
+    Args:
+        template (EnemyTemplate): the enemy to spawn.
+        rng (random.Random): where the stats and the item drop are rolled from.
+
+    Returns:
+        Enemy: a new enemy with its own stats that is thrown away once the fight is over.
+    """
+    # randomises enemy stats depending on the range supplied by the enemy.txt file
+    enemy_xp = rng.randint(*template.xp)
+    enemy_health = rng.randint(*template.health)
+    enemy_attack = rng.randint(*template.attack)
+    enemy_defence = rng.randint(*template.defence)
+    enemy_coins = rng.randint(*template.coins)
+
+    # random number generator if player can get item from enemy inventory
+    enemy_inv = None
+    if template.inv and rng.randint(1, template.chance) == 1:
+        enemy_inv = rng.choice(template.inv)
+
+    enemy = Enemy(template.id, template.name, template.level, enemy_xp, enemy_health, enemy_attack, enemy_defence,
+                  enemy_coins, enemy_inv, enemy_health, list(template.spells), template.boss)
+    if template.speed:
+        enemy.speed = template.speed
+    return enemy
+
+
+def read_tagged_rows(in_file, row_types):
+    """read a content file once and build each row with the class named in its type column
+
+    Args:
+        in_file (str): the file to read, one comma separated row per line with the type first.
+        row_types (dict): maps each type name to the class that builds that row.
+
+    Returns:
+        generator: the object built from each row, in file order.
+    """
+    with open(in_file, 'r') as rows:
+        for line_num, row in enumerate(rows, 1):
+            row = row.strip()
+            if not row:  # skip blank lines
+                continue
+            row_type, *data = row.split(",")
+            if row_type not in row_types:
+                raise ValueError(f"{in_file}:{line_num}: unknown row type '{row_type}'")
+            try:
+                yield row_types[row_type](*data)
+            except (TypeError, ValueError) as error:
+                raise ValueError(f"{in_file}:{line_num}: malformed {row_type} row ({error})") from error
+
+
+class Spells:
+    """A class representing the spells in the game"""
+    __slots__ = ("id", "name", "description", "_cooldown", "_max_cd")
+
+    def __init__(self, spell_id, name, description, cooldown, max_cd):
+        self.id = int(spell_id)
+        self.name = name
+        self.description = description
+        self._cooldown = int(cooldown)
+        self._max_cd = int(max_cd)
+
+    @property
+    def cooldown(self):
+        """the starting cooldown, what is left for each character is kept by Character.cooldown"""
+        return self._cooldown
+
+    @property
+    def max_cd(self):
+        return self._max_cd
+
+    @max_cd.setter
+    def max_cd(self, new_max_cd):
+        self._max_cd = new_max_cd
+
+    @classmethod
+    def generate_from_file(cls, in_file):
+        """ generate spells from spells.txt file """
+        return read_tagged_rows(in_file, SPELL_TYPES)
+
+
+class Buff(Spells):
+    """A class representing the buffs in the game inherited from the spells"""
+    __slots__ = ("attack", "defence", "duration")
+
+    def __init__(self, spell_id, name, description, cooldown, attack, defence, duration, max_cd):
+        super().__init__(spell_id, name, description, cooldown, max_cd)
+        self.attack = int(attack)
+        self.defence = int(defence)
+        self.duration = int(duration)
+
+
+class Heal(Spells):
+    """A class representing heal spells"""
+    __slots__ = ("health",)
+
+    def __init__(self, spell_id, name, description, cooldown, health, max_cd):
+        super().__init__(spell_id, name, description, cooldown, max_cd)
+        self.health = int(health)
+
+
+class Item:
+    """A class representing the items in the game"""
+    item_type = None  # the type column of items.txt, set by each subclass
+    __slots__ = ("id", "name", "desc", "value")
+
+    def __init__(self, item_id, name, desc, value):
+        self.id = int(item_id)
+        self.name = name
+        self.desc = desc
+        self.value = int(value)
+
+    def get_item_type(self):
+        """return the item type"""
+        return self.item_type
+
+    @classmethod
+    def generate_from_file(cls, in_file):
+        """ generate items from items.txt file """
+        return read_tagged_rows(in_file, ITEM_TYPES)
+
+
+class Consumable(Item):
+    """A class inheriting the item class to represent the consumable items in the game"""
+    item_type = "consumable"
+    __slots__ = ("attack", "defence", "health")
+
+    def __init__(self, item_id, name, desc, value, attack, defence, health):
+        super().__init__(item_id, name, desc, value)
+        self.attack = int(attack)
+        self.defence = int(defence)
+        self.health = int(health)
+
+
+class Weapon(Item):
+    """A class inheriting the item class to represent the weapons in the game"""
+    item_type = "weapon"
+    __slots__ = ("attack",)
+
+    def __init__(self, item_id, name, desc, value, attack):
+        super().__init__(item_id, name, desc, value)
+        self.attack = int(attack)
+
+
+class Armour(Item):
+    """A class inheriting the item class to represent the armour in the game"""
+    item_type = "armour"
+    __slots__ = ("defence",)
+
+    def __init__(self, item_id, name, desc, value, defence):
+        super().__init__(item_id, name, desc, value)
+        self.defence = int(defence)
+
+
+class Key(Item):
+    """A class inheriting the item class to represent the keys in the game"""
+    item_type = "key"
+    __slots__ = ()
+
+    def __init__(self, item_id, name, desc, value):
+        super().__init__(item_id, name, desc, value)
+
+
+# the type column in spells.txt and items.txt picks which class builds the row
+SPELL_TYPES = {"buff": Buff, "heal": Heal}
+ITEM_TYPES = {"weapon": Weapon, "armour": Armour, "consumable": Consumable, "key": Key}
+
+
+class ItemBag:
+    """The player's inventory as a counted multiset of items
+
+    Each item is kept once with how many of it are carried, bucketed by item type, and the inventory slots
+    in use are counted as items come and go: all the consumables with one name share a slot, every other
+    item takes a slot of its own. Capacity, key and stack checks are lookups instead of scans. Iterating
+    gives each item as many times as it is carried, so the bag reads like the list the inventory used to be.
+    """
+    __slots__ = ("_counts", "_stacks", "_types", "_length", "slots")
+
+    def __init__(self, items=()):
+        self._counts = {}  # item id -> [item, how many]
+        self._stacks = {}  # consumable name -> how many
+        self._types = {}  # item type -> {item id: item}
+        self._length = 0
+        self.slots = 0
+        for item in items:
+            self.append(item)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for item, count in list(self._counts.values()):
+            for _ in range(count):
+                yield item
+
+    def __contains__(self, item):
+        return item.id in self._counts
+
+    def __repr__(self):
+        return f"ItemBag({list(self)!r})"
+
+    def get(self, item_id):
+        """the item with the id, None if none are carried"""
+        entry = self._counts.get(item_id)
+        return entry[0] if entry else None
+
+    def count(self, item):
+        """how many of the item are carried"""
+        entry = self._counts.get(item.id)
+        return entry[1] if entry else 0
+
+    def stack(self, name):
+        """how many consumables with the name are carried"""
+        return self._stacks.get(name, 0)
+
+    def of_type(self, item_type):
+        """the different items of a type that are carried"""
+        return list(self._types.get(item_type, {}).values())
+
+    def counts(self):
+        """each different item carried and how many of it"""
+        return [(item, count) for item, count in self._counts.values()]
+
+    def append(self, item):
+        """add one of the item"""
+        entry = self._counts.get(item.id)
+        if entry:
+            entry[1] += 1
+        else:
+            self._counts[item.id] = [item, 1]
+            self._types.setdefault(item.item_type, {})[item.id] = item
+        self._length += 1
+
+        if item.item_type == "consumable":
+            self._stacks[item.name] = self._stacks.get(item.name, 0) + 1
+            if self._stacks[item.name] > 1:
+                return
+        self.slots += 1
+
+    def remove(self, item, count=1):
+        """take away count of the item"""
+        entry = self._counts.get(item.id)
+        if entry is None or entry[1] < count:
+            raise ValueError(f"not enough {item.name} in the inventory")
+        entry[1] -= count
+        if not entry[1]:
+            del self._counts[item.id]
+            del self._types[item.item_type][item.id]
+        self._length -= count
+
+        if item.item_type == "consumable":
+            self._stacks[item.name] -= count
+            if self._stacks[item.name]:
+                return
+            del self._stacks[item.name]
+            self.slots -= 1
+        else:
+            self.slots -= count
+
+    def clear(self):
+        """empty the bag"""
+        self._counts.clear()
+        self._stacks.clear()
+        self._types.clear()
+        self._length = 0
+        self.slots = 0
+
+
+class Location:
+    """A class representing the locations in the game
+
+    Destinations are stored as the index of each location in the world's location table and enemies, items
+    and the key as their ids, so a location only holds small integer arrays instead of object lists.
+    """
+    __slots__ = ("_id", "_name", "_desc", "_dest", "_npc", "_enemy", "_item", "_key", "_index", "_world")
+
+    def __init__(self, location_id, name, desc, dest, npc, enemy, item, key, index=0, world=None):
+        self._id = location_id
+        self._name = name
+        self._desc = desc
+        self._dest = dest
+        self._npc = npc
+        self._enemy = enemy
+        self._item = item
+        self._key = key
+        self._index = index
+        self._world = world or WORLD
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def id(self):
+        return self._id
+
+    @id.setter
+    def id(self, new_id):
+        self._id = new_id
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, new_name):
+        self._name = new_name
+
+    @property
+    def desc(self):
+        return self._desc
+
+    @desc.setter
+    def desc(self, new_desc):
+        self._desc = new_desc
+
+    @property
+    def dest(self):
+        locations = self._world.locations
+        return [locations[index] for index in self._dest]
+
+    @dest.setter
+    def dest(self, new_dest):
+        self._dest = array("i", [dest.index for dest in new_dest])
+
+    @property
+    def dest_index(self):
+        return self._dest
+
+    @property
+    def enemy_index(self):
+        return self._enemy
+
+    @property
+    def item_index(self):
+        return self._item
+
+    @property
+    def key_id(self):
+        return self._key
+
+    @property
+    def npc(self):
+        return self._npc
+
+    @npc.setter
+    def npc(self, new_npc):
+        self._npc = new_npc
+        self._world.location_changed(self)
+
+    @property
+    def item(self):
+        return self._world.lookup("items", self._item)
+
+    @item.setter
+    def item(self, new_item):
+        self._item = array("i", [item.id for item in new_item or []])
+        self._world.location_changed(self)
+
+    @item.deleter
+    def item(self):
+        self._item = array("i")
+        self._world.location_changed(self)
+
+    @property
+    def enemy(self):
+        return self._world.lookup("enemies", self._enemy)
+
+    @enemy.setter
+    def enemy(self, new_enemy):
+        self._enemy = array("i", [enemy.id for enemy in new_enemy or []])
+        self._world.location_changed(self)
+
+    @property
+    def key(self):
+        if self._key:
+            return self._world.index("items").get(self._key)
+        return None
+
+    @key.setter
+    def key(self, new_key):
+        self._key = new_key.id if new_key else 0
+        self._world.location_changed(self)
+
+    def remove_item(self, item):
+        """remove one of the item from the location"""
+        self._item.remove(item.id)
+        self._world.location_changed(self)
+
+    def remove_enemy(self, enemy):
+        """remove one of the enemy from the location"""
+        self._enemy.remove(enemy.id)
+        self._world.location_changed(self)
+
+    def check_npc(self):
+        """Check if the current location has a non-player character.
+
+        Returns:
+            bool: True if the location has a non-player character, False otherwise.
+        """
+        if self._npc:
+            return True
+        return False
+
+    def check_item(self):
+        """Check if the current location has an item.
+
+        Returns:
+            bool: True if the location has an item, False otherwise.
+        """
+        if self._item:
+            return len(self._item)
+        return False
+
+    def check_enemy(self):
+        """Check if the current location has an item.
+
+        Returns:
+            bool: True if the location has an item, False otherwise.
+        """
+        if self._enemy:
+            return True
+        return False
+
+    @staticmethod
+    def read_ids(file_name):
+        """first pass over the map that only reads the location ids
+
+        Returns:
+            dict: maps each location id to its index in the map file.
+        """
+        location_ids = {}
+        with open(file_name, 'r') as file:
+            for line in file:
+                if line.strip():
+                    location_ids[line.split(',', 1)[0].strip('"')] = len(location_ids)
+        return location_ids
+
+    @staticmethod
+    def parse_location_record(line):
+        """Split the line into individual values with the references left as ids
+
+        Returns:
+            tuple: (location_id, name, desc, dest, npc, enemy, item, key), kept as a tuple so the records are
+            cheap to send back from the parallel loader.
+        """
+        parts = line.strip().split(',')
+        item = parts[6].strip('[]').split('-')
+        key = parts[7].strip('"')
+        return (parts[0].strip('"'),
+                parts[1].strip('"'),
+                parts[2].strip('"'),
+                [dest_id for dest_id in parts[3].strip('[]').split('-') if dest_id],
+                parts[4].strip('"'),
+                [int(enemy_id) for enemy_id in parts[5].strip('[]').split('-') if enemy_id],
+                [] if "False" in item else [int(item_id) for item_id in item],
+                0 if key == "False" else int(key))
+
+    @staticmethod
+    def resolve_location_record(record, location_ids, registry=None):
+        """resolve the record's references into indices and ids that exist in the world"""
+        registry = registry or WORLD
+        enemy_index = registry.index("enemies")
+        item_index = registry.index("items")
+        location_id, name, desc, dest, npc, enemy, item, key = record
+        return {
+            "location_id": location_id,
+            "name": name,
+            "desc": desc,
+            # destinations are resolved to their index in the location table, unknown ids are skipped
+            "dest": array("i", [location_ids[dest_id] for dest_id in dest if dest_id in location_ids]),
+            # link npc name to npc object
+            "npc": registry.index("npcs").get(npc, npc),
+            "enemy": array("i", [enemy_id for enemy_id in enemy if enemy_id in enemy_index]),
+            "item": array("i", [item_id for item_id in item if item_id in item_index]),
+            "key": key if key in item_index else 0
+        }
+
+    @classmethod
+    def parse_location_data(cls, line, location_ids, registry=None):
+        """Split the line into individual values and resolve the references into indices and ids"""
+        return cls.resolve_location_record(cls.parse_location_record(line), location_ids, registry)
+
+    @classmethod
+    def read_records(cls, file_name):
+        """read every location record from the map file without resolving them"""
+        with open(file_name, 'r') as file:
+            for line in file:
+                if line.strip():
+                    yield cls.parse_location_record(line)
+
+    @classmethod
+    def generate_from_file(cls, file_name, registry=None, location_ids=None):
+        """stream the locations from the map file
+
+        The ids are read first so every destination can be resolved to an index while the second pass
+        streams the rows, without keeping the parsed lines around.
+        """
+        registry = registry or WORLD
+        if location_ids is None:
+            location_ids = cls.read_ids(file_name)
+        for index, record in enumerate(cls.read_records(file_name)):
+            location_data = cls.resolve_location_record(record, location_ids, registry)
+            yield Location(**location_data, index=index, world=registry)
+
+    @staticmethod
+    def dest_locked(dest):
+        """checks if destination is locked"""
+        return WORLD.graph.key_for(dest)
+
+    def print_location_info(self, dests):
+        """Print the location information, including name, description, and possible destinations.
+
+        Args:
+            dests (list): A list of destinations.
+
+        Returns:
+            str: The formatted location information.
+        """
+
+        dest_list_names = [dest.name for dest in dests if not dest.key]
+        locked_loc_names = [dest.name for dest in dests if dest.key]  # compile a list of dest that are locked
+
+        dest = ", ".join(dest_list_names)
+
+        prompt = f"\nYou moved to {self.name}.\n{self.desc}\nYou can move to {dest}.\n"
+        # prints the locations that are locked
+        if locked_loc_names:
+            lock_dest = ", ".join(locked_loc_names)
+            prompt = prompt + f"{lock_dest} is locked!\n"
+        if self.check_npc():
+            prompt = prompt + "Someone is waving at you!\n"
+        if self.check_item():
+            prompt = prompt + "There is an item here!\n"
+        if self.check_enemy():
+            prompt = prompt + "You sense an evil presence!\n"
+        return prompt
+
+
+class NPC:
+    """NPC class that represents the non-player characters in the game
+    """
+
+    def __init__(self, name, dialogue_tree):
+        """
+        Initializes an instance of the NPC class.
+        """
+        self.name = name
+        self.dialogue_tree = dialogue_tree
+
+    @classmethod
+    def generate_from_file(cls, filename):
+        with open(filename, "r") as file:
+            dialogue_tree = json.load(file)
+            for npc_name, dialogue_tree in dialogue_tree.items():
+                yield NPC(npc_name, dialogue_tree)
+
+
+class Shop(NPC):
+    """Initializes an instance of the Shop class which inherits from npc"""
+
+    def __init__(self, name, dialogue_tree, shop_stock):
+        super().__init__(name, dialogue_tree)
+        self.name = name
+        self.dialogue_tree = dialogue_tree
+        self.shop_stock = shop_stock
+
+    @staticmethod
+    def read_records(filename):
+        """read each shop's name and its stock as item ids and prices"""
+        with open(filename, "r") as file:
+            shops = json.load(file)
+        return [(npc_name, {int(item_id): price for item_id, price in shop_stock.items()})
+                for npc_name, shop_stock in shops.items()]
+
+    @classmethod
+    def from_records(cls, records, registry=None):
+        """link each shop's stock to the item objects"""
+        registry = registry or WORLD
+        item_index = registry.index("items")
+        for npc_name, shop_stock in records:
+            # seeded by the shop so the greeting is the same every run
+            npc_dialogue = random.Random(npc_name).choice(["We have great items!", "Welcome!", "I hope you have money"])
+            # link the item_ids to their respective item classes
+            linked_shop_stock = dict()
+            for item_id, item_price in shop_stock.items():
+                item = item_index.get(item_id)
+                if item:
+                    linked_shop_stock[item] = item_price
+            yield Shop(npc_name, npc_dialogue, linked_shop_stock)
+
+    @classmethod
+    def generate_from_file(cls, filename, registry=None):
+        return cls.from_records(cls.read_records(filename), registry)
+
+
+# how fast characters act unless they say otherwise, an actor waits INITIATIVE // speed between actions
+BASE_SPEED = 10
+INITIATIVE = 1000
+
+# enemy health is split into this many equal buckets when the enemy ai picks its spells
+HP_BUCKETS = 4
+
+
+class EnemyAI:
+    """Decision table for the spells an enemy casts at the start of its turn
+
+    Rules come from enemy_ai.json, keyed by enemy id, e.g. {"12": [{"spell": 2, "hp_below": 0.5},
+    {"spell": 1, "buff": false}]}. A spell is cast when it is off cooldown and any of its rules match.
+    "hp_below" and "hp_above" are fractions of max health, rounded to the HP_BUCKETS buckets, and "buff"
+    checks if the enemy already has a buff. An enemy with no rules casts every spell off cooldown.
+
+    The rules are compiled into a flat table indexed by (health bucket, buff active, ready spells mask) that
+    holds the mask of spells to cast, so a decision is one read in a fight or one gather in a batch.
+    """
+    __slots__ = ("spells", "table")
+
+    def __init__(self, spells, rules=None):
+        self.spells = list(spells)
+        self.table = self.compile(self.spells, rules)
+
+    @staticmethod
+    def compile(spells, rules):
+        """build the table of spells to cast for every state key"""
+        if len(spells) > 16:
+            raise ValueError(f"enemy ai tables support up to 16 spells, got {len(spells)}")
+        all_spells = (1 << len(spells)) - 1
+        if rules is None:
+            wanted = {(bucket, buffed): all_spells for bucket in range(HP_BUCKETS) for buffed in (0, 1)}
+        else:
+            wanted = {}
+            for bucket in range(HP_BUCKETS):
+                for buffed in (0, 1):
+                    mask = 0
+                    for rule in rules:
+                        if EnemyAI.matches(rule, bucket, buffed):
+                            mask |= EnemyAI.spell_mask(spells, rule["spell"])
+                    wanted[bucket, buffed] = mask
+
+        table = array("I")
+        for bucket in range(HP_BUCKETS):
+            for buffed in (0, 1):
+                table.extend(wanted[bucket, buffed] & ready for ready in range(all_spells + 1))
+        return table
+
+    @staticmethod
+    def matches(rule, bucket, buffed):
+        """checks if a rule applies to every health in the bucket with or without a buff"""
+        if "hp_below" in rule and (bucket + 1) / HP_BUCKETS > rule["hp_below"]:
+            return False
+        if "hp_above" in rule and bucket / HP_BUCKETS < rule["hp_above"]:
+            return False
+        if "buff" in rule and bool(rule["buff"]) != bool(buffed):
+            return False
+        return True
+
+    @staticmethod
+    def spell_mask(spells, spell_id):
+        """bit mask of the enemy's spells with the id"""
+        mask = 0
+        for index, spell in enumerate(spells):
+            if spell.id == spell_id:
+                mask |= 1 << index
+        if not mask:
+            raise ValueError(f"enemy ai rule casts spell {spell_id} which the enemy doesn't have")
+        return mask
+
+    def key(self, health, max_hp, buffed, ready):
+        """table index for a health, buff and mask of spells off cooldown"""
+        bucket = min(max(health, 0) * HP_BUCKETS // max_hp, HP_BUCKETS - 1)
+        return ((bucket << 1 | bool(buffed)) << len(self.spells)) | ready
+
+    def decide(self, enemy):
+        """return the enemy's spells to cast this turn, in order"""
+        ready = 0
+        for index, spell in enumerate(self.spells):
+            if enemy.cooldown(spell) <= 0:
+                ready |= 1 << index
+        cast = self.table[self.key(enemy.health, enemy.max_hp, enemy.buff_duration > 0, ready)]
+        return [spell for index, spell in enumerate(self.spells) if cast >> index & 1]
+
+    def decide_batch(self, health, max_hp, buffed, ready):
+        """return the mask of spells to cast for every fight in a batch"""
+        np = load_numpy()
+        bucket = np.minimum(np.maximum(health, 0) * HP_BUCKETS // max_hp, HP_BUCKETS - 1)
+        keys = ((bucket << 1 | buffed) << len(self.spells)) | ready
+        return np.asarray(self.table)[keys]
+
+
+def template_ai(template, registry=None):
+    """the ai for an enemy template
+
+    The registry's compiled rules are only used when a registry is given or the template is one of the
+    already loaded WORLD enemies, so a hand-built template never loads the content files.
+    """
+    if registry is None and WORLD.is_loaded("enemies") and WORLD.index("enemies").get(template.id) is template:
+        registry = WORLD
+    enemy_ai = registry.enemy_ai.get(template.id) if registry is not None else None
+    return enemy_ai or EnemyAI(template.spells)
+
+
+# the staircases that take the player onto each floor
+FLOOR_STAIRCASES = {
+    1: ["I"],
+    2: ["AA", "AS"],
+    3: ["BA"]
+}
+
+# the starting stats for each player class
+PLAYER_CLASSES = {
+    "Mage": {"health": 20, "attack": 6, "defence": 5, "spells": [1, 2, 8]},
+    "Warrior": {"health": 30, "attack": 10, "defence": 5, "spells": [8]}
+}
+
+
+def new_player(name, player_class, registry=None):
+    """create a level one player of the class at the start of the game"""
+    stats = PLAYER_CLASSES[player_class]
+    player = Player(name, 1, 0, stats["health"], stats["attack"], stats["defence"], "A", 0, [],
+                    None, None, list(stats["spells"]), 1, stats["health"])
+    player.link_spells(registry)
+    return player
+
+
+SNAPSHOT_FILE = "world.snapshot"
+SNAPSHOT_MAGIC = b"RLWORLD"
+# bump whenever a pickled class (items, spells, enemy templates, npcs, locations) changes its __slots__ or
+# fields, an older snapshot would otherwise pass the header check and fail to unpickle
+SNAPSHOT_VERSION = 7
+WORLD_TABLES = ["items", "spells", "enemies", "npcs", "locations"]
+# what unpickling a damaged or outdated snapshot can raise
+SNAPSHOT_ERRORS = (pickle.UnpicklingError, AttributeError, EOFError, ImportError, IndexError, KeyError, TypeError,
+                   ValueError)
+
+
+class WorldRegistry:
+    """Registry that loads each content table from file on first access and caches it"""
+
+    def __init__(self, items_file="items.txt", spells_file="spells.txt", enemies_file="enemy.txt",
+                 npcs_file="npc.json", shops_file="shop.json", map_file="map.txt", enemy_ai_file="enemy_ai.json"):
+        self.items_file = items_file
+        self.spells_file = spells_file
+        self.enemies_file = enemies_file
+        self.npcs_file = npcs_file
+        self.shops_file = shops_file
+        self.map_file = map_file
+        self.enemy_ai_file = enemy_ai_file
+        self._tables = {}
+        self._indexes = {}
+
+    def table(self, name):
+        """return the named content table, loading and linking it the first time it is needed"""
+        if name not in self._tables:
+            self._tables[name] = getattr(self, f"load_{name}")()
+        return self._tables[name]
+
+    def index(self, name):
+        """return a dictionary mapping each id in the table to its object, built once per table"""
+        if name not in self._indexes:
+            key = "name" if name == "npcs" else "id"
+            self._indexes[name] = {getattr(obj, key): obj for obj in self.table(name)}
+        return self._indexes[name]
+
+    def lookup(self, name, ids):
+        """link a list of ids to their objects in the table, unknown ids are skipped"""
+        index = self.index(name)
+        return [index[obj_id] for obj_id in ids if obj_id in index]
+
+    def is_loaded(self, name):
+        """checks if a table has already been loaded"""
+        return name in self._tables
+
+    def reset(self):
+        """forget every loaded table so they are read from file again on next access"""
+        self._tables.clear()
+        self._indexes.clear()
+
+    def content_files(self):
+        """return every content file the world is built from"""
+        return [self.items_file, self.spells_file, self.enemies_file, self.map_file, self.npcs_file,
+                self.shops_file]
+
+    @staticmethod
+    def hash_file(file_name):
+        """return the sha256 hash of a content file"""
+        with open(file_name, "rb") as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+    def content_signature(self):
+        """stat and hash every content file so a snapshot can be checked against them later"""
+        signature = {}
+        for file_name in self.content_files():
+            stat = os.stat(file_name)
+            signature[file_name] = [stat.st_mtime_ns, stat.st_size, self.hash_file(file_name)]
+        return signature
+
+    def snapshot_is_current(self, signature):
+        """checks if the content files still match the signature stored in a snapshot"""
+        if sorted(signature) != sorted(self.content_files()):
+            return False
+        for file_name, (mtime, size, file_hash) in signature.items():
+            try:
+                stat = os.stat(file_name)
+            except OSError:
+                return False
+            if stat.st_size != size:
+                return False
+            # only hash the file if it was touched since the snapshot was compiled
+            if stat.st_mtime_ns != mtime and self.hash_file(file_name) != file_hash:
+                return False
+        return True
+
+    def compile_snapshot(self, snapshot_file=SNAPSHOT_FILE, parallel=False):
+        """load and link every table then write them to a versioned binary snapshot"""
+        if parallel:
+            self.load_parallel()
+        for name in WORLD_TABLES:
+            self.table(name)
+        header = json.dumps({"files": self.content_signature()}).encode()
+        body = io.BytesIO()
+        WorldPickler(body, self).dump_tables({name: self._tables[name] for name in WORLD_TABLES})
+
+        # write to a temporary file first so a crash never leaves half a snapshot behind
+        temp_file = f"{snapshot_file}.tmp"
+        with open(temp_file, "wb") as file:
+            file.write(SNAPSHOT_MAGIC + struct.pack(">HI", SNAPSHOT_VERSION, len(header)))
+            file.write(header)
+            file.write(body.getbuffer())
+        os.replace(temp_file, snapshot_file)
+
+    def load_snapshot(self, snapshot_file=SNAPSHOT_FILE):
+        """load every table from a snapshot, returns False if the snapshot is missing or out of date"""
+        try:
+            with open(snapshot_file, "rb") as file:
+                data = file.read()
+        except OSError:
+            return False
+
+        prefix_size = len(SNAPSHOT_MAGIC) + struct.calcsize(">HI")
+        if len(data) < prefix_size or not data.startswith(SNAPSHOT_MAGIC):
+            return False
+        version, header_size = struct.unpack_from(">HI", data, len(SNAPSHOT_MAGIC))
+        if version != SNAPSHOT_VERSION:
+            return False
+        try:
+            header = json.loads(data[prefix_size:prefix_size + header_size])
+            files = header["files"]
+        except (ValueError, KeyError, TypeError):
+            return False
+        if not self.snapshot_is_current(files):
+            return False
+
+        body = io.BytesIO(memoryview(data)[prefix_size + header_size:])
+        try:
+            tables = WorldUnpickler(body, self).load_tables()
+        except SNAPSHOT_ERRORS:
+            # truncated, corrupt or written by an older layout of the classes, load_or_compile replaces it
+            return False
+        self._tables = tables
+        self._indexes.clear()
+        return True
+
+    def load_or_compile(self, snapshot_file=SNAPSHOT_FILE, parallel=False):
+        """load the world from the snapshot, re-parsing the content files only if one of them changed"""
+        if not self.load_snapshot(snapshot_file):
+            self.reset()
+            self.compile_snapshot(snapshot_file, parallel)
+
+    @property
+    def items(self):
+        return self.table("items")
+
+    @property
+    def spells(self):
+        return self.table("spells")
+
+    @property
+    def enemies(self):
+        return self.table("enemies")
+
+    @property
+    def npcs(self):
+        return self.table("npcs")
+
+    @property
+    def locations(self):
+        return self.table("locations")
+
+    @property
+    def graph(self):
+        return self.table("graph")
+
+    @property
+    def tables(self):
+        return self.table("tables")
+
+    @property
+    def enemy_ai(self):
+        return self.table("enemy_ai")
+
+    def location_changed(self, location):
+        """keep the columnar tables in sync when a location's npc, items, enemies or key change"""
+        if "tables" in self._tables:
+            self._tables["tables"].update(location)
+
+    def load_items(self):
+        """generate all the items from the items file"""
+        return [item for item in Item.generate_from_file(self.items_file)]
+
+    def load_spells(self):
+        """generate all the spells from the spells file"""
+        return [spell for spell in Spells.generate_from_file(self.spells_file)]
+
+    def load_enemies(self):
+        """generate all the enemy templates from the enemy file"""
+        return [enemy for enemy in EnemyTemplate.generate_from_file(self.enemies_file, self)]
+
+    def load_npcs(self):
+        """generate all the npcs and shops from their json files"""
+        npcs = chain(NPC.generate_from_file(self.npcs_file), Shop.generate_from_file(self.shops_file, self))
+        return [npc for npc in npcs]
+
+    def load_locations(self):
+        """stream all the locations from the map file with their references resolved"""
+        location_ids = Location.read_ids(self.map_file)
+        self._indexes["location_ids"] = location_ids
+        return [loc for loc in Location.generate_from_file(self.map_file, self, location_ids)]
+
+    def load_enemy_ai(self):
+        """compile every enemy template's spell rules from the optional enemy ai file"""
+        rules = {}
+        if os.path.exists(self.enemy_ai_file):
+            with open(self.enemy_ai_file) as file:
+                rules = json.load(file)
+        return {enemy.id: EnemyAI(enemy.spells, rules.get(str(enemy.id))) for enemy in self.enemies}
+
+    def load_graph(self):
+        """compile the locations into a location graph"""
+        return LocationGraph(self.locations, self._indexes.get("location_ids"))
+
+    def load_tables(self):
+        """build the columnar tables from the locations"""
+        return WorldTables(self.locations, self.graph.floors())
+
+    def load_parallel(self, max_workers=None):
+        """parse every content file at the same time in a process pool then link them on this process
+
+        The workers only parse and validate their file, so the slowest file sets the load time instead of
+        the sum of all of them.
+        """
+        files = {"items": self.items_file, "spells": self.spells_file, "enemies": self.enemies_file,
+                 "npcs": self.npcs_file, "shops": self.shops_file, "locations": self.map_file}
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {kind: pool.submit(parse_content_file, kind, file_name) for kind, file_name in files.items()}
+            records = {kind: future.result() for kind, future in futures.items()}
+
+        self.reset()
+        # link in dependency order: enemies and shops need items and spells, locations need all of them
+        self._tables["items"] = records["items"]
+        self._tables["spells"] = records["spells"]
+        self._tables["enemies"] = [EnemyTemplate.from_record(record, self) for record in records["enemies"]]
+        npcs = [NPC(name, dialogue_tree) for name, dialogue_tree in records["npcs"]]
+        self._tables["npcs"] = npcs + list(Shop.from_records(records["shops"], self))
+
+        location_ids = {record[0]: index for index, record in enumerate(records["locations"])}
+        self._indexes["location_ids"] = location_ids
+        self._tables["locations"] = [
+            Location(**Location.resolve_location_record(record, location_ids, self), index=index, world=self)
+            for index, record in enumerate(records["locations"])]
+
+
+class LocationGraph:
+    """Compiled view of the map with id lookups, adjacency by location index and the locked locations
+
+    An edge is locked when the location it leads to still needs a key, so unlocking a location
+    unlocks every edge into it.
+    """
+
+    def __init__(self, locations, location_ids=None):
+        self.locations = locations
+        self.ids = location_ids or {loc.id: loc.index for loc in self.locations}
+        # the locations already store their destinations as index arrays so they are shared, not copied
+        self.adjacency = [loc.dest_index for loc in self.locations]
+        self.locked = {loc.index for loc in self.locations if loc.key}
+
+    def get(self, location_id):
+        """return the location with the id, or None if there isn't one"""
+        index = self.ids.get(location_id)
+        if index is None:
+            return None
+        return self.locations[index]
+
+    def neighbours(self, location_id):
+        """return the locations the location leads to"""
+        return [self.locations[index] for index in self.adjacency[self.ids[location_id]]]
+
+    def is_locked(self, location_id):
+        """checks if the location still needs a key"""
+        return self.ids.get(location_id) in self.locked
+
+    def key_for(self, location_id):
+        """return the key needed for the location or False if it isn't locked"""
+        index = self.ids.get(location_id)
+        if index in self.locked:
+            return self.locations[index].key
+        return False
+
+    def unlock(self, location_id):
+        """unlock the location and forget its key"""
+        index = self.ids[location_id]
+        self.locked.discard(index)
+        self.locations[index].key = None
+
+    def floors(self):
+        """work out which floor each location is on by walking the map from the first location
+
+        A location is on the floor of its staircase in FLOOR_STAIRCASES, otherwise it is on the same floor
+        as the location it was reached from.
+
+        Returns:
+            list: the floor of each location by index.
+        """
+        staircase_floors = {staircase: floor for floor, staircases in FLOOR_STAIRCASES.items()
+                            for staircase in staircases}
+        floors = [0] * len(self.locations)
+        for start in range(len(self.locations)):
+            if floors[start]:
+                continue
+            floors[start] = staircase_floors.get(self.locations[start].id, 1)
+            queue = deque([start])
+            while queue:
+                index = queue.popleft()
+                for dest in self.adjacency[index]:
+                    if not floors[dest]:
+                        floors[dest] = staircase_floors.get(self.locations[dest].id, floors[index])
+                        queue.append(dest)
+        return floors
+
+
+class WorldTables:
+    """Columnar NumPy view of the locations for world wide queries
+
+    Each column holds one value per location by index. The locations tell the registry when they change
+    so the columns always match them.
+    """
+
+    def __init__(self, locations, floors):
+        np = load_numpy()
+
+        self.locations = locations
+        self.floor = np.array(floors, dtype=np.int16)
+        self.has_npc = np.array([loc.check_npc() for loc in locations], dtype=bool)
+        self.item_count = np.array([len(loc.item_index) for loc in locations], dtype=np.int32)
+        self.enemy_count = np.array([len(loc.enemy_index) for loc in locations], dtype=np.int32)
+        self.key_id = np.array([loc.key_id for loc in locations], dtype=np.int32)
+
+    def update(self, location):
+        """update the row of a location that changed"""
+        index = location.index
+        self.has_npc[index] = location.check_npc()
+        self.item_count[index] = len(location.item_index)
+        self.enemy_count[index] = len(location.enemy_index)
+        self.key_id[index] = location.key_id
+
+    def select(self, mask):
+        """return the locations where the mask is True"""
+        return [self.locations[index] for index in load_numpy().flatnonzero(mask)]
+
+    def rooms_with_enemies(self, floor=None):
+        """return every room with an enemy left in it, only on one floor if a floor is given"""
+        mask = self.enemy_count > 0
+        if floor is not None:
+            mask &= self.floor == floor
+        return self.select(mask)
+
+    def rooms_with_items(self, floor=None):
+        """return every room with an item left in it, only on one floor if a floor is given"""
+        mask = self.item_count > 0
+        if floor is not None:
+            mask &= self.floor == floor
+        return self.select(mask)
+
+    def locked_rooms(self, floor=None):
+        """return every room that still needs a key"""
+        mask = self.key_id > 0
+        if floor is not None:
+            mask &= self.floor == floor
+        return self.select(mask)
+
+    def unlockable_rooms(self, inventory):
+        """return every locked room whose key is in the inventory"""
+        key_ids = [item.id for item in inventory if isinstance(item, Key)]
+        return self.select((self.key_id > 0) & load_numpy().isin(self.key_id, key_ids))
+
+
+def parse_content_file(kind, file_name):
+    """parse and validate one content file into picklable records for WorldRegistry.load_parallel"""
+    if kind == "items":
+        # items and spells don't link to anything so they are built in the worker
+        return [item for item in Item.generate_from_file(file_name)]
+    elif kind == "spells":
+        return [spell for spell in Spells.generate_from_file(file_name)]
+    elif kind == "enemies":
+        return [record for record in EnemyTemplate.read_records(file_name)]
+    elif kind == "npcs":
+        return [(npc.name, npc.dialogue_tree) for npc in NPC.generate_from_file(file_name)]
+    elif kind == "shops":
+        return Shop.read_records(file_name)
+    elif kind == "locations":
+        return [record for record in Location.read_records(file_name)]
+    raise ValueError(f"unknown content type '{kind}'")
+
+
+def is_slotted(cls):
+    """checks if every attribute of the class lives in __slots__, so its objects can be stored as columns"""
+    return all("__slots__" in vars(klass) for klass in cls.__mro__[:-1])
+
+
+def slot_descriptors(cls):
+    """the descriptor of every slot a class and its bases define, bases first"""
+    return [vars(klass)[name] for klass in reversed(cls.__mro__) for name in vars(klass).get("__slots__", ())]
+
+
+def split_columns(table):
+    """split a table of slotted objects into its layout and one column per slot of each class
+
+    Returns:
+        tuple: (layout, columns), or None if the table can't be stored column-wise. The layout is the
+        classes, their slot names and the class of each row. Each column is ("same", value) when every row
+        has the same object, ("array", (typecode, the bytes of each array)) for arrays and ("list", values)
+        otherwise.
+    """
+    classes = list(dict.fromkeys(map(type, table)))
+    if not table or len(classes) > 255 or not all(is_slotted(cls) for cls in classes):
+        return None
+    kinds = bytes(map(classes.index, map(type, table)))
+    layout = (classes, [[slot.__name__ for slot in slot_descriptors(cls)] for cls in classes], kinds)
+    columns = []
+    for cls in classes:
+        rows = [row for row in table if type(row) is cls]
+        class_columns = []
+        for slot in slot_descriptors(cls):
+            try:
+                values = [slot.__get__(row) for row in rows]
+            except AttributeError:  # a slot that was never set
+                return None
+            first = values[0]
+            if all(value is first for value in values):
+                # a column like the registry every location points back to is stored once
+                class_columns.append(("same", first))
+            elif all(type(value) is array and value.typecode == first.typecode for value in values):
+                # pickle rebuilds each array through a reconstructor call, bytes are far cheaper to load
+                class_columns.append(("array", (first.typecode, [value.tobytes() for value in values])))
+            else:
+                class_columns.append(("list", values))
+        columns.append(class_columns)
+    return layout, columns
+
+
+def build_rows(layout):
+    """make the empty rows of a table stored column-wise
+
+    Returns:
+        tuple: (the table, the rows of each class in the layout)
+    """
+    classes, slot_names, kinds = layout
+    for cls, names in zip(classes, slot_names):
+        if [slot.__name__ for slot in slot_descriptors(cls)] != names:
+            raise ValueError(f"{cls.__name__} changed its slots since the snapshot was compiled")
+    class_rows = [list(map(cls.__new__, repeat(cls, kinds.count(index)))) for index, cls in enumerate(classes)]
+    if len(classes) == 1:
+        return list(class_rows[0]), class_rows
+    rows = [iter(rows) for rows in class_rows]
+    return list(map(next, map(rows.__getitem__, kinds))), class_rows
+
+
+def fill_columns(classes, class_rows, columns):
+    """set every slot of the rows made by build_rows from their columns"""
+    for cls, rows, class_columns in zip(classes, class_rows, columns):
+        for slot, (how, values) in zip(slot_descriptors(cls), class_columns):
+            if how == "same":
+                values = repeat(values, len(rows))
+            elif how == "array":
+                typecode, values = values
+                values = map(array, repeat(typecode), values)
+            deque(map(setattr, rows, repeat(slot.__name__), values), maxlen=0)
+
+
+class WorldPickler(pickle.Pickler):
+    """Pickler that writes the world tables column-wise
+
+    Tables of slotted objects are written as their layout and then their columns, so loading one is a few
+    list operations per column instead of pickle rebuilding every object. The registry the locations point
+    back to and the rows of those tables are written as references instead of copies.
+    """
+
+    def __init__(self, file, registry):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.registry = registry
+        self.rows = {}  # id of each row stored column-wise -> (table name, row index)
+
+    def persistent_id(self, obj):
+        if obj is self.registry:
+            return "world"
+        return self.rows.get(id(obj))
+
+    def dump_tables(self, tables):
+        """write the tables as two pickles, the layouts then the columns and the tables kept whole"""
+        layouts, columns = {}, {}
+        for name, table in tables.items():
+            split = split_columns(table)
+            if split is None:
+                columns[name] = table
+            else:
+                layouts[name], columns[name] = split
+        # the layouts go first so the loader has made every row before a column refers to one
+        self.dump(layouts)
+        for name in layouts:
+            self.rows.update((id(row), (name, index)) for index, row in enumerate(tables[name]))
+        self.dump(columns)
+
+
+class WorldUnpickler(pickle.Unpickler):
+    """Unpickler that reads the tables written by WorldPickler, pointing the locations at the registry"""
+
+    def __init__(self, file, registry):
+        super().__init__(file)
+        self.registry = registry
+        self.tables = {}
+
+    def persistent_load(self, pid):
+        if pid == "world":
+            return self.registry
+        if isinstance(pid, tuple):  # a row of a table stored column-wise
+            name, index = pid
+            return self.tables[name][index]
+        raise pickle.UnpicklingError(f"unknown persistent id {pid}")
+
+    def load_tables(self):
+        """read the tables written by WorldPickler.dump_tables"""
+        # every object made here lives as long as the world, the cyclic collector would only keep rescanning
+        # them while they are made
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            layouts = self.load()
+            class_rows = {}
+            for name, layout in layouts.items():
+                self.tables[name], class_rows[name] = build_rows(layout)
+            for name, stored in self.load().items():
+                if name in layouts:
+                    fill_columns(layouts[name][0], class_rows[name], stored)
+                else:
+                    self.tables[name] = stored
+        finally:
+            if collecting:
+                gc.enable()
+        return self.tables
+
+
+class LazyTable:
+    """A list-like view over one of the WorldRegistry tables that only loads the table when it is used"""
+
+    def __init__(self, registry, name):
+        self._registry = registry
+        self._name = name
+
+    def _data(self):
+        return self._registry.table(self._name)
+
+    def __len__(self):
+        return len(self._data())
+
+    def __iter__(self):
+        return iter(self._data())
+
+    def __getitem__(self, index):
+        return self._data()[index]
+
+    def __contains__(self, value):
+        return value in self._data()
+
+    def __getattr__(self, attr):
+        # list methods such as index, count and remove are forwarded to the loaded table
+        return getattr(self._data(), attr)
+
+    def __repr__(self):
+        if not self._registry.is_loaded(self._name):
+            return f"<LazyTable {self._name} (not loaded)>"
+        return repr(self._data())
+
+
+CombatEvent = namedtuple("CombatEvent", "kind text spell actor", defaults=(None,))
+COMBAT_ACTIONS = {"attack", "block", "spell", "target", "flee"}
+
+
+class CombatState:
+    """The state of one fight between the player and a group of enemies"""
+    __slots__ = ("player", "enemies", "target", "defeated", "turn", "outcome", "leveled_up", "player_spell_used")
+
+    def __init__(self, player, enemies):
+        self.player = player
+        self.enemies = enemies
+        self.target = 0  # index of the enemy the player is attacking
+        self.defeated = []  # enemies killed so far, in order
+        self.turn = 0
+        self.outcome = None  # "won", "lost" or "fled" once the fight is over
+        self.leveled_up = False
+        self.player_spell_used = False
+
+    @property
+    def enemy(self):
+        """the enemy the player is targeting"""
+        return self.enemies[self.target]
+
+
+class CombatEngine:
+    """Applies the combat rules to a fight between the player and one or more enemies without any widgets
+
+    Everyone takes turns from an initiative queue: a heap of (time of next action, order, actor) where a
+    faster actor's next action comes sooner. step() takes the player's action then lets every enemy due
+    before the player's next action act, so each action costs O(log n) however many enemies are in the
+    room. Dead enemies are skipped when they come off the heap. The player's turn counts as over once all
+    of them have acted, which is when its cooldowns and buffs count down.
+
+    step() returns the events it caused, so the same rules can run in the combat screen or headless for
+    balance checks. enemy_ai maps enemy ids to the EnemyAI to use for them instead of the registry's, and
+    without either an enemy picks from its own spells, so hand-built enemies never load the content files.
+    """
+
+    def __init__(self, player, enemies, log=True, enemy_ai=None, registry=None):
+        if isinstance(enemies, Enemy):
+            enemies = [enemies]
+        self.state = CombatState(player, list(enemies))
+        self.log = log  # balance runs can skip building the event text
+        self.enemy_ai = dict(enemy_ai or {})  # each kind of enemy's ai by enemy id
+        for enemy in self.state.enemies:
+            if enemy.id not in self.enemy_ai:
+                compiled = registry.enemy_ai.get(enemy.id) if registry is not None else None
+                self.enemy_ai[enemy.id] = compiled or EnemyAI(enemy.spells)
+
+        self.alive = len(self.state.enemies)
+        self.queue = []
+        self.order = 0  # breaks ties so actors due at the same time keep their order
+        self.player_time = 0
+        for enemy in self.state.enemies:
+            self.schedule(enemy, 0)
+
+    def schedule(self, actor, time):
+        """queue the actor's next action"""
+        heapq.heappush(self.queue, (time, self.order, actor))
+        self.order += 1
+
+    @staticmethod
+    def action_time(actor):
+        """how long the actor waits between actions"""
+        return INITIATIVE // max(actor.speed, 1)
+
+    def step(self, action, spell=None, target=None):
+        """apply one player action and the enemies' responses
+
+        Args:
+            action (str): "attack", "block", "spell", "target" or "flee".
+            spell (Spells): the spell to cast when the action is "spell".
+            target (int): index of the enemy to attack from now on, "target" only changes the target.
+
+        Returns:
+            list: the CombatEvents the action caused, in order.
+        """
+        state = self.state
+        # check the whole action before changing anything, so one that raises leaves the fight as it was
+        if state.outcome:
+            raise ValueError(f"the fight is already over ({state.outcome})")
+        if action not in COMBAT_ACTIONS:
+            raise ValueError(f"unknown combat action '{action}'")
+        if action == "spell" and spell not in state.player.spells:
+            raise ValueError(f"{state.player.name} can't cast {spell.name if spell else 'no spell'}")
+        if action == "flee" and any(enemy.boss and enemy.is_alive() for enemy in state.enemies):
+            raise ValueError("can't flee from a boss")
+        if target is not None:
+            if not 0 <= target < len(state.enemies) or not state.enemies[target].is_alive():
+                raise ValueError(f"can't target enemy {target}")
+            state.target = target
+        events = []
+        if action == "attack":
+            enemy = state.enemy
+            damage = enemy.take_damage(state.player.attack)
+            self.event(events, "player_attack", f"You attacked {enemy.name} for {damage} damage.\n\n")
+            if not enemy.is_alive():
+                self.defeat(enemy)
+            self.enemy_turns(events)
+        elif action == "block":
+            state.player.action_block()
+            self.event(events, "block", "You are now blocking!\n\n")
+            self.enemy_turns(events)
+            state.player.action_block()  # disable block
+        elif action == "spell":
+            # casting a spell doesn't use up the player's turn
+            self.player_spell(events, spell)
+        elif action == "target":
+            pass  # choosing a target doesn't use up the player's turn
+        else:  # flee
+            state.outcome = "fled"
+        return events
+
+    def event(self, events, kind, text, spell=None, actor=None):
+        """add an event if the engine is logging"""
+        if self.log:
+            events.append(CombatEvent(kind, text, spell, actor))
+
+    def player_spell(self, events, spell):
+        """the player casts a spell"""
+        state = self.state
+        state.player_spell_used = state.player.use_spell(spell)
+        if state.player_spell_used:
+            state.player.timers.start_cooldown(spell)
+            self.event(events, "player_spell", f"You used {spell.name}.\n", spell)
+            if isinstance(spell, Buff):
+                if spell.attack > 0:
+                    self.event(events, "buff", f"Increased ATK by {spell.attack} for {spell.duration} turns!\n\n")
+                if spell.defence > 0:
+                    self.event(events, "buff", f"Increased DEF by {spell.defence} for {spell.duration} turns!\n\n")
+            if isinstance(spell, Heal):
+                self.event(events, "heal", f"Healed for {spell.health} HP!\n\n")
+        # if player tries to use a buff while a buff is active
+        elif isinstance(spell, Buff):
+            self.event(events, "buff_active", "Already using a buff!\n")
+
+    def enemy_turns(self, events):
+        """every living enemy due before the player's next action casts its spells and attacks"""
+        state = self.state
+        self.schedule(state.player, self.player_time + self.action_time(state.player))
+        while not state.outcome:
+            time, _, actor = heapq.heappop(self.queue)
+            if actor is state.player:
+                self.player_time = time
+                self.end_player_turn()
+                return
+            if not actor.is_alive():
+                continue  # killed since it was queued
+
+            for spell in self.enemy_ai[actor.id].decide(actor):
+                actor.use_spell(spell)
+                actor.timers.start_cooldown(spell)
+                self.event(events, "enemy_spell", f"{actor.name} used {spell.name}!\n", spell, actor)
+
+            damage = state.player.take_damage(actor.attack)
+            self.event(events, "enemy_attack", f"{actor.name} attacked you for {damage} damage.\n\n", actor=actor)
+            if not state.player.is_alive():
+                state.outcome = "lost"
+                return
+
+            actor.advance_turn()
+            if actor.is_alive():
+                self.schedule(actor, time + self.action_time(actor))
+            else:
+                self.defeat(actor)  # a timed effect such as poison finished it off
+
+    def end_player_turn(self):
+        """count down the player's timers once every enemy has had its go"""
+        state = self.state
+        state.player.advance_turn()
+        state.turn += 1
+        # timed effects such as regen or poison can end the fight
+        if not state.player.is_alive():
+            state.outcome = "lost"
+
+    def defeat(self, enemy):
+        """the player gets the enemy's coins, xp and item, and wins once every enemy is dead"""
+        state = self.state
+        state.defeated.append(enemy)
+        state.player.get_coins(enemy.coins)
+        if state.player.get_xp(enemy.xp):
+            state.leveled_up = True
+        if enemy.inv:
+            state.player.combat_take_item(enemy.inv)
+
+        self.alive -= 1
+        if not self.alive:
+            state.outcome = "won"
+        elif enemy is state.enemy:
+            # move on to the next enemy still standing
+            while not state.enemy.is_alive():
+                state.target = (state.target + 1) % len(state.enemies)
+
+
+class BattleResults(namedtuple("BattleResults", "won finished turns player_hp enemy_hp")):
+    """The outcome of every fight in a batch simulation, one array entry per fight"""
+    __slots__ = ()
+
+    @property
+    def win_rate(self):
+        return float(self.won.mean())
+
+    @property
+    def turns_to_kill(self):
+        """the number of turns each won fight took"""
+        return self.turns[self.won]
+
+    @property
+    def hp_remaining(self):
+        """the player's health left after each won fight"""
+        return self.player_hp[self.won]
+
+
+class BatchFighters:
+    """One side of a batch simulation held as NumPy arrays with one entry per fight"""
+
+    def __init__(self, health, max_hp, attack, defence, spells, cooldowns):
+        np = load_numpy()
+        self.health = health
+        self.max_hp = max_hp
+        self.attack = attack
+        self.defence = defence
+        self.attk_buff = np.zeros_like(health)
+        self.def_buff = np.zeros_like(health)
+        self.buff_duration = np.zeros_like(health)
+        self.block = np.zeros(health.shape, dtype=bool)
+        self.spells = spells
+        self.cooldowns = [np.full(health.shape, cooldown, dtype=np.int32) for cooldown in cooldowns]
+
+    def take_damage(self, raw_damage, mask):
+        """take damage calculating raw_damage - defence where the mask is set"""
+        np = load_numpy()
+        defence = self.defence + self.def_buff
+        defence = np.where(self.block, defence * 2, defence)
+        damage = np.maximum(raw_damage - defence, 0)
+        self.health -= np.where(mask, damage, 0)
+
+    def use_spell(self, index, mask):
+        """cast a spell where the mask is set, returns where it worked like Character.use_spell"""
+        spell = self.spells[index]
+        if isinstance(spell, Buff):
+            used = mask & (self.buff_duration == 0)
+            if spell.attack > 0:
+                self.attk_buff[used] = spell.attack
+                self.buff_duration[used] = spell.duration
+            if spell.defence > 0:
+                self.def_buff[used] = spell.defence
+                self.buff_duration[used] = spell.duration
+        else:
+            used = mask & (self.health != self.max_hp)
+            self.health[used] = load_numpy().minimum(self.health[used] + spell.health, self.max_hp[used])
+        return used
+
+    def add_turn(self, mask):
+        """count down the cooldowns and the buff, reverting the buff once it runs out"""
+        for cooldown in self.cooldowns:
+            cooldown[mask & (cooldown > 0)] -= 1
+        self.buff_duration[mask & (self.buff_duration > 0)] -= 1
+        expired = mask & (self.buff_duration == 0)
+        self.attk_buff[expired] = 0
+        self.def_buff[expired] = 0
+
+
+def simulate_battles(player, template, fights, policy="attack", seed=None, max_turns=200, enemy_ai=None,
+                     registry=None):
+    """simulate many independent fights of the player against an enemy template at once with NumPy
+
+    The rules are the same as CombatEngine: the player acts, the enemy casts the spells its ai picks then
+    attacks, then the turn ends. Every fight gets its own enemy stats rolled from the template and its own
+    spell cooldowns.
+
+    Args:
+        player (Player): the player's stats and spells at the start of every fight.
+        template (EnemyTemplate): the enemy to fight.
+        fights (int): how many fights to simulate.
+        policy (str): "attack" always attacks and "spells" casts buffs whenever possible and heals when the
+            whole heal would be used before attacking.
+        seed (int): seed for the enemy stat rolls.
+        max_turns (int): fights still going after this many turns are counted as losses.
+        enemy_ai (EnemyAI): picks the enemy's spells, defaults to the template's compiled rules.
+        registry (WorldRegistry): the world the template came from, see template_ai.
+
+    Returns:
+        BattleResults: the outcome of each fight.
+    """
+    np = load_numpy()
+
+    rng = np.random.default_rng(seed)
+    shape = (fights,)
+    enemy_ai = enemy_ai or template_ai(template, registry)
+
+    def full(value):
+        return np.full(shape, value, dtype=np.int32)
+
+    def roll(stat_range):
+        return rng.integers(stat_range[0], stat_range[1] + 1, size=fights, dtype=np.int32)
+
+    hero = BatchFighters(full(player.health), full(player.max_hp), full(player.attack), full(player.defence),
+                         list(player.spells), [player.cooldown(spell) for spell in player.spells])
+    enemy_health = roll(template.health)
+    enemy = BatchFighters(enemy_health, enemy_health.copy(), roll(template.attack), roll(template.defence),
+                          list(template.spells), [spell.cooldown for spell in template.spells])
+
+    active = np.ones(shape, dtype=bool)
+    won = np.zeros(shape, dtype=bool)
+    turns = np.zeros(shape, dtype=np.int32)
+
+    for _ in range(max_turns):
+        if not active.any():
+            break
+        started = active.copy()
+
+        # player's turn, spells don't use up the turn
+        if policy == "spells":
+            for index, spell in enumerate(hero.spells):
+                ready = active & (hero.cooldowns[index] <= 0)
+                if isinstance(spell, Heal):
+                    ready &= hero.health <= hero.max_hp - spell.health
+                used = hero.use_spell(index, ready)
+                hero.cooldowns[index][used] = spell.max_cd
+        enemy.take_damage(hero.attack + hero.attk_buff, active)
+
+        killed = active & (enemy.health <= 0)
+        won |= killed
+        active &= ~killed
+
+        # enemy's turn, the ai picks every spell to cast from the state before any of them
+        ready_mask = np.zeros(shape, dtype=np.int64)
+        for index, cooldown in enumerate(enemy.cooldowns):
+            ready_mask |= (cooldown <= 0).astype(np.int64) << index
+        cast = enemy_ai.decide_batch(enemy.health, enemy.max_hp, enemy.buff_duration > 0, ready_mask)
+        for index, spell in enumerate(enemy.spells):
+            ready = active & (cast >> index & 1).astype(bool)
+            enemy.use_spell(index, ready)
+            enemy.cooldowns[index][ready] = spell.max_cd
+        hero.take_damage(enemy.attack + enemy.attk_buff, active)
+        active &= hero.health > 0
+
+        hero.add_turn(active)
+        enemy.add_turn(active)
+        turns[started] += 1
+
+    return BattleResults(won, ~active, turns, hero.health, enemy.health)
+
+
+class BattleSolver:
+    """Exact solver for a fight between the player and an enemy template
+
+    With the enemy's stats rolled, a fight is deterministic: the enemy casts the spells its ai picks then
+    attacks. So every position (both characters' health, spell cooldowns and buffs) can be searched
+    once with memoization to find the best action. Each stat roll in the template is equally likely, so
+    the win probability is the share of rolls the player can win.
+
+    A state is (player hp, enemy hp, clock) where the clock numbers one (player cooldowns, enemy cooldowns,
+    player buff, enemy buff) and a buff is (turns left, attack bonus, defence bonus). Clocks that play out
+    the same are numbered once: cooldowns of enemy spells the ai never casts are dropped and the cooldowns
+    of copies of the same spell are sorted.
+
+    The clocks and the enemy's turns are kept for every roll. Rolls that only differ in the enemy's health
+    play out the same when the enemy has no heals and its ai ignores its health, these share their solved
+    states too.
+    """
+
+    def __init__(self, player, template, enemy_ai=None, registry=None):
+        self.player = player
+        self.template = template
+        self.player_spells = list(player.spells)
+        self.enemy_spells = list(template.spells)
+        self.enemy_ai = enemy_ai or template_ai(template, registry)
+        self.base_attack = player.attack - player.attk_buff
+        self.base_defence = player.defence - player.def_buff
+        self.spell_actions = [f"spell:{spell.id}" for spell in self.player_spells]
+
+        table = self.enemy_ai.table
+        bucket_size = 2 << len(self.enemy_spells)
+        reads_health = any(table[bucket * bucket_size:(bucket + 1) * bucket_size] != table[:bucket_size]
+                           for bucket in range(1, HP_BUCKETS))
+        self.uses_max_hp = reads_health or any(isinstance(spell, Heal) for spell in self.enemy_spells)
+        self.enemy_casts = 0  # mask of the enemy spells the ai ever casts
+        for cast in table:
+            self.enemy_casts |= cast
+        self.player_copies = self.copies(self.player_spells)
+        self.enemy_copies = self.copies(self.enemy_spells)
+
+        self.clocks = []
+        self.clock_ids = {}
+        self.attack_edges = []  # player attack bonus - enemy defence bonus in each clock
+        self.player_casts = {}  # (clock, spell index) -> the clock after casting it, or None if it can't be cast
+        self.enemy_turns = {}  # (enemy hp, clock) -> see enemy_turn
+        # set for each stat roll by set_roll
+        self.enemy_attack = 0
+        self.enemy_defence = 0
+        self.enemy_max_hp = 0
+        self.context = None
+        # the solved states of the rolls that play out like the current one
+        self.values = {}  # state -> (won, turns)
+        self.actions = {}  # state -> best action
+
+    @staticmethod
+    def copies(spells):
+        """the indices of each spell that appears more than once"""
+        indices = {}
+        for index, spell in enumerate(spells):
+            indices.setdefault(spell.id, []).append(index)
+        return [group for group in indices.values() if len(group) > 1]
+
+    @staticmethod
+    def sort_copies(cooldowns, copies):
+        """sort the cooldowns of the copies of each spell, it doesn't matter which copy is ready"""
+        cooldowns = list(cooldowns)
+        for group in copies:
+            for index, cooldown in zip(group, sorted(cooldowns[index] for index in group)):
+                cooldowns[index] = cooldown
+        return cooldowns
+
+    def clock(self, player_cds, enemy_cds, player_buff, enemy_buff):
+        """the number of a clock, numbering it if it is new"""
+        player_cds = [max(cooldown, 0) for cooldown in player_cds]
+        enemy_cds = [max(cooldown, 0) if self.enemy_casts >> index & 1 else 0
+                     for index, cooldown in enumerate(enemy_cds)]
+        if self.player_copies:
+            player_cds = self.sort_copies(player_cds, self.player_copies)
+        if self.enemy_copies:
+            enemy_cds = self.sort_copies(enemy_cds, self.enemy_copies)
+        key = (tuple(player_cds), tuple(enemy_cds), player_buff, enemy_buff)
+        clock = self.clock_ids.get(key)
+        if clock is None:
+            clock = self.clock_ids[key] = len(self.clocks)
+            self.clocks.append(key)
+            self.attack_edges.append(player_buff[1] - enemy_buff[2])
+        return clock
+
+    def roll_context(self, enemy_health, enemy_attack, enemy_defence):
+        """the part of a roll that changes how the fight plays out"""
+        return enemy_health if self.uses_max_hp else None, enemy_attack, enemy_defence
+
+    def set_roll(self, enemy_health, enemy_attack, enemy_defence):
+        """fight against a stat roll, dropping the solved states if it plays out differently to the last"""
+        context = self.roll_context(enemy_health, enemy_attack, enemy_defence)
+        if context != self.context:
+            if self.context is None or context[0] != self.context[0]:
+                self.enemy_turns = {}
+            self.context = context
+            self.values = {}
+            self.actions = {}
+        self.enemy_attack = enemy_attack
+        self.enemy_defence = enemy_defence
+        self.enemy_max_hp = enemy_health
+
+    def start_state(self, enemy_health):
+        """the state at the start of a fight"""
+        player_buff = (self.player.buff_duration, self.player.attk_buff, self.player.def_buff)
+        player_cds = [self.player.cooldown(spell) for spell in self.player_spells]
+        enemy_cds = [spell.cooldown for spell in self.enemy_spells]
+        return self.player.health, enemy_health, self.clock(player_cds, enemy_cds, player_buff, (0, 0, 0))
+
+    @staticmethod
+    def cast(spell, health, max_hp, buff):
+        """return the new (health, buff) after a spell like Character.use_spell, or None if it fails"""
+        if isinstance(spell, Buff):
+            if buff[0] != 0:
+                return None
+            duration, attack, defence = buff
+            if spell.attack > 0:
+                attack, duration = spell.attack, spell.duration
+            if spell.defence > 0:
+                defence, duration = spell.defence, spell.duration
+            return health, (duration, attack, defence)
+        if health == max_hp:
+            return None
+        return min(health + spell.health, max_hp), buff
+
+    @staticmethod
+    def end_turn(cooldowns, buff):
+        """count down the cooldowns and the buff like CombatEngine.add_turn"""
+        cooldowns = tuple(cooldown - 1 if cooldown > 0 else cooldown for cooldown in cooldowns)
+        duration = buff[0] - 1 if buff[0] > 0 else 0
+        if duration == 0:
+            return cooldowns, (0, 0, 0)
+        return cooldowns, (duration, buff[1], buff[2])
+
+    def player_cast(self, clock, index):
+        """the clock after the player casts a spell, or None if it is on cooldown or a buff is running"""
+        key = (clock, index)
+        if key not in self.player_casts:
+            player_cds, enemy_cds, player_buff, enemy_buff = self.clocks[clock]
+            spell = self.player_spells[index]
+            after = None
+            if player_cds[index] <= 0 and not (isinstance(spell, Buff) and player_buff[0] != 0):
+                if isinstance(spell, Buff):
+                    player_buff = self.cast(spell, 0, 0, player_buff)[1]
+                cooldowns = player_cds[:index] + (spell.max_cd,) + player_cds[index + 1:]
+                after = self.clock(cooldowns, enemy_cds, player_buff, enemy_buff)
+            self.player_casts[key] = after
+        return self.player_casts[key]
+
+    def enemy_turn(self, enemy_hp, clock):
+        """the enemy casts its spells and the turn ends
+
+        Returns:
+            tuple: (enemy hp, the enemy's attack bonus - the player's defence, the same when the player
+            blocked, the next clock)
+        """
+        player_cds, enemy_cds, player_buff, enemy_buff = self.clocks[clock]
+        enemy_cds = list(enemy_cds)
+        ready = sum(1 << index for index, cooldown in enumerate(enemy_cds) if cooldown <= 0)
+        cast = self.enemy_ai.table[self.enemy_ai.key(enemy_hp, self.enemy_max_hp, enemy_buff[0] > 0, ready)]
+        for index, spell in enumerate(self.enemy_spells):
+            if cast >> index & 1:  # the spell's cooldown starts even if it does nothing
+                result = self.cast(spell, enemy_hp, self.enemy_max_hp, enemy_buff)
+                if result:
+                    enemy_hp, enemy_buff = result
+                enemy_cds[index] = spell.max_cd
+
+        defence = self.base_defence + player_buff[2]
+        hit = enemy_buff[1] - defence
+        blocked_hit = enemy_buff[1] - defence * 2
+        player_cds, player_buff = self.end_turn(player_cds, player_buff)
+        enemy_cds, enemy_buff = self.end_turn(enemy_cds, enemy_buff)
+        return enemy_hp, hit, blocked_hit, self.clock(player_cds, enemy_cds, player_buff, enemy_buff)
+
+    def transitions(self, state):
+        """list every (action, result, turns) the player can take from a state
+
+        The result is the next state, "won" or "lost". Spells are free so they take no turns.
+        """
+        player_hp, enemy_hp, clock = state
+        moves = []
+
+        damage = max(self.base_attack - self.enemy_defence + self.attack_edges[clock], 0)
+        for action, hp in (("attack", enemy_hp - damage), ("block", enemy_hp)):
+            if hp <= 0:
+                moves.append((action, "won", 1))
+                continue
+            turn = self.enemy_turns.get((hp, clock))
+            if turn is None:
+                turn = self.enemy_turns[hp, clock] = self.enemy_turn(hp, clock)
+            next_hp, hit, blocked_hit, next_clock = turn
+            hp_left = player_hp - max(self.enemy_attack + (blocked_hit if action == "block" else hit), 0)
+            moves.append((action, (hp_left, next_hp, next_clock) if hp_left > 0 else "lost", 1))
+
+        for index, spell in enumerate(self.player_spells):
+            after = self.player_cast(clock, index)
+            if after is None:
+                continue
+            if isinstance(spell, Heal):
+                if player_hp == self.player.max_hp:
+                    continue
+                moves.append((self.spell_actions[index],
+                              (min(player_hp + spell.health, self.player.max_hp), enemy_hp, after), 0))
+            else:
+                moves.append((self.spell_actions[index], (player_hp, enemy_hp, after), 0))
+        return moves
+
+    def explore(self, root):
+        """map every state reachable from the root that isn't solved yet to its transitions"""
+        moves = {}
+        values = self.values
+        stack = [root]
+        while stack:
+            state = stack.pop()
+            if state in moves:
+                continue
+            moves[state] = state_moves = self.transitions(state)
+            for _, result, _ in state_moves:
+                if type(result) is tuple and result not in moves and result not in values:
+                    stack.append(result)
+        return moves
+
+    def solve_fight(self, enemy_health, enemy_attack, enemy_defence):
+        """find the best result against one stat roll
+
+        The quickest win is found by a breadth first search from the start of the fight that stops at the
+        first win, spells take no turns so they go to the front of the queue. Only a fight that can't be
+        won is solved through to find the longest loss.
+
+        Returns:
+            tuple: (won, turns), policy() gives the best action in each state.
+        """
+        self.set_roll(enemy_health, enemy_attack, enemy_defence)
+        root = self.start_state(enemy_health)
+        if root in self.values:
+            return self.values[root]
+
+        values = self.values
+        moves = {}
+        turns_to = {root: 0}
+        queue = deque([root])
+        best = None
+        while queue:
+            state = queue.popleft()
+            turns = turns_to[state]
+            if best is not None and turns >= best:
+                return True, best
+            if state not in moves:
+                moves[state] = self.transitions(state)
+            for _, result, step in moves[state]:
+                if result == "won":
+                    won_in = turns + step
+                elif result == "lost":
+                    continue
+                elif result in values:
+                    if not values[result][0]:
+                        continue
+                    won_in = turns + step + values[result][1]
+                else:
+                    if turns + step < turns_to.get(result, math.inf):
+                        turns_to[result] = turns + step
+                        if step:
+                            queue.append(result)
+                        else:
+                            queue.appendleft(result)
+                    continue
+                if best is None or won_in < best:
+                    best = won_in
+        if best is not None:
+            return True, best
+        # nothing reachable can be won, so every reachable state is in moves
+        return self.solve(root, moves)
+
+    def solve(self, root, moves=None):
+        """solve every state reachable from the root, keeping its value and best action
+
+        A state can be won if any move leads to a win, which is found backwards from the winning moves so
+        the quickest win is exact even when the fight can go round in circles. Every other state is played
+        for the longest loss, which is math.inf turns if the player can keep the fight going forever.
+
+        Returns:
+            tuple: (won, turns) from the root.
+        """
+        values = self.values
+        actions = self.actions
+        if moves is None:
+            moves = self.explore(root)
+
+        # shortest paths to a win over the reversed moves, turns are 0 or 1 per move. The states solved for
+        # an earlier roll can't reach the new ones, so their values stay exact
+        previous = {}
+        queue = []
+        for state, state_moves in moves.items():
+            for action, result, turns in state_moves:
+                if result == "won":
+                    queue.append((turns, len(queue), state, action))
+                elif result in moves:
+                    previous.setdefault(result, []).append((state, action, turns))
+                elif result != "lost" and values[result][0]:
+                    queue.append((turns + values[result][1], len(queue), state, action))
+        heapq.heapify(queue)
+        count = len(queue)
+        while queue:
+            turns, _, state, action = heapq.heappop(queue)
+            if state in values:
+                continue
+            values[state] = (True, turns)
+            actions[state] = action
+            for earlier, earlier_action, earlier_turns in previous.get(state, ()):
+                if earlier not in values:
+                    heapq.heappush(queue, (turns + earlier_turns, count, earlier, earlier_action))
+                    count += 1
+
+        # the rest only lead to losing states, a state met again on the search path is on a cycle
+        on_path = set()
+        for start in moves:
+            stack = [start]
+            # depth first search with an explicit stack so long fights don't hit the recursion limit
+            while stack:
+                state = stack[-1]
+                if state in values:
+                    stack.pop()
+                    continue
+                if state not in on_path:
+                    on_path.add(state)
+                    unsolved = [result for _, result, _ in moves[state] if result in moves
+                                and result not in values and result not in on_path]
+                    if unsolved:
+                        stack.extend(unsolved)
+                        continue
+
+                best = None
+                for action, result, turns in moves[state]:
+                    if result == "lost":
+                        value = turns
+                    elif result in on_path:
+                        value = math.inf
+                    else:
+                        value = turns + values[result][1]
+                    if best is None or value > best[1]:
+                        best = (action, value)
+                values[state] = (False, best[1])
+                actions[state] = best[0]
+                on_path.discard(state)
+                stack.pop()
+
+        return values[root]
+
+    def policy(self, enemy_health, enemy_attack, enemy_defence):
+        """map every state reachable in a fight against one stat roll to its best action"""
+        self.set_roll(enemy_health, enemy_attack, enemy_defence)
+        root = self.start_state(enemy_health)
+        if root not in self.actions:
+            self.solve(root)
+        policy = {}
+        stack = [root]
+        while stack:
+            state = stack.pop()
+            if state in policy:
+                continue
+            policy[state] = self.actions[state]
+            stack.extend(result for _, result, _ in self.transitions(state)
+                         if type(result) is tuple and result not in policy)
+        return policy
+
+    def win_probability(self):
+        """solve every stat roll in the template, the rolls that play out the same one after another
+
+        Returns:
+            tuple: (win probability, outcomes) where outcomes maps each (health, attack, defence) roll to
+            (won, turns).
+        """
+        rolls = product(range(self.template.health[0], self.template.health[1] + 1),
+                        range(self.template.attack[0], self.template.attack[1] + 1),
+                        range(self.template.defence[0], self.template.defence[1] + 1))
+        outcomes = {roll: self.solve_fight(*roll) for roll in sorted(rolls, key=lambda roll: self.roll_context(*roll))}
+        wins = sum(1 for won, _ in outcomes.values() if won)
+        return wins / len(outcomes), outcomes
+
+
+RECORDING_FILE = "session.jsonl"
+RECORDING_VERSION = 1
+# the session methods a recording is allowed to call
+SESSION_ACTIONS = {"move", "take", "fight", "combat", "buy", "sell", "sell_junk", "use_item", "discard", "equip",
+                   "unequip", "respawn"}
+
+
+class GameSession:
+    """The rules behind the game frames for one playthrough, recording every player action
+
+    All randomness comes from one random.Random seeded when the game starts, so the seed and the recorded
+    actions are enough to replay the run with replay(). The frames call these methods and only show what
+    happened. An action is only recorded once it went through, one that raises is left out of the recording.
+    """
+
+    def __init__(self, name, player_class, seed=None, registry=None, recording_file=None):
+        self.registry = registry or WORLD
+        self.name = name
+        self.player_class = player_class
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.player = new_player(name, player_class, self.registry)
+        self.actions = []
+        self.recording_file = recording_file
+        self.enemies = []
+        self.engine = None
+
+        if recording_file:
+            with open(recording_file, "w") as file:
+                file.write(json.dumps(self.header()) + "\n")
+
+    def header(self):
+        """the first line of a recording, everything needed to start the same game again"""
+        return {"version": RECORDING_VERSION, "seed": self.seed, "name": self.name,
+                "player_class": self.player_class}
+
+    def record(self, *action):
+        """keep an action and append it to the recording file so a crash still leaves the run behind"""
+        self.actions.append(list(action))
+        if self.recording_file:
+            with open(self.recording_file, "a") as file:
+                file.write(json.dumps(list(action)) + "\n")
+
+    @property
+    def location(self):
+        return self.registry.graph.get(self.player.location)
+
+    def inv_item(self, item_id):
+        """the item in the player's inventory with the id"""
+        item = self.player.inv.get(item_id)
+        if item is None:
+            raise ValueError(f"no item {item_id} in {self.player.name}'s inventory")
+        return item
+
+    def move(self, dest_id):
+        """move to a location, using up the key if it was locked
+
+        Returns:
+            tuple: (the key used or None, True if the player went up the stairs onto another floor)
+        """
+        location = self.registry.graph.get(dest_id)
+        if location is None:
+            raise ValueError(f"no location {dest_id}")
+        key = location.key
+        if key and key not in self.player.inv:
+            raise ValueError(f"{location.name} is locked and {self.player.name} has no {key.name}")
+        previous_pos = self.player.location
+        self.player.location = dest_id
+        if key:
+            self.player.inv.remove(key)
+            self.registry.graph.unlock(location.id)
+
+        floor_changed = False
+        floor_changes = [staircase for staircases in FLOOR_STAIRCASES.values() for staircase in staircases]
+        if location.id in floor_changes and previous_pos in floor_changes:
+            for floor, staircases in FLOOR_STAIRCASES.items():
+                if location.id in staircases:
+                    self.player.floor = floor
+                    floor_changed = True
+        self.record("move", dest_id)
+        return key, floor_changed
+
+    def take(self, item_id):
+        """take an item from the current location, returns its name or False if the inventory is full"""
+        taken = self.player.take_item(self.registry.index("items")[item_id], self.location)
+        self.record("take", item_id)
+        return taken
+
+    def fight(self):
+        """start a fight with every enemy at the current location, each spawned from its template"""
+        self.enemies = [spawn(template, self.rng) for template in self.location.enemy]
+        self.engine = CombatEngine(self.player, self.enemies, registry=self.registry)
+        self.record("fight")
+        return self.engine
+
+    def combat(self, action, spell_id=None, target=None):
+        """take a combat action, returns the events it caused"""
+        if self.engine is None:
+            raise ValueError("there is no fight going on")
+        spell = self.registry.index("spells")[spell_id] if spell_id is not None else None
+        already_defeated = len(self.engine.state.defeated)
+        events = self.engine.step(action, spell, target)
+        if target is not None:
+            self.record("combat", action, spell_id, target)
+        elif spell_id is not None:
+            self.record("combat", action, spell_id)
+        else:
+            self.record("combat", action)
+
+        # the player keeps the rewards of every kill, so the enemy is gone even if the fight is fled or lost
+        for enemy in self.engine.state.defeated[already_defeated:]:
+            self.location.remove_enemy(enemy)
+        if self.engine.state.outcome == "lost":
+            self.player.health = self.player.max_hp  # respawn player
+        return events
+
+    def buy(self, item_id, amount=1):
+        """buy up to amount of an item from the shop at the current location
+
+        Returns:
+            int: how many were bought, as many as the coins and the inventory allow.
+        """
+        item = self.registry.index("items")[item_id]
+        item_price = self.location.npc.shop_stock[item]
+        bought = 0
+        while bought < amount and self.player.coins >= item_price and not self.player.check_max_inv():
+            self.player.combat_take_item(item)
+            self.player.coins -= item_price
+            bought += 1
+        self.record("buy", item_id, amount)
+        return bought
+
+    def sell(self, item_id, amount=1):
+        """sell up to amount of an item from the player's inventory, returns how many were sold"""
+        item = self.inv_item(item_id)
+        sold = max(min(amount, self.sellable(item)), 0)
+        if sold:
+            self.player.inv.remove(item, sold)
+            self.player.coins += item.value * sold
+        self.record("sell", item_id, amount)
+        return sold
+
+    def sellable(self, item):
+        """how many of an item the player can sell, the copy of the equipped weapon or armour is kept"""
+        equipped = {"weapon": self.player.weapon, "armour": self.player.armour}.get(item.item_type)
+        return self.player.inv.count(item) - (item == equipped)
+
+    def junk(self):
+        """spare weapons and armour no better than what is equipped, as (item, how many) pairs"""
+        junk = []
+        for item_type, equipped, stat in (("weapon", self.player.weapon, "attack"),
+                                          ("armour", self.player.armour, "defence")):
+            if not equipped:
+                continue
+            for item in self.player.inv.of_type(item_type):
+                count = self.sellable(item)
+                if count and item.value > 0 and getattr(item, stat) <= getattr(equipped, stat):
+                    junk.append((item, count))
+        return junk
+
+    def sell_junk(self):
+        """sell all the junk at once
+
+        Returns:
+            tuple: (how many items were sold, the coins they made)
+        """
+        sold = coins = 0
+        for item, count in self.junk():
+            self.player.inv.remove(item, count)
+            sold += count
+            coins += item.value * count
+        self.player.coins += coins
+        self.record("sell_junk")
+        return sold, coins
+
+    def use_item(self, item_id):
+        self.player.use_item(self.inv_item(item_id))
+        self.record("use_item", item_id)
+
+    def discard(self, item_id):
+        self.player.remove_item(self.inv_item(item_id))
+        self.record("discard", item_id)
+
+    def equip(self, item_id):
+        equipped = self.player.equip_item(self.inv_item(item_id))
+        self.record("equip", item_id)
+        return equipped
+
+    def unequip(self, item_id):
+        unequipped = self.player.unequip_item(self.inv_item(item_id))
+        self.record("unequip", item_id)
+        return unequipped
+
+    def respawn(self):
+        """go back to the start of the first floor after dying"""
+        self.player.location = "G"
+        self.record("respawn")
+
+
+def load_recording(file_name):
+    """read a recording written by GameSession
+
+    Returns:
+        tuple: (header, actions)
+    """
+    with open(file_name, "r") as file:
+        header = json.loads(file.readline())
+        actions = [json.loads(line) for line in file if line.strip()]
+    if header.get("version") != RECORDING_VERSION:
+        raise ValueError(f"{file_name}: unsupported recording version {header.get('version')}")
+    return header, actions
+
+
+def replay(header, actions, registry=None):
+    """re-run a recording without any widgets against a fresh copy of the world
+
+    Args:
+        header (dict): the recording's seed, player name and class.
+        actions (list): the recorded actions.
+        registry (WorldRegistry): the world to play in, a new one is loaded from the snapshot by default
+            because the run changes the locations.
+
+    Returns:
+        GameSession: the session after the last action.
+    """
+    if registry is None:
+        registry = WorldRegistry()
+        registry.load_or_compile()
+    session = GameSession(header["name"], header["player_class"], header["seed"], registry)
+    for action, *args in actions:
+        if action not in SESSION_ACTIONS:
+            raise ValueError(f"unknown recorded action '{action}'")
+        getattr(session, action)(*args)
+    return session
+
+
+# all items, enemies, spells, npcs, and locations are loaded from file the first time they're used
+WORLD = WorldRegistry()
+ALL_ITEMS = LazyTable(WORLD, "items")
+ALL_SPELLS = LazyTable(WORLD, "spells")
+ALL_ENEMIES = LazyTable(WORLD, "enemies")
+ALL_NPCS = LazyTable(WORLD, "npcs")
+LOCATIONS = LazyTable(WORLD, "locations")
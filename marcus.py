@@ -8,941 +8,74 @@ Author: Marcus Demafeliz
 Date: 30 March 2024
 """
 
-import sys
 import tkinter as tk
 import ttkbootstrap as tb
 from tkinter import ttk
-from itertools import islice, chain
-import random
-import math
-import json
+from itertools import chain
+from collections import namedtuple, deque
 
+from game import WORLD, RECORDING_FILE, GameSession, Buff, Heal, Shop
 
-class Character:
-    """Character class that represents the player and enemy stats
-    """
-
-    def __init__(self, name, level, xp, health, attack, defence, coins, inv, max_hp, spells):
-        self._name = name
-        self._level = int(level)
-        self._xp = int(xp)
-        self._health = int(health)
-        self._max_hp = int(max_hp)
-        self._attack = int(attack)
-        self._defence = int(defence)
-        self._coins = int(coins)
-        self._inv = inv
-        self._spells = spells
-        self._block = False
-        self._buff_duration = 0
-
-        self.attk_buff = 0
-        self.def_buff = 0
-
-    @property
-    def block(self):
-        return self._block
-
-    @property
-    def buff_duration(self):
-        return int(self._buff_duration)
-
-    @buff_duration.setter
-    def buff_duration(self, new_buff_duration):
-        self._buff_duration = new_buff_duration
-
-    def is_alive(self):
-        """checks if character is still alive"""
-        return self._health > 0
-
-    def take_damage(self, raw_damage):
-        """takes damage calculating raw_damage - defence"""
-        defence = self._defence
-        if self._block:
-            defence = self._defence * 2
-        realised_damage = raw_damage - defence
-        math.ceil(realised_damage)
-        if realised_damage < 0:
-            realised_damage = 0
-        self._health -= realised_damage
-        return realised_damage
-
-    def action_block(self):
-        if not self._block:
-            self._block = True
-        else:
-            self._block = False
-
-    def get_coins(self, coins):
-        """add coins"""
-        self._coins += coins
-
-    def get_xp(self, xp):
-        """add xp"""
-        self._xp += xp
-        if self._xp >= self.xp_required():
-            self.level_up()
-            return True
-
-    def level_up(self):
-        """level up character if xp meets threshold"""
-        self._xp = self._xp - self.xp_required()
-        self._level += 1
-        self._attack += 2
-        self._defence += 1
-        if self._level % 5 == 0:
-            self._max_hp += 20
-
-    def xp_required(self):
-        """calculates the amount of xp required for level up"""
-        if self._level == 1:
-            xp_required = 1
-        else:
-            xp_required = 30 + (self._level * 10)  # increase threshold depending on current level
-        return int(xp_required)
-
-    def link_spells(self):
-        """link item id to item object"""
-        new_spell_list = []
-        for i in range(len(ALL_SPELLS)):
-            for spell_id in self._spells:
-                if spell_id == ALL_SPELLS[i].id:
-                    new_spell_list.append(ALL_SPELLS[i])
-
-        self._spells = new_spell_list
-
-    def use_spell(self, spell):
-        """uses the spell and updates character stats depending on the spell type"""
-        if isinstance(spell, Buff):
-            if self._buff_duration == 0:
-                # set buff durations and buff amount
-                if spell.attack > 0:
-                    self._attack += spell.attack
-                    self._buff_duration = spell.duration
-                    self.attk_buff = spell.attack
-                if spell.defence > 0:
-                    self._defence += spell.defence
-                    self._buff_duration = spell.duration
-                    self.def_buff = spell.defence
-            else:
-                return False
-        # if heal add heal amount to current health
-        elif isinstance(spell, Heal):
-            if self._health != self._max_hp:
-                old_health = self._health
-                self._health += spell.health
-                if self._health > self._max_hp:
-                    self._health = self._max_hp
-                print(f"Healed {self._health - old_health} health!")
-            else:
-                print("Already max health!")
-                return False
-        return True
-
-    def revert_spell(self):
-        """revert spell effects"""
-        self._attack -= self.attk_buff
-        self._defence -= self.def_buff
-        self.attk_buff = 0
-        self.def_buff = 0
-
-
-class Player(Character):
-    """Player class that represents the player character"""
-
-    def __init__(self, name, level, xp, health, attack, defence, location, coins, inv, weapon, armour, spells, floor,
-                 max_hp=20):
-        super().__init__(name, level, xp, health, attack, defence, coins, inv, max_hp, spells)
-
-        self._weapon = weapon
-        self._armour = armour
-        self._location = location
-        self.max_inv_size = 9
-        self._floor = floor
-
-    @property
-    def name(self):
-        return self._name
-
-    @name.setter
-    def name(self, new_name):
-        self._name = new_name
-
-    @property
-    def level(self):
-        return self._level
-
-    @property
-    def xp(self):
-        return self._xp
-
-    @property
-    def health(self):
-        return self._health
-
-    @health.setter
-    def health(self, new_health):
-        self._health = new_health
-
-    @property
-    def attack(self):
-        return self._attack
-
-    @attack.setter
-    def attack(self, new_attack):
-        self._attack = new_attack
-
-    @property
-    def defence(self):
-        return self._defence
-
-    @defence.setter
-    def defence(self, new_defence):
-        self._defence = new_defence
-
-    @property
-    def location(self):
-        return self._location
-
-    @location.setter
-    def location(self, new_location):
-        self._location = new_location
-
-    @property
-    def coins(self):
-        return self._coins
-
-    @coins.setter
-    def coins(self, new_coins):
-        self._coins = new_coins
-
-    @property
-    def inv(self):
-        return self._inv
-
-    @inv.setter
-    def inv(self, new_inv):
-        self._inv = new_inv
-
-    @property
-    def weapon(self):
-        return self._weapon
-
-    @weapon.setter
-    def weapon(self, new_weapon):
-        self._weapon = new_weapon
-
-    @property
-    def armour(self):
-        return self._armour
-
-    @armour.setter
-    def armour(self, new_armour):
-        self._armour = new_armour
-
-    @property
-    def spells(self):
-        return self._spells
-
-    @spells.setter
-    def spells(self, new_spells):
-        self._spells = new_spells
-
-    @property
-    def max_hp(self):
-        return self._max_hp
-
-    @max_hp.setter
-    def max_hp(self, new_max_hp):
-        self._max_hp = new_max_hp
-
-    @property
-    def floor(self):
-        return self._floor
-
-    @floor.setter
-    def floor(self, new_floor):
-        self._floor = new_floor
-
-    def current_location(self):
-        """take the current location and return it as an object from the locations list."""
-        for loc in LOCATIONS:
-            if loc.id == self._location:
-                return loc
-
-    def check_max_inv(self):
-        """checks if player is over the max inventory size"""
-        consumable_list = [item.name for item in self._inv if isinstance(item, Consumable)]
-        other_item_list = [item.name for item in self._inv if not isinstance(item, Consumable)]
-        consumable_list = set(consumable_list)
-        inv_size = len(consumable_list) + len(other_item_list)
-        if inv_size > self.max_inv_size:
-            return True
-        else:
-            return False
-
-    def take_item(self, item, location):
-        """take item and add to player inventory"""
-        if not self.check_max_inv():
-            items_in_loc = location.item
-            if item in items_in_loc:
-                item = item
-            add_item = item
-            self._inv.append(add_item)
-            print(f"Successfully added {add_item.name} to inventory!")
-            location.item.remove(item)
-            return add_item.name
-        return False
-
-    def combat_take_item(self, item):
-        """take item from enemy inv"""
-        self._inv.append(item)
-        print(f"Successfully added {item.name} to inventory!")
-
-    def heal(self, healing):
-        """heals the player based on certain amount of health prevent overhealing"""
-        if self._health == self._max_hp:
-            print("Already max health!")
-            return False
-        old_health = self._health
-        self._health += healing
-        if self._health > self._max_hp:
-            self.health = self._max_hp
-        print(f"Healed {self._health - old_health} health!")
-
-    def use_item(self, item):
-        """use item in player inv - only consumable type"""
-        print(f"Used {item.name}")
-        self._attack += item.attack
-        self._defence += item.defence
-        self.heal(item.health)
-        self._inv.remove(item)
-
-    def unequip_item(self, item):
-        """unequip item from inventory"""
-        if isinstance(item, Weapon) and self._weapon:
-            self._attack -= item.attack
-            self._weapon = None
-            print(f"Successfully unequipped {item.name}!")
-            return True
-        elif isinstance(item, Armour):
-            self._defence -= item.defence
-            self._armour = None
-            print(f"Successfully unequipped {item.name}!")
-            return True
-        else:
-            print(f"Item {item.name} cannot be unequipped!")
-            return False
-
-    def remove_item(self, item):
-        """unequip item from inventory"""
-        self._inv.remove(item)
-
-    def equip_item(self, item):
-        """equips item and change player attributes"""
-        if isinstance(item, Weapon) and not self._weapon:
-            self._attack += item.attack
-            self._weapon = item
-            print(f"Successfully equipped {item.name}!")
-            return True
-        elif isinstance(item, Armour):
-            self._defence += item.defence
-            self._armour = item
-        else:
-            print(f"Item {item.name} cannot be equipped!")
-            return False
-
-
-class Enemy(Character):
-    """Enemy class that represents the enemy character"""
-
-    def __init__(self, enemy_id, name, level, xp, health, attack, defence, coins, inv, max_hp, spells, boss):
-        super().__init__(name, level, xp, health, attack, defence, coins, inv, max_hp, spells)
-        self._id = int(enemy_id)
-        self._boss = boss
-
-    @property
-    def id(self):
-        return self._id
-
-    @property
-    def name(self):
-        return self._name
-
-    @name.setter
-    def name(self, new_name):
-        self._name = new_name
-
-    @property
-    def level(self):
-        return self._level
-
-    @level.setter
-    def level(self, new_level):
-        self._level = new_level
-
-    @property
-    def xp(self):
-        return self._xp
-
-    @xp.setter
-    def xp(self, new_xp):
-        self._xp = new_xp
-
-    @property
-    def health(self):
-        return self._health
-
-    @health.setter
-    def health(self, new_health):
-        self._health = new_health
-
-    @property
-    def attack(self):
-        return self._attack
-
-    @attack.setter
-    def attack(self, new_attack):
-        self._attack = new_attack
-
-    @property
-    def defence(self):
-        return self._defence
-
-    @defence.setter
-    def defence(self, new_defence):
-        self._defence = new_defence
-
-    @property
-    def coins(self):
-        return self._coins
-
-    @coins.setter
-    def coins(self, new_coins):
-        self._coins = new_coins
-
-    @property
-    def inv(self):
-        return self._inv
-
-    @inv.setter
-    def inv(self, new_inv):
-        self._inv = new_inv
-
-    @property
-    def max_hp(self):
-        return self._max_hp
-
-    @max_hp.setter
-    def max_hp(self, new_max_hp):
-        self._max_hp = new_max_hp
-
-    @property
-    def spells(self):
-        return self._spells
-
-    @spells.setter
-    def spells(self, new_spells):
-        self._spells = new_spells
-
-    @property
-    def boss(self):
-        return self._boss
-
-    @boss.setter
-    def boss(self, new_boss):
-        self._boss = new_boss
-
-    @classmethod
-    def generate_from_file(cls, in_file):
-        """ generate enemies from enemy.csv file """
-        with open(in_file, 'r') as enemies:
-            for enemy in enemies:
-                data = enemy.strip().split(',')
-
-                enemy_id = data[0].strip()
-                enemy_name = data[1].strip()
-                enemy_level = data[2].strip()
-
-                # randomises enemy stats depending on the range supplied by the enemy.txt file
-                xp_range = data[3].strip().split('(')[1].split(')')[0].split('-')
-                min_xp = int(xp_range[0].strip())
-                max_xp = int(xp_range[1].strip())
-                enemy_xp = random.randint(min_xp, max_xp)
-
-                health_range = data[4].strip().split('(')[1].split(')')[0].split('-')
-                min_health = int(health_range[0].strip())
-                max_health = int(health_range[1].strip())
-                enemy_health = random.randint(min_health, max_health)
-
-                attack_range = data[5].strip().split('(')[1].split(')')[0].split('-')
-                min_attack = int(attack_range[0].strip())
-                max_attack = int(attack_range[1].strip())
-                enemy_attack = random.randint(min_attack, max_attack)
-
-                defence_range = data[6].strip().split('(')[1].split(')')[0].split('-')
-                min_defence = int(defence_range[0].strip())
-                max_defence = int(defence_range[1].strip())
-                enemy_defence = random.randint(min_defence, max_defence)
-
-                coins_range = data[7].strip().split('(')[1].split(')')[0].split('-')
-                min_coins = int(coins_range[0].strip())
-                max_coins = int(coins_range[1].strip())
-                enemy_coins = random.randint(min_coins, max_coins)
-
-                # puts all the items into enemy inventory
-                enemy_inv = [item.strip() for item in data[8].strip().split(';')]
-
-                # uses the item_id to link with item object then append to enemy inventory
-                new_item_list = []
-                for i in range(len(ALL_ITEMS)):
-                    for item_id in enemy_inv:
-                        if int(item_id) == ALL_ITEMS[i].id:
-                            new_item_list.append(ALL_ITEMS[i])
-
-                enemy_inv = new_item_list
-
-                # gets the chance of getting an item from an enemy
-                enemy_chance = data[9].strip()
-
-                # uses the spell_id to link with spell object then append to the enemy spells
-                enemy_spells = [item.strip() for item in data[10].strip().split(';')]
-                new_spell_list = []
-                for i in range(len(ALL_SPELLS)):
-                    for spell_id in enemy_spells:
-                        if int(spell_id) == ALL_SPELLS[i].id:
-                            new_spell_list.append(ALL_SPELLS[i])
-
-                enemy_spells = new_spell_list
-
-                enemy_boss = data[11].strip()
-                if int(enemy_boss) == 1:  # checks if enemy is boss
-                    enemy_boss = True
-                else:
-                    enemy_boss = False
-
-                # random number generator if player can get item from enemy inventory
-                if random.randint(1, int(enemy_chance)) == 1:
-                    enemy_inv = random.choice(enemy_inv)
-                else:
-                    enemy_inv = None
-
-                # returns the Enemy object one at a time
-                yield Enemy(enemy_id, enemy_name, enemy_level, enemy_xp, enemy_health, enemy_attack, enemy_defence,
-                            enemy_coins, enemy_inv, enemy_health, enemy_spells, enemy_boss)
-
-
-class Spells:
-    """A class representing the spells in the game"""
-
-    def __init__(self, spell_id, name, description, cooldown, max_cd):
-        self.id = int(spell_id)
-        self.name = name
-        self.description = description
-        self._cooldown = int(cooldown)
-        self._max_cd = int(max_cd)
-
-    @property
-    def cooldown(self):
-        return self._cooldown
-
-    @cooldown.setter
-    def cooldown(self, new_cooldown):
-        self._cooldown = new_cooldown
-
-    @property
-    def max_cd(self):
-        return self._max_cd
-
-    @max_cd.setter
-    def max_cd(self, new_max_cd):
-        self.max_cd = new_max_cd
-
-
-class Buff(Spells):
-    """A class representing the buffs in the game inherited from the spells"""
-
-    def __init__(self, spell_id, name, description, cooldown, attack, defence, duration, max_cd):
-        super().__init__(spell_id, name, description, cooldown, max_cd)
-        self.attack = int(attack)
-        self.defence = int(defence)
-        self.duration = int(duration)
-
-    @classmethod
-    def generate_from_file(cls, in_file):
-        """ generate spells from spells.txt file """
-        with open(in_file, 'r') as buffs:
-            for buff in islice(buffs, 0, 3):
-                yield Buff(*buff.strip().split(","))
-
-
-class Heal(Spells):
-    """A class representing heal spells"""
-
-    def __init__(self, spell_id, name, description, cooldown, health, max_cd):
-        super().__init__(spell_id, name, description, cooldown, max_cd)
-        self.health = int(health)
-
-    @classmethod
-    def generate_from_file(cls, in_file):
-        """ generate spells from spells.txt file """
-        with open(in_file, 'r') as heals:
-            for heal in islice(heals, 4, 7):
-                yield Heal(*heal.strip().split(","))
-
-
-class Item:
-    """A class representing the items in the game"""
-
-    def __init__(self, item_id, name, desc, value):
-        self.id = int(item_id)
-        self.name = name
-        self.desc = desc
-        self.value = int(value)
-
-    def get_item_type(self):
-        """return the item type"""
-        if isinstance(self, Weapon):
-            return "weapon"
-        elif isinstance(self, Armour):
-            return "armour"
-        elif isinstance(self, Consumable):
-            return "consumable"
-        elif isinstance(self, Key):
-            return "key"
-
-
-class Consumable(Item):
-    """A class inheriting the item class to represent the consumable items in the game"""
-
-    def __init__(self, item_id, name, desc, value, attack, defence, health):
-        super().__init__(item_id, name, desc, value)
-        self.attack = int(attack)
-        self.defence = int(defence)
-        self.health = int(health)
-
-    @classmethod
-    def generate_from_file(cls, in_file):
-        """ generate items from items.txt file """
-        with open(in_file, 'r') as consumables:
-            for consumable in islice(consumables, 4, 5):
-                yield Consumable(*consumable.strip().split(","))
-
-
-class Weapon(Item):
-    """A class inheriting the item class to represent the weapons in the game"""
-
-    def __init__(self, item_id, name, desc, value, attack):
-        super().__init__(item_id, name, desc, value)
-        self.attack = int(attack)
-
-    @classmethod
-    def generate_from_file(cls, in_file):
-        """ generate items from items.txt file """
-        with open(in_file, 'r') as weapons:
-            for weapon in islice(weapons, 0, 4):
-                yield Weapon(*weapon.strip().split(","))
-
-
-class Armour(Item):
-    """A class inheriting the item class to represent the armour in the game"""
-
-    def __init__(self, item_id, name, desc, value, defence):
-        super().__init__(item_id, name, desc, value)
-        self.defence = int(defence)
-
-    @classmethod
-    def generate_from_file(cls, in_file):
-        """ generate items from items.txt file """
-        with open(in_file, 'r') as armours:
-            for armour in islice(armours, 8, 10):
-                yield Armour(*armour.strip().split(","))
-
-
-class Key(Item):
-    """A class inheriting the item class to represent the keys in the game"""
-
-    def __init__(self, item_id, name, desc, value):
-        super().__init__(item_id, name, desc, value)
-
-    @classmethod
-    def generate_from_file(cls, in_file):
-        """ generate items from items.txt file """
-        with open(in_file, 'r') as keys:
-            for key in islice(keys, 5, 8):
-                yield Key(*key.strip().split(","))
-
-
-class Location:
-    """A class representing the locations in the game
-    """
-
-    def __init__(self, location_id, name, desc, dest, npc, enemy, item, key):
-        self._id = location_id
-        self._name = name
-        self._desc = desc
-        self._dest = dest
-        self._npc = npc
-        self._enemy = enemy
-        self._item = item
-        self._key = key
-        # link ids to their respective objects
-        self.link_npc()
-
-    @property
-    def id(self):
-        return self._id
-
-    @id.setter
-    def id(self, new_id):
-        self._id = new_id
-
-    @property
-    def name(self):
-        return self._name
-
-    @name.setter
-    def name(self, new_name):
-        self._name = new_name
-
-    @property
-    def desc(self):
-        return self._desc
-
-    @desc.setter
-    def desc(self, new_desc):
-        self._desc = new_desc
-
-    @property
-    def dest(self):
-        return self._dest
-
-    @dest.setter
-    def dest(self, new_dest):
-        self._dest = new_dest
-
-    @property
-    def npc(self):
-        return self._npc
-
-    @npc.setter
-    def npc(self, new_npc):
-        self._npc = new_npc
-
-    @property
-    def item(self):
-        return self._item
-
-    @item.setter
-    def item(self, new_item):
-        self._item = new_item
-
-    @item.deleter
-    def item(self):
-        del self._item
-
-    @property
-    def enemy(self):
-        return self._enemy
-
-    @enemy.setter
-    def enemy(self, new_enemy):
-        self._enemy = new_enemy
-
-    @property
-    def key(self):
-        return self._key
-
-    @key.setter
-    def key(self, new_key):
-        self._key = new_key
-
-    def link_npc(self):
-        """link npc name to npc object"""
-        for npc in ALL_NPCS:
-            if npc.name == self._npc:
-                self._npc = npc
-
-    def check_npc(self):
-        """Check if the current location has a non-player character.
-
-        Returns:
-            bool: True if the location has a non-player character, False otherwise.
-        """
-        if self._npc:
-            return True
-        return False
-
-    def check_item(self):
-        """Check if the current location has an item.
-
-        Returns:
-            bool: True if the location has an item, False otherwise.
-        """
-        if self._item:
-            return len(self._item)
-        return False
-
-    def check_enemy(self):
-        """Check if the current location has an item.
-
-        Returns:
-            bool: True if the location has an item, False otherwise.
-        """
-        if self._enemy:
-            return True
-        return False
-
-    def link_dest(self):
-        """Maps the destinations to their location objects"""
-        new_dest_list = []
-        for i in range(len(LOCATIONS)):
-            for location_name in self._dest:
-                if location_name == LOCATIONS[i].id:
-                    new_dest_list.append(LOCATIONS[i])
-        self._dest = new_dest_list
-
-    @staticmethod
-    def parse_location_data(line):
-        """Split the line into individual values"""
-        parts = line.strip().split(',')
-        # Extract values for each argument
-        location_id = parts[0].strip('"')
-        name = parts[1].strip('"')
-        desc = parts[2].strip('"')
-        dest = parts[3].strip('[]').split('-')
-        npc = parts[4].strip('"')
-        enemy = parts[5].strip('[]')
-        new_enemy_list = []
-        # link enemy id to enemy
-        for i in range(len(ALL_ENEMIES)):
-            for enemy_id in enemy:
-                if int(enemy_id) == ALL_ENEMIES[i].id:
-                    new_enemy_list.append(ALL_ENEMIES[i])
-        enemy = new_enemy_list
-        item = parts[6].strip('[]').split('-')
-        key = parts[7].strip('"')
-
-        if "False" in item:
-            item = None
-        else:
-            # link item id to item object
-            new_item_list = []
-            for i in range(len(ALL_ITEMS)):
-                for item_id in item:
-                    if int(item_id) == ALL_ITEMS[i].id:
-                        new_item_list.append(ALL_ITEMS[i])
-            item = new_item_list
-
-        new_key = None
-        if key == "False":
-            new_key = None
-        else:
-            for i in range(len(ALL_ITEMS)):
-                if int(key) == ALL_ITEMS[i].id:
-                    new_key = ALL_ITEMS[i]
-
-        # Return a dictionary with the extracted values
-        return {
-            "location_id": location_id,
-            "name": name,
-            "desc": desc,
-            "dest": dest,
-            "npc": npc,
-            "enemy": enemy,
-            "item": item,
-            "key": new_key
-        }
-
-    @classmethod
-    def generate_from_file(cls, file_name):
-        with open(file_name, 'r') as file:
-            for line in file:
-                # Parse each line to extract the values
-                location_data = cls.parse_location_data(line)
-                yield Location(**location_data)
-                # Append the extracted data to LOC_LIST
-
-    @staticmethod
-    def dest_locked(dest):
-        """checks if destination is locked"""
-        for location in LOCATIONS:
-            if location.id == dest:
-                if location.key:
-                    return location.key
-        return False
-
-    def print_location_info(self, dests):
-        """Print the location information, including name, description, and possible destinations.
 
-        Args:
-            dests (list): A list of destinations.
+LogEntry = namedtuple("LogEntry", "kind text")
 
-        Returns:
-            str: The formatted location information.
-        """
+# messages kept by each info log, the text box scrolls back this far
+LOG_SIZE = 200
 
-        dest_list_names = [dest.name for dest in dests if not dest.key]
-        locked_loc_names = [dest.name for dest in dests if dest.key]  # compile a list of dest that are locked
 
-        dest = ", ".join(dest_list_names)
+class InfoLog:
+    """Bounded log behind an info text box
 
-        prompt = f"\nYou moved to {self.name}.\n{self.desc}\nYou can move to {dest}.\n"
-        # prints the locations that are locked
-        if locked_loc_names:
-            lock_dest = ", ".join(locked_loc_names)
-            prompt = prompt + f"{lock_dest} is locked!\n"
-        if self.check_npc():
-            prompt = prompt + "Someone is waving at you!\n"
-        if self.check_item():
-            prompt = prompt + "There is an item here!\n"
-        if self.check_enemy():
-            prompt = prompt + "You sense an evil presence!\n"
-        return prompt
-
-
-class NPC:
-    """NPC class that represents the non-player characters in the game
+    Messages are kept in a ring buffer of LogEntry and the text box shows exactly what is in the buffer,
+    each message tagged with its kind. Everything written during one action is shown in one update once Tk
+    is idle: the messages the buffer pushed out are cut from the top and the new ones added at the bottom.
     """
 
-    def __init__(self, name, dialogue_tree):
-        """
-        Initializes an instance of the NPC class.
-        """
-        self.name = name
-        self.dialogue_tree = dialogue_tree
-
-    @classmethod
-    def generate_from_file(cls, filename):
-        with open(filename, "r") as file:
-            dialogue_tree = json.load(file)
-            for npc_name, dialogue_tree in dialogue_tree.items():
-                yield NPC(npc_name, dialogue_tree)
-
-
-class Shop(NPC):
-    """Initializes an instance of the Shop class which inherits from npc"""
-
-    def __init__(self, name, dialogue_tree, shop_stock):
-        super().__init__(name, dialogue_tree)
-        self.name = name
-        self.dialogue_tree = dialogue_tree
-        self.shop_stock = shop_stock
-
-    @classmethod
-    def generate_from_file(cls, filename):
-        with open(filename, "r") as file:
-            dialogue_tree = json.load(file)
-            npc_dialogue = random.choice(["We have great items!", "Welcome!", "I hope you have money"])
-            for npc_name, shop_stock in dialogue_tree.items():
-                # link the item_ids to their respective item classes
-                linked_shop_stock = dict()
-                for str_item_id, item_price in shop_stock.items():
-                    item_id = int(str_item_id)
-                    for i in range(len(ALL_ITEMS)):
-                        if item_id == ALL_ITEMS[i].id:
-                            linked_shop_stock[ALL_ITEMS[i]] = item_price
-                yield Shop(npc_name, npc_dialogue, linked_shop_stock)
+    def __init__(self, widget, size=LOG_SIZE):
+        self.widget = widget
+        self.entries = deque(maxlen=size)
+        self._shown = 0  # entries at the start of the buffer that are already in the text box
+        self._dropped = 0  # characters at the top of the text box whose entries left the buffer
+        self._scheduled = False
+
+    def write(self, text, kind="info"):
+        """add a message, it is shown on the next flush"""
+        if len(self.entries) == self.entries.maxlen and self._shown:
+            self._shown -= 1
+            self._dropped += len(self.entries[0].text)
+        self.entries.append(LogEntry(kind, text))
+        if not self._scheduled:
+            self._scheduled = True
+            self.widget.after_idle(self.flush)
+
+    def clear(self):
+        """forget every message and empty the text box"""
+        self.entries.clear()
+        self._shown = self._dropped = 0
+        self.widget.config(state="normal")
+        self.widget.delete("1.0", tk.END)
+        self.widget.config(state="disabled")
+
+    def flush(self):
+        """bring the text box up to date with the buffer in one update"""
+        self._scheduled = False
+        if self._shown == len(self.entries) or not self.widget.winfo_exists():
+            return
+        new = [(entry.text, entry.kind) for entry in list(self.entries)[self._shown:]]
+        self._shown = len(self.entries)
+
+        self.widget.config(state="normal")
+        if self._dropped:
+            self.widget.delete("1.0", f"1.0 + {self._dropped} chars")
+            self._dropped = 0
+        self.widget.insert(tk.END, *chain.from_iterable(new))
+        self.widget.config(state="disabled")
+        self.widget.see("end")  # automatically goes to bottom
+
+
+# frames that are kept once built and refreshed when shown again, and how many frames back can go
+CACHED_FRAMES = {"Menu", "Inventory", "Store", "CombatScreen"}
+HISTORY_SIZE = 10
 
 
 class App(tk.Tk):
@@ -951,7 +84,9 @@ class App(tk.Tk):
     def __init__(self):
         super().__init__()
         self.player = None
-        self.previous_frame = ["MainMenu"]
+        self.session = None
+        self.frames = {}  # cached frames by name
+        self.history = deque(maxlen=HISTORY_SIZE)  # the frames shown before this one, for going back
 
         self.style = tb.Style(theme="darkly")
         self.geometry("1200x800")
@@ -963,46 +98,143 @@ class App(tk.Tk):
 
         self.frame_name = None
         self._frame = None
-        self.statusbar = None
+        self.statusbar = StatusBar(self)
 
         self.switch_frame(MainMenu)
 
-    def switch_frame(self, frame_class):
-        """Destroys current frame and replaces it with a new one."""
-        new_frame = frame_class(self)
-        if self._frame is not None:
-            self.save_info()
-            self._frame.destroy()
+    def switch_frame(self, frame_class, remember=True):
+        """Show a frame, raising and refreshing it if it is cached instead of building it again."""
+        old_frame = self._frame
+        name = frame_class.__name__
+        if name in self.frames:
+            new_frame = self.frames[name]
+            new_frame.refresh()
+        else:
+            new_frame = frame_class(self)
+            if name in CACHED_FRAMES:
+                self.frames[name] = new_frame
+                if name == "Menu":
+                    self.open_info()
+
+        if old_frame is not None and old_frame is not new_frame:
+            if remember:
+                self.history.append(type(old_frame))
+            if old_frame in self.frames.values():
+                old_frame.grid_remove()  # hidden so it can't be clicked under the next frame, kept to show again
+            else:
+                old_frame.destroy()
         self._frame = new_frame
-        self.frame_name = frame_class.__name__  # set the frame name to the frame class name to be used later
-        self._frame.grid()
-        self.open_info()
-        self.statusbar = StatusBar(self)
+        self.frame_name = name  # set the frame name to the frame class name to be used later
+        # every frame shows in the same cell, whether it just gridded itself, never did, or was hidden
+        self._frame.grid(row=1, column=0, sticky="nsew")
+        self._frame.tkraise()
+        self.statusbar.refresh()
 
-    def save_info(self):
-        """save text in info box"""
-        if self.frame_name == "Menu":
-            text_file = open("infosave.txt", "w")
-            text_file.write(self._frame.info.get(1.0, tk.END))
-            text_file.close()
+    def back(self):
+        """go back to the frame shown before this one"""
+        self.switch_frame(self.history.pop() if self.history else Menu, remember=False)
 
     def open_info(self):
-        """open_info"""
-        if self.frame_name == "Menu":
-            text_file = open("infosave.txt", "r")
-            content = text_file.read()
-            self._frame.info.config(state="normal")
-            self._frame.info.insert(1.0, content)
-            self._frame.info.config(state="disabled")
-            self._frame.info.see("end")
+        """show the messages saved before the menu was built"""
+        text_file = open("infosave.txt", "r")
+        content = text_file.read()
+        text_file.close()
+        if content:
+            self.frames["Menu"].log.write(content, "saved")
+
+    def update_info_widget(self, text):
+        """update the info widget in Menu, saving the message until the menu is built"""
+        if "Menu" in self.frames:
+            self.frames["Menu"].update_info(f"{text}\n")
+        else:
+            text_file = open("infosave.txt", "a")
+            text_file.write(f"{text}\n")
             text_file.close()
 
-    @staticmethod
-    def update_info_widget(text):
-        """update the info widget in Menu"""
-        text_file = open("infosave.txt", "a")
-        text_file.write(f"{text}\n")
-        text_file.close()
+
+class InventoryView:
+    """The order of the cells in the inventory grid, over the player's ItemBag
+
+    Consumables with the same name share one cell and every other item gets a cell for each one carried, in
+    the order the bag holds them. The view only keeps the item shown in each cell, how many a cell stands
+    for is read from the bag, so remove() is called after the bag changed and only drops a cell that ran out.
+    """
+
+    def __init__(self, bag):
+        self.bag = bag
+        self.items = []
+        shown = set()
+        for item, count in bag.counts():
+            if item.item_type != "consumable":
+                self.items.extend([item] * count)
+            elif item.name not in shown:
+                shown.add(item.name)
+                self.items.append(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def count(self, item):
+        """how many of the item its cell stands for"""
+        return self.bag.stack(item.name) if item.item_type == "consumable" else 1
+
+    def remove(self, item):
+        """drop the cell of an item taken out of the bag, returns its index if it ran out, None otherwise"""
+        if item.item_type == "consumable":
+            if self.bag.stack(item.name):
+                return None
+            index = next(i for i, shown in enumerate(self.items) if shown.name == item.name)
+        else:
+            index = next(i for i, shown in enumerate(self.items) if shown.id == item.id)
+        del self.items[index]
+        return index
+
+
+InventoryCell = namedtuple("InventoryCell", "name desc value button style state action")
+
+# the inventory grid is this many cells wide, and only this many rows have widgets at a time
+INVENTORY_COLUMNS = 3
+INVENTORY_ROWS = 3
+
+
+class ItemCell:
+    """The widgets for one cell of the inventory grid
+
+    update() takes an InventoryCell and only reconfigures the widgets whose text or button changed. The
+    button calls handler with the action of the current spec, so its command never needs rebinding.
+    """
+
+    def __init__(self, parent, handler):
+        self.frame = ttk.Frame(parent)
+        self.name = ttk.Label(self.frame, style="success.TLabel", justify="left", font="Helvetica 18")
+        self.desc = ttk.Label(self.frame, style="info.TLabel", justify="left", font="Helvetica 12")
+        self.value = ttk.Label(self.frame, style="primary.TLabel", justify="left", font="Helvetica 12")
+        self.button = ttk.Button(self.frame, command=lambda: handler(self.spec.action))
+        for label in (self.name, self.desc, self.value):
+            label.pack()
+        self.spec = None
+
+    def update(self, spec):
+        """show the spec, leaving alone whatever is already on screen"""
+        old_spec = self.spec
+        for option in ("name", "desc", "value"):
+            if old_spec is None or getattr(old_spec, option) != getattr(spec, option):
+                getattr(self, option).config(text=getattr(spec, option))
+
+        if spec.button is None:
+            self.button.pack_forget()
+        else:
+            changes = {option: getattr(spec, field) for option, field in
+                       (("text", "button"), ("style", "style"), ("state", "state"))
+                       if old_spec is None or getattr(old_spec, field) != getattr(spec, field)}
+            if changes:
+                self.button.config(**changes)
+            if old_spec is None or old_spec.button is None:
+                self.button.pack(pady=(5, 0))
+        self.spec = spec
+
+    def destroy(self):
+        self.frame.destroy()
 
 
 class Inventory(ttk.Frame):
@@ -1023,22 +255,19 @@ class Inventory(ttk.Frame):
         self.equipped_weapon = None
         self.equipped_armour = None
         self.skills = None
-        self.item_name = None
-        self.item_desc = None
-        self.item_attack = None
-        self.item_health = None
-        self.equip_button = None
-        self.unequip_button = None
-        self.use_button = None
-        self.item_value = None
         self.no_item_msg = None
-        self.destroy_item_button = None
+        self.up_button = None
+        self.down_button = None
         self.spells_list = [spell.name for spell in self.player.spells]
         self.spell = ", ".join(self.spells_list)
-        self.item_widget = []
-        self.cons_list = [item.name for item in self.player.inv if isinstance(item, Consumable)]
+
+        # only the visible rows of the grid have widgets, first_row is the row shown at the top
+        self.view = InventoryView(self.player.inv)
+        self.cells = []
+        self.first_row = 0
         self.create_widgets()
-        self.create_item_widget()
+        self.show_cells()
+        self.update_widgets()
 
     def create_widgets(self):
         """ create widgets for the inventory frame """
@@ -1078,164 +307,111 @@ class Inventory(ttk.Frame):
                               font="Apple 20 bold")
         inventory.grid(row=11, column=0, columnspan=3, pady=(0, 5))
 
-    def create_item_widget(self):
-        """creates the item widgets"""
-        row_num = 0
-        col_num = 0
-        duplicate_consumables_widgets = []
-
-        for item in self.player.inv:
-            if col_num == 0:
-                row_num = 0
-            elif col_num % 3 == 0:
-                row_num += 5
-                col_num = 0
-
-            # generates a different type of widget depending on item type
-            if item.get_item_type() == "weapon":
-                self.create_weapon_item_widget(item, row_num, col_num)
-                col_num += 1
-
-            elif item.get_item_type() == "armour":
-                self.create_armour_item_widget(item, row_num, col_num)
-                col_num += 1
-
-            elif item.get_item_type() == "key":
-                self.create_item_info_widget(item, row_num, col_num)
-                col_num += 1
-
-            elif item.get_item_type() == "consumable":
-                uses = self.cons_list.count(item.name)  # count how many of the same consumable item
-                if item.name not in duplicate_consumables_widgets:  # check if the widget has been created
-                    if uses > 1:  # if more than one of the same item, display uses
-                        self.create_consumable_item_widget(item, row_num, col_num, False, uses)
-                        duplicate_consumables_widgets.append(item.name)
-                        col_num += 1
-                    else:  # if only one of the item, don't display uses
-                        self.create_consumable_item_widget(item, row_num, col_num, True, uses)
-                        col_num += 1
-
-        if not self.player.inv:
-            # if player has no items, display message
-            self.no_item_msg = ttk.Label(self, text="You have no items", style="info.TLabel", font="Apple 15 bold")
-            self.no_item_msg.grid(row=12, column=0, columnspan=3, pady=(0, 300))
-
-    def create_item_info_widget(self, item, row_num, col_num):
-        """ create the widget for the item's basic info """
-        self.item_name = ttk.Label(self, text=f"{item.name}", style="success.TLabel", justify="left",
-                                   font="Helvetica 18")
-        self.item_name.grid(row=12 + row_num, column=col_num)
-        self.item_widget.append(self.item_name)
-
-        self.item_desc = ttk.Label(self, text=f"{item.desc}", style="info.TLabel", justify="left",
-                                   font="Helvetica 12", )
-        self.item_desc.grid(row=13 + row_num, column=col_num)
-        self.item_widget.append(self.item_desc)
-        self.item_value = ttk.Label(self, text=f"Sell for: {item.value} coins", style="primary.TLabel",
-                                    justify="left", font="Helvetica 12")
-        self.item_value.grid(row=15 + row_num, column=col_num)
-        self.item_widget.append(self.item_value)
-
-    def create_consumable_item_widget(self, item, row_num, col_num, one_use, uses):
-        """create widgets for consumable items"""
-        self.create_item_info_widget(item, row_num, col_num)
-        if not one_use:
-            self.use_button = ttk.Button(self, text=f"Use - {uses}", style="info.TButton", width=10,
-                                         command=lambda items=item: self.use_item(items, uses))
-        else:
-            self.use_button = ttk.Button(self, text="Use", style="info.TButton", width=10,
-                                         command=lambda items=item: self.use_item(items, uses))
-
-        self.use_button.grid(row=16 + row_num, column=col_num, pady=(0, 50))
-        self.item_widget.append(self.use_button)
-        self.check_max_health(item)
-
-    def check_max_health(self, item):
-        """checks if the player is at max health and disable use button if true"""
-        if item.health > 0 and self.player.health >= self.player.max_hp:
-            self.use_button.config(text=f"Already at max HP!", state="disabled", width=13)
-
-    def create_weapon_item_widget(self, item, row_num, col_num):
-        """create widgets for weapon items"""
-        self.create_item_info_widget(item, row_num, col_num)
-        if self.player.weapon == item:
-            self.unequip_button = ttk.Button(self, text="Unequip", style="danger.Outline.TButton", width=10,
-                                             command=lambda items=item: self.unequip_item(items))
-            self.unequip_button.grid(row=16 + row_num, column=col_num, pady=(0, 50))
-            self.item_widget.append(self.unequip_button)
-        elif not self.player.weapon:
-            self.equip_button = ttk.Button(self, text="Equip", style="success.Outline.TButton", width=4,
-                                           command=lambda items=item:
-                                           self.equip_item(items))
-            self.equip_button.grid(row=16 + row_num, column=col_num, pady=(0, 50))
-            self.item_widget.append(self.equip_button)
-        else:
-            self.destroy_item_button = ttk.Button(self, text="Remove", style="danger.TButton", width=6,
-                                                  command=lambda items=item: self.remove_item(items))
-            self.destroy_item_button.grid(row=16 + row_num, column=col_num, pady=(0, 50))
-            self.item_widget.append(self.destroy_item_button)
-
-    def create_armour_item_widget(self, item, row_num, col_num):
-        """create widgets for armour items"""
-        self.create_item_info_widget(item, row_num, col_num)
-        if self.player.armour == item:
-            self.unequip_button = ttk.Button(self, text="Unequip", style="danger.Outline.TButton", width=10,
-                                             command=lambda items=item: self.unequip_item(items))
-            self.unequip_button.grid(row=16 + row_num, column=col_num, pady=(0, 50))
-            self.item_widget.append(self.unequip_button)
-        elif not self.player.armour:
-            self.equip_button = ttk.Button(self, text="Equip", style="success.Outline.TButton", width=4,
-                                           command=lambda items=item:
-                                           self.equip_item(items))
-            self.equip_button.grid(row=16 + row_num, column=col_num, pady=(0, 50))
-            self.item_widget.append(self.equip_button)
+        self.no_item_msg = ttk.Label(self, text="You have no items", style="info.TLabel", font="Apple 15 bold")
+        self.no_item_msg.grid(row=12, column=0, columnspan=3, pady=(0, 300))
+        self.no_item_msg.grid_remove()
+
+        # scroll the grid a row at a time when there are more cells than the visible rows hold
+        self.up_button = ttk.Button(self, text="▲ Previous items", style="info.Outline.TButton",
+                                    command=lambda: self.scroll(-1))
+        self.up_button.grid(row=12 + INVENTORY_ROWS, column=0, pady=(0, 10))
+        self.up_button.grid_remove()
+        self.down_button = ttk.Button(self, text="More items ▼", style="info.Outline.TButton",
+                                      command=lambda: self.scroll(1))
+        self.down_button.grid(row=12 + INVENTORY_ROWS, column=2, pady=(0, 10))
+        self.down_button.grid_remove()
+
+    def cell_spec(self, item):
+        """what the grid cell for an item shows"""
+        if item.item_type == "consumable":
+            count = self.view.count(item)
+            if item.health > 0 and self.player.health >= self.player.max_hp:
+                button = ("Already at max HP!", "info.TButton", "disabled", None)
+            else:
+                button = (f"Use - {count}" if count > 1 else "Use", "info.TButton", "normal",
+                          ("use", item))
+        elif item.item_type in ("weapon", "armour"):
+            equipped = self.player.weapon if item.item_type == "weapon" else self.player.armour
+            if equipped == item:
+                button = ("Unequip", "danger.Outline.TButton", "normal", ("unequip", item))
+            elif not equipped:
+                button = ("Equip", "success.Outline.TButton", "normal", ("equip", item))
+            else:
+                button = ("Remove", "danger.TButton", "normal", ("remove", item))
+        else:  # keys are only shown
+            button = (None, None, None, None)
+        return InventoryCell(item.name, item.desc, f"Sell for: {item.value} coins", *button)
+
+    def show_cells(self):
+        """show the items in the visible rows, only cells whose item or count changed are reconfigured"""
+        rows = -(-len(self.view) // INVENTORY_COLUMNS)
+        self.first_row = max(0, min(self.first_row, rows - INVENTORY_ROWS))
+        first = self.first_row * INVENTORY_COLUMNS
+        visible = self.view.items[first:first + INVENTORY_ROWS * INVENTORY_COLUMNS]
+
+        while len(self.cells) > len(visible):
+            self.cells.pop().destroy()
+        for index, item in enumerate(visible):
+            if index == len(self.cells):
+                cell = ItemCell(self, self.press)
+                row, column = divmod(index, INVENTORY_COLUMNS)
+                cell.frame.grid(row=12 + row, column=column, pady=(0, 30))
+                self.cells.append(cell)
+            self.cells[index].update(self.cell_spec(item))
+
+        if rows > INVENTORY_ROWS:
+            self.up_button.config(state="normal" if self.first_row else "disabled")
+            self.down_button.config(state="normal" if self.first_row + INVENTORY_ROWS < rows else "disabled")
+            self.up_button.grid()
+            self.down_button.grid()
         else:
-            self.destroy_item_button = ttk.Button(self, text="Remove", style="danger.TButton", width=6,
-                                                  command=lambda items=item: self.remove_item(items))
-            self.destroy_item_button.grid(row=16 + row_num, column=col_num, pady=(0, 50))
-            self.item_widget.append(self.destroy_item_button)
-
-    def destroy_item_widget(self):
-        """destroy widgets item widgets"""
-        for widget in self.item_widget:
-            widget.destroy()
+            self.up_button.grid_remove()
+            self.down_button.grid_remove()
+
+    def scroll(self, rows):
+        """move the visible rows of the grid up or down"""
+        self.first_row += rows
+        self.show_cells()
+
+    def press(self, action):
+        """run the action of a cell's button"""
+        kind, item = action
+        if kind == "use":
+            self.use_item(item)
+        elif kind == "equip":
+            self.equip_item(item)
+        elif kind == "unequip":
+            self.unequip_item(item)
+        elif kind == "remove":
+            self.remove_item(item)
 
-    def use_item(self, item, uses):
+    def use_item(self, item):
         """use item and configure the widgets"""
-        self.player.use_item(item)
-        if uses < 1:
-            self.destroy_item_widget()
-            self.create_item_widget()
-        else:
-            self.cons_list.remove(item.name)
-            uses = self.cons_list.count(item)
-            self.use_button.config(text=f"Use - {uses}")
-            self.destroy_item_widget()
-            self.create_item_widget()
-            self.parent.update_info_widget(f"You used {item.name}")
+        self.parent.session.use_item(item.id)
+        self.view.remove(item)
+        self.show_cells()
         self.update_widgets()
+        self.parent.update_info_widget(f"You used {item.name}")
 
     def remove_item(self, item):
         """removes item from inv"""
-        self.player.remove_item(item)
-        self.destroy_item_widget()
-        self.create_item_widget()
+        self.parent.session.discard(item.id)
+        self.view.remove(item)
+        self.show_cells()
         self.update_widgets()
         self.parent.update_info_widget(f"You discarded {item.name}")
 
     def equip_item(self, item):
         """equip item from equip button"""
-        self.player.equip_item(item)
-        self.destroy_item_widget()
-        self.create_item_widget()
+        self.parent.session.equip(item.id)
+        self.show_cells()
         self.update_widgets()
         self.parent.update_info_widget(f"You equipped {item.name}")
 
     def unequip_item(self, item):
         """equip item from equip button"""
-        self.player.unequip_item(item)
-        self.destroy_item_widget()
-        self.create_item_widget()
+        self.parent.session.unequip(item.id)
+        self.show_cells()
         self.update_widgets()
         self.parent.update_info_widget(f"You unequipped {item.name}")
 
@@ -1254,11 +430,19 @@ class Inventory(ttk.Frame):
         else:
             self.equipped_armour.config(text=f"Armour: Leisure Club Hoodie")
         if not self.player.inv:
-            self.no_item_msg = ttk.Label(self, text="You have no items", style="info.TLabel", font="Apple 15 bold")
-            self.no_item_msg.grid(row=12, column=0, columnspan=3, pady=(0, 300))
+            self.no_item_msg.grid()
         else:
-            if self.no_item_msg:
-                self.no_item_msg.destroy()
+            self.no_item_msg.grid_remove()
+
+    def refresh(self):
+        """show the player's current stats and items"""
+        self.player = self.parent.player
+        self.spells_list = [spell.name for spell in self.player.spells]
+        self.spell = ", ".join(self.spells_list)
+        self.view = InventoryView(self.player.inv)
+        self.name.config(text=f"LV.{self.player.level} {self.player.name}")
+        self.show_cells()
+        self.update_widgets()
 
 
 class GameOver(ttk.Frame):
@@ -1283,7 +467,7 @@ class GameOver(ttk.Frame):
         """respawn player"""
         for w in self.current_widgets:
             w.destroy()
-        self.parent.player.location = "G"
+        self.parent.session.respawn()
         self.parent.switch_frame(Menu)
 
 
@@ -1295,7 +479,10 @@ class CombatScreen(ttk.Frame):
         self.player = parent.player
         self.current_location = self.player.current_location()
         self.parent = parent
-        self.enemy = self.current_location.enemy[0]
+        # each fight gets its own enemies rolled from the templates, dropped again once the fight is over
+        # the engine applies the combat rules, this frame only shows what happened
+        self.engine = parent.session.fight()
+        self.enemy = self.engine.state.enemy  # the enemy being targeted
         self.turn = 0
         self.default_menu = []
         self.spells_button = []
@@ -1307,7 +494,8 @@ class CombatScreen(ttk.Frame):
 
         # widgets 
         self.spells = None
-        self.flee = None
+        self.flee_button = None
+        self.target_button = None
         self.block = None
         self.basic_attack = None
         self.actions = ttk.Label(self, text=f"Actions", font=(self.font, 20), style="info.TLabel")
@@ -1326,15 +514,13 @@ class CombatScreen(ttk.Frame):
         self.spell = None
         self.info = tk.Text(self, height=10, relief="ridge", font=("Helvetica", 16), state="disabled")
         self.info.grid(row=2, column=0, pady=(10, 20), columnspan=3, sticky="nsew")
+        self.log = InfoLog(self.info)
 
         self.create_widgets()
 
     def create_widgets(self):
         """creates the widgets for the combat screen"""
-
-        # destroy the current widgets
-        for b in self.spells_button:
-            b.destroy()
+        self.destroy_widgets()
 
         if self.enemy.buff_duration > 0:
             self.fight.config(text=f"LV.{self.enemy.level} {self.enemy.name}\n"
@@ -1376,17 +562,35 @@ class CombatScreen(ttk.Frame):
         self.block.grid(row=6, column=1, sticky="nsew", padx=5)
         self.default_menu.append(self.block)
 
-        # if enemy is not a boss, display flee button
-        if not self.enemy.boss:
-            self.flee = ttk.Button(self, style="success.Outline.TButton", text=f"Flee",
-                                   command=lambda: self.parent.switch_frame(Menu))
-            self.flee.grid(row=6, column=2, sticky="nsew", padx=5)
-            self.default_menu.append(self.flee)
+        # with more than one enemy left, let the player pick who to attack
+        if self.engine.alive > 1:
+            self.target_button = ttk.Button(self, style="info.Outline.TButton",
+                                            text=f"Next target ({self.engine.alive} enemies)",
+                                            command=lambda: self.next_target())
+            self.target_button.grid(row=7, column=0, sticky="nsew", padx=5, pady=50)
+            self.default_menu.append(self.target_button)
+
+        # if no enemy is a boss, display flee button
+        if not any(enemy.boss for enemy in self.engine.state.enemies):
+            self.flee_button = ttk.Button(self, style="success.Outline.TButton", text=f"Flee",
+                                          command=lambda: self.flee())
+            self.flee_button.grid(row=6, column=2, sticky="nsew", padx=5)
+            self.default_menu.append(self.flee_button)
 
         self.spells = ttk.Button(self, style="info.Outline.TButton", text=f"Open spell book",
                                  command=lambda: self.open_spells_menu())
         self.spells.grid(row=7, column=1, sticky="nsew", padx=5, pady=50)
 
+    def destroy_widgets(self):
+        """destroy the buttons and labels create_widgets builds, so building them again never stacks them"""
+        for widget in self.default_menu + self.spells_button + [self.spells, self.enemy_health, self.player_health]:
+            if widget:
+                widget.destroy()
+        self.default_menu.clear()
+        self.spells_button.clear()
+        self.target_button = None
+        self.flee_button = None
+
     def open_spells_menu(self):
         """open spells menu which displays all the spells the player can use"""
         for widget in self.default_menu:
@@ -1418,9 +622,10 @@ class CombatScreen(ttk.Frame):
                 if isinstance(spell, Heal):
                     self.spell.config(state="disabled")
 
-            if spell.cooldown > 0:  # spell on cooldown disable button
+            cooldown = self.player.cooldown(spell)
+            if cooldown > 0:  # spell on cooldown disable button
                 self.spell.config(state="disabled", text=f"{spell.name}\n"
-                                                         f"{spell.cooldown} cooldown\n"
+                                                         f"{cooldown} cooldown\n"
                                                          f"{spell.description}")
 
             self.spell.grid(row=6, ipadx=10, ipady=2, padx=4, column=col_num, sticky="nsew",
@@ -1431,143 +636,116 @@ class CombatScreen(ttk.Frame):
 
     def use_spell(self, spell):
         """use spell which checks wht type of spell was cast and update combat info based on that"""
-        if self.player.use_spell(spell):
-            self.update_info(f"You used {spell.name}.\n")
-            spell.cooldown = spell.max_cd
-            if isinstance(spell, Buff):
-                if spell.attack > 0:
-                    self.player_attack.config(text=f"{self.player.attack}(+{spell.attack}) ATK",
-                                              style="danger.TLabel")
-                    self.update_info(f"Increased ATK by {spell.attack} for {spell.duration} turns!\n\n")
+        events = self.parent.session.combat("spell", spell.id)
+        self.render(events)
+        if self.engine.state.player_spell_used:
+            self.create_widgets()
 
-                if spell.defence > 0:
-                    self.player_defence.config(text=f"{self.player.defence}(+{spell.defence}) DEF",
+    def render(self, events):
+        """show the engine's events in the combat info and update the stat labels they change"""
+        for event in events:
+            if event.kind == "player_spell" and isinstance(event.spell, Buff):
+                if event.spell.attack > 0:
+                    self.player_attack.config(text=f"{self.player.attack}(+{event.spell.attack}) ATK",
+                                              style="danger.TLabel")
+                if event.spell.defence > 0:
+                    self.player_defence.config(text=f"{self.player.defence}(+{event.spell.defence}) DEF",
                                                style="info.TLabel")
-                    self.update_info(f"Increased DEF by {spell.attack} for {spell.duration} turns!\n\n")
-            if isinstance(spell, Heal):
-                self.update_info(f"Healed for {spell.health} HP!\n\n")
-
-            self.create_widgets()
-        # if player tries to use a buff while a buff is active
+            elif event.kind == "enemy_spell" and isinstance(event.spell, Buff) and event.actor is self.enemy:
+                if event.spell.attack > 0:
+                    self.enemy_attack.config(text=f"{self.enemy.attack}(+{event.spell.attack}) ATK",
+                                             style="danger.TLabel")
+                if event.spell.defence > 0:
+                    self.enemy_defence.config(text=f"{self.enemy.defence}(+{event.spell.defence}) DEF",
+                                              style="info.TLabel")
+            if event.text:
+                self.update_info(event.text, event.kind)
+
+        self.turn = self.engine.state.turn
+        self.enemy = self.engine.state.enemy  # the target moves on once it dies
+        if self.engine.state.outcome == "won":
+            self.end_combat()
+        elif self.engine.state.outcome == "lost":
+            self.parent.switch_frame(GameOver)  # game over screen once dead
+        elif self.engine.state.outcome == "fled":
+            self.parent.switch_frame(Menu)
         else:
-            if isinstance(spell, Buff):
-                self.update_info(f"Already using a buff!\n")
+            self.update_widgets()
 
     def end_combat(self):
-        """end combat and get xp"""
-        self.player.get_coins(self.enemy.coins)
-        self.enemy.health = self.enemy.max_hp
-        if not self.player.get_xp(self.enemy.xp):
+        """show the rewards for winning the fight"""
+        defeated = self.engine.state.defeated
+        names = ", ".join(enemy.name for enemy in defeated)
+        xp = sum(enemy.xp for enemy in defeated)
+        coins = sum(enemy.coins for enemy in defeated)
+        if not self.engine.state.leveled_up:
             self.parent.update_info_widget(
-                f"Successfully defeated {self.enemy.name}!\nYou have gained {self.enemy.xp} XP!\n"
-                f"You got {self.enemy.coins} coins!\n")
+                f"Successfully defeated {names}!\nYou have gained {xp} XP!\n"
+                f"You got {coins} coins!\n")
         else:
             if self.player.level % 5 != 0:  # change print text depending on what level the player leveled up
-                self.parent.update_info_widget(f"Successfully defeated {self.enemy.name}!\n"
-                                               f"You got {self.enemy.coins} coins!\n"
-                                               f"You have gained {self.enemy.xp} XP!\n\n"
+                self.parent.update_info_widget(f"Successfully defeated {names}!\n"
+                                               f"You got {coins} coins!\n"
+                                               f"You have gained {xp} XP!\n\n"
                                                f"You have leveled up!!!\n"
                                                f"You are now Level {self.player.level}!\n"
                                                f"Attack and Defence have increased!\n")
             else:
-                self.parent.update_info_widget(f"Successfully defeated {self.enemy.name}!\n"
-                                               f"You got {self.enemy.coins} coins!\n"
-                                               f"You have gained {self.enemy.xp} XP!\n\n"
+                self.parent.update_info_widget(f"Successfully defeated {names}!\n"
+                                               f"You got {coins} coins!\n"
+                                               f"You have gained {xp} XP!\n\n"
                                                f"You have leveled up!!!\n"
                                                f"You are now Level {self.player.level}!\n"
                                                f"All stats increased!\n")
-        # if enemy has an item, player gets the item
-        if self.enemy.inv:
-            self.player.combat_take_item(self.enemy.inv)
-            self.parent.update_info_widget(f"You got {self.enemy.inv.name} from {self.enemy.name}!")
+        # if an enemy had an item, player gets the item
+        for enemy in defeated:
+            if enemy.inv:
+                self.parent.update_info_widget(f"You got {enemy.inv.name} from {enemy.name}!")
 
-        self.current_location.enemy.remove(self.enemy)
         self.parent.switch_frame(Menu)
 
-    def player_is_dead(self):
-        """checks if player is dead"""
-        if self.player.is_alive():
-            self.add_turn()
-            self.update_widgets()  # combat continues one more turn
-        else:
-            self.player.health = self.player.max_hp  # respawn player
-            self.enemy.health = self.enemy.max_hp  # reset enemy
-            self.parent.switch_frame(GameOver)  # game over screen once dead
+    def update_info(self, content, kind="info"):
+        """update current status of combat"""
+        self.log.write(content, kind)
 
-    def enemy_is_dead(self):
-        """check if the (enemy) is dead"""
-        if self.enemy.is_alive():
+    def refresh(self):
+        """carry on with an unfinished fight, otherwise start a new one with the enemies here"""
+        self.player = self.parent.player
+        if not self.engine.state.outcome:
             self.update_widgets()
-            self.enemy_action()  # enemy attacks
-        else:
-            self.end_combat()  # if dead end combat
+            return
 
-    def update_info(self, content):
-        """update current status of combat"""
-        self.info.config(state="normal")
-        self.info.insert(tk.END, content)
-        self.info.config(state="disabled")
-        self.info.see("end")
-
-    def add_turn(self):
-        """reduces all cooldown add a turn"""
-        for player_spell in self.player.spells:
-            if player_spell.cooldown > 0:
-                player_spell.cooldown -= 1
-        if self.player.buff_duration > 0:
-            self.player.buff_duration -= 1
-        if self.player.buff_duration == 0:
-            self.player.revert_spell()
+        self.current_location = self.player.current_location()
+        self.engine = self.parent.session.fight()
+        self.enemy = self.engine.state.enemy
+        self.turn = 0
 
-        for enemy_spell in self.enemy.spells:
-            if enemy_spell.cooldown > 0:
-                enemy_spell.cooldown -= 1
-        if self.enemy.buff_duration > 0:
-            self.enemy.buff_duration -= 1
-        if self.enemy.buff_duration == 0:
-            self.enemy.revert_spell()
-        self.turn += 1
-
-    def enemy_spell(self):
-        """enemy spell logic"""
-        for spell in self.enemy.spells:
-            if spell.cooldown <= 0:  # cast enemy spell when the cooldown is 0
-                self.enemy.use_spell(spell)
-                spell.cooldown = spell.max_cd
-
-                # updates text
-                if not isinstance(spell, Buff):
-                    pass
-                else:
-                    if spell.attack > 0:
-                        self.enemy_attack.config(text=f"{self.enemy.attack}(+{spell.attack}) ATK",
-                                                 style="danger.TLabel")
-                    if spell.defence > 0:
-                        self.enemy_defence.config(text=f"{self.enemy.defence}(+{spell.defence}) DEF",
-                                                  style="info.TLabel")
-
-                self.update_info(f"{self.enemy.name} used {spell.name}!\n")
-
-    def enemy_action(self):
-        """enemy turn"""
-        self.enemy_spell()
-        damage = self.player.take_damage(self.enemy.attack)
-        self.update_info(f"{self.enemy.name} attacked you for {damage} damage.\n\n")
-        # checks if player is dead
-        self.player_is_dead()
+        self.player_attack.config(text=f"{self.player.attack} ATK", style="TLabel")
+        self.player_defence.config(text=f"{self.player.defence} DEF", style="TLabel")
+        self.enemy_attack.config(text=f"{self.enemy.attack} ATK", style="TLabel")
+        self.enemy_defence.config(text=f"{self.enemy.defence} DEF", style="TLabel")
+        self.log.clear()
+        self.create_widgets()
 
     def combat_basic_attack(self):
         """perform basic attack"""
-        damage = self.enemy.take_damage(self.player.attack)
-        self.update_info(f"You attacked {self.enemy.name} for {damage} damage.\n\n")
-        self.enemy_is_dead()
+        self.render(self.parent.session.combat("attack"))
 
     def combat_block(self):
         """perform block - halves damage"""
-        self.player.action_block()
-        self.update_info(f"You are now blocking!\n\n")
-        self.enemy_is_dead()
-        self.player.action_block()  # disable block
+        self.render(self.parent.session.combat("block"))
+
+    def flee(self):
+        """run away from the fight"""
+        self.render(self.parent.session.combat("flee"))
+
+    def next_target(self):
+        """target the next enemy still standing"""
+        state = self.engine.state
+        target = (state.target + 1) % len(state.enemies)
+        while not state.enemies[target].is_alive():
+            target = (target + 1) % len(state.enemies)
+        self.render(self.parent.session.combat("target", target=target))
 
     def buff_active(self):
         """if buff is active change the labels to show that"""
@@ -1619,6 +797,17 @@ class CombatScreen(ttk.Frame):
         self.player_health.config(text=f"HP {self.player.health}/{self.player.max_hp}")
         self.enemy_health.config(text=f"HP {self.enemy.health}/{self.enemy.max_hp}")
 
+        # the target may have changed, the buttons are gone while the spell book is open
+        if self.basic_attack.winfo_exists():
+            self.basic_attack.config(text=f"Attack {self.enemy.name}")
+            self.block.config(text=f"Block {self.enemy.name}")
+        if self.target_button and self.engine.alive <= 1:
+            self.target_button.destroy()  # nobody left to switch to
+            self.default_menu.remove(self.target_button)
+            self.target_button = None
+        elif self.target_button and self.target_button.winfo_exists():
+            self.target_button.config(text=f"Next target ({self.engine.alive} enemies)")
+
 
 class MainMenu(ttk.Frame):
     """tk frame for the main menu """
@@ -1725,31 +914,16 @@ class NewGame(ttk.Frame):
 
     def mage(self):
         """set mage to player"""
-
         self.player_class = "Mage"
-        spells = [1, 2, 8]
-        attack = 6
-        defence = 5
-
-        player = Player(self.player_name, 1, 0, 20, attack, defence, "A", 0, [],
-                        None, None, spells, 1, 20)
-        player.link_spells()
-        self.parent.player = player
+        self.parent.session = GameSession(self.player_name, self.player_class, recording_file=RECORDING_FILE)
+        self.parent.player = self.parent.session.player
         self.your_player()
 
     def warrior(self):
         """set warrior to player"""
-
         self.player_class = "Warrior"
-        spells = [8]
-        max_health = 30
-        attack = 10
-        defence = 5
-
-        player = Player(self.player_name, 1, 0, max_health, attack, defence, "A", 0, [],
-                        None, None, spells, 1, max_health)
-        player.link_spells()
-        self.parent.player = player
+        self.parent.session = GameSession(self.player_name, self.player_class, recording_file=RECORDING_FILE)
+        self.parent.player = self.parent.session.player
         self.your_player()
 
     def your_player(self):
@@ -1889,6 +1063,7 @@ class Dialogue(ttk.Frame):
         self.rowconfigure(6, weight=3)
         self.info = tk.Text(self, height=10, relief="ridge", font=("Helvetica", 16), state="disabled")
         self.info.grid(row=2, column=0, pady=(10, 20), columnspan=3, sticky="nsew")
+        self.log = InfoLog(self.info)
         self.update_info(f"You have engaged in conversation...\n")
         self.current_buttons = []
         self.current_node = self.npc.dialogue_tree
@@ -1919,17 +1094,22 @@ class Dialogue(ttk.Frame):
 
     def update_info(self, content):
         """update current status of combat"""
-        self.info.config(state="normal")
-        self.info.insert(tk.END, content)
-        self.info.config(state="disabled")
-        self.info.see("end")
+        self.log.write(content)
 
     def create_widgets(self):
         pass
 
 
+# how many of an item the store's buttons buy or sell at once, All is as many as possible
+TRADE_AMOUNTS = ("1", "5", "10", "All")
+
+
 class Store(ttk.Frame):
-    """Class for store"""
+    """Class for store
+
+    The stock and the items to sell are ItemCells that are kept between trades. After a trade only the cells
+    whose price button, count or state changed are reconfigured, along with the coin label.
+    """
 
     def __init__(self, parent):
         super().__init__(parent)
@@ -1953,6 +1133,7 @@ class Store(ttk.Frame):
 
         self.info = tk.Text(self, height=1, relief="ridge", font=("Helvetica", 16), state="disabled")
         self.info.grid(row=2, column=0, columnspan=3, sticky="nsew")
+        self.log = InfoLog(self.info)
 
         self.leave = ttk.Button(self, text=f"Leave", style="danger.outline.TButton", width=10,
                                 command=lambda: self.parent.switch_frame(Menu))
@@ -1960,113 +1141,167 @@ class Store(ttk.Frame):
         ttk.Separator(self, orient='horizontal').grid(row=4, column=0, columnspan=3, sticky="nsew", pady=(5, 10))
         self.update_info(f"{self.npc.name}: {self.npc.dialogue_tree}")
 
-        self.shop_widgets = []
-        self.sell_widgets = []
+        self.shop_cells = []
+        self.sell_cells = []
+        self.selling = False
+
+        # picks how many each buy or sell button trades
+        self.amount = tk.StringVar(value=TRADE_AMOUNTS[0])
+        self.amount_button = ttk.Menubutton(self, text=f"Amount: {self.amount.get()}", style="info.Outline.TButton")
+        amount_menu = tk.Menu(self.amount_button, tearoff=0)
+        for amount in TRADE_AMOUNTS:
+            amount_menu.add_radiobutton(label=amount, value=amount, variable=self.amount,
+                                        command=lambda: self.pick_amount())
+        self.amount_button["menu"] = amount_menu
+        self.amount_button.grid(row=19, column=0, columnspan=3, pady=(30, 0))
 
         self.swap_screen = ttk.Button(self, text=f"Sell Your Stuff!", style="success.outline.TButton",
                                       command=lambda: self.sell())
         self.swap_screen.grid(row=20, column=0, columnspan=3, pady=(50, 100))
+        self.junk_button = ttk.Button(self, text="Sell All Junk", style="warning.outline.TButton",
+                                      command=lambda: self.sell_junk())
+        self.junk_button.grid(row=21, column=0, columnspan=3, pady=(0, 50))
+        self.junk_button.grid_remove()
         self.create_shop()
 
     def create_shop(self):
-        """create shop widgets"""
-        for w in self.sell_widgets:
-            w.destroy()
-
+        """show the shop's stock"""
+        self.selling = False
         self.swap_screen.config(text=f"Sell Your Stuff!", command=lambda: self.sell())
-
-        row_num = 0
-        col_num = 0
-
-        for item, item_price in self.npc.shop_stock.items():
-            if col_num == 0:
-                row_num = 0
-            elif col_num % 3 == 0:
-                row_num += 5
-                col_num = 0
-
-            name = ttk.Label(self, text=f"{item.name}", style="success.TLabel", justify="left",
-                             font="Helvetica 18")
-            name.grid(row=5 + row_num, column=col_num)
-            self.shop_widgets.append(name)
-
-            desc = ttk.Label(self, text=f"{item.desc}", style="info.TLabel", justify="left",
-                             font="Helvetica 12")
-            desc.grid(row=6 + row_num, column=col_num)
-            self.shop_widgets.append(desc)
-
-            value = ttk.Button(self, text=f"Buy for: {item_price} coins", style="primary.TButton",
-                               command=lambda stock_item=item, price=item_price: self.buy_item(stock_item, price))
-            if self.player.coins < item_price or self.player.check_max_inv():
-                value.config(state="disabled", text=f"Buy for: {item_price} coins")
-            if self.player.check_max_inv():
-                self.update_info(f"\nMax inventory! Sell or remove items!")
-            value.grid(row=7 + row_num, column=col_num, pady=(0, 20))
-            self.shop_widgets.append(value)
-
-            col_num += 1
+        self.junk_button.grid_remove()
+        for cell in self.sell_cells:
+            cell.frame.grid_remove()
+        for cell in self.shop_cells:
+            cell.frame.grid()
+        self.update_cells()
+        if self.player.check_max_inv():
+            self.update_info(f"\nMax inventory! Sell or remove items!")
 
     def sell(self):
-        """create items to sell"""
-        for w in self.shop_widgets:
-            w.destroy()
-
-        for w in self.sell_widgets:
-            w.destroy()
-
+        """show the items the player can sell"""
+        self.selling = True
         self.swap_screen.config(text="Return to store", command=lambda: self.create_shop())
-
-        row_num = 0
-        col_num = 0
-        # create sell widgets
-        for item in self.player.inv:
-            if col_num == 0:
-                row_num = 0
-            elif col_num % 3 == 0:
-                row_num += 5
-                col_num = 0
-
-            sell_name = ttk.Label(self, text=item.name, style="success.TLabel", justify="left",
-                                  font="Helvetica 18")
-            sell_name.grid(row=5 + row_num, column=col_num)
-            self.sell_widgets.append(sell_name)
-
-            sell_desc = ttk.Label(self, text=f"{item.desc}", style="info.TLabel", justify="left",
-                                  font="Helvetica 12")
-            sell_desc.grid(row=6 + row_num, column=col_num)
-            self.sell_widgets.append(sell_desc)
-
-            sell_value = ttk.Button(self, text=f"Sell for: {item.value} coins", style="primary.TButton",
-                                    command=lambda stock_item=item: self.sell_item(stock_item))
-
-            if item.value <= 0:
-                sell_value.config(state="disabled", text=f"No value!")
-
-            sell_value.grid(row=7 + row_num, column=col_num)
-            self.sell_widgets.append(sell_value)
-
-    def buy_item(self, item, item_price):
-        """buy item adds to player inv"""
-        self.update_info(f"\nBought {item.name}!")
-        self.player.combat_take_item(item)
-        self.player.coins -= item_price
-        self.player_coins.config(text=f"{self.player.coins} COINS")
-        self.create_shop()
+        self.junk_button.grid()
+        for cell in self.shop_cells:
+            cell.frame.grid_remove()
+        for cell in self.sell_cells:
+            cell.frame.grid()
+        self.update_cells()
+
+    def trade_amount(self, most):
+        """how many the amount button asks for, no more than most"""
+        amount = self.amount.get()
+        return most if amount == "All" else min(int(amount), most)
+
+    def buy_limit(self, item, item_price):
+        """the most of an item the player's coins and inventory slots allow"""
+        most = self.player.coins // item_price if item_price else 1
+        if item.item_type != "consumable":
+            # check_max_inv only refuses items once the slots are over the max, so one more fits
+            most = min(most, self.player.max_inv_size + 1 - self.player.inv.slots)
+        return max(most, 0)
+
+    def shop_spec(self, item, item_price, inv_full):
+        """what the cell for an item in stock shows"""
+        amount = self.trade_amount(self.buy_limit(item, item_price)) or 1
+        if amount > 1:
+            text = f"Buy {amount} for: {amount * item_price} coins"
+        else:
+            text = f"Buy for: {item_price} coins"
+        state = "disabled" if self.player.coins < item_price or inv_full else "normal"
+        return InventoryCell(item.name, item.desc, f"You have {self.player.inv.count(item)}", text,
+                             "primary.TButton", state, ("buy", item))
+
+    def sell_spec(self, item, count):
+        """what the cell for an item the player carries shows"""
+        amount = self.trade_amount(self.parent.session.sellable(item))
+        if item.value <= 0:
+            text, state = "No value!", "disabled"
+        elif not amount:
+            text, state = "Equipped!", "disabled"
+        elif amount > 1:
+            text, state = f"Sell {amount} for: {amount * item.value} coins", "normal"
+        else:
+            text, state = f"Sell for: {item.value} coins", "normal"
+        return InventoryCell(item.name, item.desc, f"You have {count}", text, "primary.TButton", state,
+                             ("sell", item))
+
+    def update_cells(self):
+        """bring the cells on screen up to date with the player's coins and items"""
+        if self.selling:
+            self.show_cells(self.sell_cells, [self.sell_spec(item, count) for item, count in self.player.inv.counts()])
+        else:
+            inv_full = self.player.check_max_inv()
+            self.show_cells(self.shop_cells, [self.shop_spec(item, item_price, inv_full)
+                                              for item, item_price in self.npc.shop_stock.items()])
+
+    def show_cells(self, cells, specs):
+        """make the cells show the specs, only cells whose spec changed are reconfigured"""
+        while len(cells) > len(specs):
+            cells.pop().destroy()
+        for index, spec in enumerate(specs):
+            if index == len(cells):
+                cell = ItemCell(self, self.press)
+                row, column = divmod(index, 3)
+                cell.frame.grid(row=5 + row, column=column, pady=(0, 20))
+                cells.append(cell)
+            cells[index].update(spec)
+
+    def pick_amount(self):
+        """show the amount picked and reprice the buttons"""
+        self.amount_button.config(text=f"Amount: {self.amount.get()}")
+        self.update_cells()
+
+    def press(self, action):
+        """run the action of a cell's button"""
+        kind, item = action
+        if kind == "buy":
+            self.buy_item(item)
+        elif kind == "sell":
+            self.sell_item(item)
+
+    def buy_item(self, item):
+        """buy the amount picked of an item, as one trade"""
+        bought = self.parent.session.buy(item.id, self.trade_amount(self.buy_limit(item, self.npc.shop_stock[item])))
+        self.update_info(f"\nBought {item.name}!" if bought == 1 else f"\nBought {bought} {item.name}!")
+        if self.player.check_max_inv():
+            self.update_info(f"\nMax inventory! Sell or remove items!")
+        self.update_coins()
 
     def sell_item(self, item):
-        """buy item adds to player inv"""
-        self.update_info(f"\nSold {item.name}!")
-        self.player.inv.remove(item)
-        self.player.coins += item.value
+        """sell the amount picked of an item, as one trade"""
+        sold = self.parent.session.sell(item.id, self.trade_amount(self.parent.session.sellable(item)))
+        self.update_info(f"\nSold {item.name}!" if sold == 1 else f"\nSold {sold} {item.name}!")
+        self.update_coins()
+
+    def sell_junk(self):
+        """sell every spare weapon and armour no better than what is equipped"""
+        sold, coins = self.parent.session.sell_junk()
+        if sold:
+            self.update_info(f"\nSold {sold} junk item(s) for {coins} coins!")
+        else:
+            self.update_info(f"\nNo junk to sell!")
+        self.update_coins()
+
+    def update_coins(self):
+        """show the player's coins after a trade and update the cells it affected"""
         self.player_coins.config(text=f"{self.player.coins} COINS")
-        self.sell()
+        self.update_cells()
 
     def update_info(self, content):
         """update information """
-        self.info.config(state="normal")
-        self.info.insert(tk.END, content)
-        self.info.config(state="disabled")
-        self.info.see("end")
+        self.log.write(content)
+
+    def refresh(self):
+        """show the shop at the player's current location"""
+        self.player = self.parent.player
+        self.current_location = self.player.current_location()
+        self.npc = self.current_location.npc
+        self.shop_name.config(text=f"{self.npc.name}")
+        self.player_coins.config(text=f"{self.player.coins} COINS")
+        self.log.clear()
+        self.update_info(f"{self.npc.name}: {self.npc.dialogue_tree}")
+        self.create_shop()
 
 
 class FloorCut(ttk.Frame):
@@ -2101,6 +1336,50 @@ class FloorCut(ttk.Frame):
             self.okay.grid(row=1, column=1, sticky="nsew", pady=(30, 350))
 
 
+ButtonSpec = namedtuple("ButtonSpec", "text style state action column")
+
+
+class ButtonPool:
+    """Buttons along one grid row that are kept between updates
+
+    update() takes a ButtonSpec for each button. Widgets are only created or destroyed when the number of
+    buttons changes, and only the options that differ from the last update are reconfigured. Every button
+    calls handler with the action of its current spec, so commands never need rebinding.
+    """
+
+    def __init__(self, parent, row, handler, **grid_options):
+        self.parent = parent
+        self.row = row
+        self.handler = handler
+        self.grid_options = grid_options
+        self.widgets = []
+        self.specs = []
+
+    def update(self, specs):
+        """make the buttons match the specs, reusing the widgets already on screen"""
+        while len(self.widgets) > len(specs):
+            self.widgets.pop().destroy()
+            self.specs.pop()
+
+        for index, spec in enumerate(specs):
+            if index == len(self.widgets):
+                self.widgets.append(ttk.Button(self.parent, command=lambda pressed=index: self.press(pressed)))
+                self.specs.append(None)
+            widget = self.widgets[index]
+            old_spec = self.specs[index]
+
+            changes = {option: getattr(spec, option) for option in ("text", "style", "state")
+                       if old_spec is None or getattr(old_spec, option) != getattr(spec, option)}
+            if changes:
+                widget.config(**changes)
+            if old_spec is None or old_spec.column != spec.column:
+                widget.grid(row=self.row, column=spec.column, columnspan=1, **self.grid_options)
+            self.specs[index] = spec
+
+    def press(self, index):
+        self.handler(self.specs[index].action)
+
+
 class Menu(ttk.Frame):
     """the menu for player interaction"""
 
@@ -2123,93 +1402,31 @@ class Menu(ttk.Frame):
 
         self.info = tk.Text(self, height=10, relief="ridge", font=("Helvetica", 16), state="disabled")
         self.info.grid(row=2, column=0, pady=(5, 20), columnspan=4, sticky="nsew")
+        self.log = InfoLog(self.info)
 
-        self.take_button = None
         self.move_header = ttk.Label(self, text="Where to?", font="Helvetica", style="info.TLabel")
-        self.take_dropdown = None
-        self.buttons = []
         self.move_header.grid(row=3, column=0, pady=(0, 5), columnspan=4)
 
-        col_num = 0
-        for i in range(len(self.current_location.dest)):
-            if i == 0:
-                col_num = 1
-            else:
-                col_num = 0
-        # create buttons for destinations
-        for dest in self.current_location.dest:
-            self.move_button = ttk.Button(self, style="primary.Outline.TButton", text=f"Move to {dest.name}",
-                                          command=lambda destination=dest: self.move(destination))
-
-            if self.check_boss(dest):  # if dest has a boss warn player
-                self.move_button.config(style="danger.Outline.TButton", text=f"Move to {dest.name}\n"
-                                                                             f"Fight will begin immediately!")
-            elif self.check_locked(dest.id):  # if dest is locked
-                self.move_button.config(state="disabled", text=f"{dest.name} is locked!")
-
-            self.move_button.grid(row=4, ipadx=10, ipady=2, padx=4, pady=(0, 50), column=col_num, sticky="nsew",
-                                  columnspan=1)
-            col_num += 1
-            self.buttons.append(self.move_button)
-
-        # if there is no npc or item
-        if not self.current_location.check_npc() and not self.current_location.check_item():
-            self.filler = tk.Label(self)
-            self.filler.grid(row=5, column=0, pady=60)
-
-        # if there is a npc
-        if self.current_location.check_npc():
-            self.talk_button = ttk.Button(self, style="success.Outline.TButton", text=f"Talk",
-                                          command=lambda: self.parent.switch_frame(Dialogue))
-            if isinstance(self.current_location.npc, Shop):  # if npc is a shop
-                self.talk_button.config(text="Enter Store", command=lambda: self.parent.switch_frame(Store))
-            self.talk_button.grid(row=5, ipadx=10, ipady=2, padx=4, column=0, pady=50, sticky="nsew", columnspan=1)
-            self.buttons.append(self.talk_button)
-
-        # if there is an item 
-        if self.current_location.check_item() == 1:
-            self.take_button = ttk.Button(self, text=f"Take {self.current_location.item[0].name}",
-                                          style="success.Outline.TButton",
-                                          command=lambda: self.take_item(self.current_location.item[0]))
-            self.take_button.grid(row=5, ipadx=10, ipady=2, padx=4, column=1, pady=50, sticky="nsew", columnspan=1)
-            self.can_take()
-            self.buttons.append(self.take_button)
-
-        # if there are multiple items
-        elif self.current_location.check_item() > 1:
-            self.take_dropdown = ttk.Menubutton(self, text="Take Items", style="success.Outline.TButton")
-            self.menu = tk.Menu(self.take_dropdown, tearoff=0)
-            for item in self.current_location.item:
-                self.menu.add_radiobutton(label=f"{item.name} - {item.desc}",
-                                          command=lambda take_item=item: self.take_item(take_item))
-            self.take_dropdown.grid(row=5, ipadx=10, ipady=2, padx=4, column=1, pady=50, sticky="nsew",
-                                    columnspan=1)
-            self.take_dropdown['menu'] = self.menu
-            self.buttons.append(self.take_dropdown)
-            self.buttons.append(self.menu)
-            self.can_take()
-
-        # if there is an enemy
-        if self.current_location.check_enemy():
-            self.fight_button = ttk.Button(self, style="success.Outline.TButton", text=f"Fight",
-                                           command=lambda: self.parent.switch_frame(CombatScreen))
-            self.fight_button.grid(row=5, ipadx=10, ipady=2, padx=4, column=2, pady=50, sticky="nsew", columnspan=1)
-            self.buttons.append(self.fight_button)
+        # the buttons are kept between moves and only changed where the location needs them to be
+        self.move_buttons = ButtonPool(self, 4, self.press, ipadx=10, ipady=2, padx=4, pady=(0, 50), sticky="nsew")
+        self.action_buttons = ButtonPool(self, 5, self.press, ipadx=10, ipady=2, padx=4, pady=50, sticky="nsew")
+        self.filler = tk.Label(self)
+        self.take_dropdown = None
+        self.menu = None
+        self.take_items = None
+        self.update_widgets()
 
     def update_info(self, content):
         """update current status info"""
-        self.info.config(state="normal")
-        self.info.insert(tk.END, content)
-        self.info.config(state="disabled")
-        self.info.see("end")  # automatically goes to bottom
+        self.log.write(content)
 
-    def can_take(self):
-        """checks if player can take"""
-        if self.player.check_max_inv():
-            if self.take_button:
-                self.take_button.config(state="disabled", text="Max inventory!")
-            else:
-                self.take_dropdown.config(state="disabled", text="Max inventory!")
+    def refresh(self):
+        """bring the menu up to date after another frame changed the game"""
+        self.player = self.parent.player
+        self.current_location = self.player.current_location()
+        self.label_location.config(text=f"Floor {self.player.floor}")
+        self.info_location.config(text=f"You are in {self.current_location.name}")
+        self.update_widgets()
 
     def check_locked(self, dest_name):
         """ checks if the player has key for locked location """
@@ -2238,179 +1455,151 @@ class Menu(ttk.Frame):
             if self.current_location.enemy[0].boss:
                 self.parent.switch_frame(CombatScreen)
 
-    def unlock(self):
-        """unlocks locked location and removes key from inv"""
-        key = self.current_location.key
-        if key:
-            self.update_info(f"Unlocked {self.current_location.desc} with {self.current_location.key.name}!")
-            self.player.inv.remove(key)
-            self.current_location.key = None
-        else:
-            return False
-
     def move(self, dest):
-        """moves the player to destination"""
-        previous_pos = self.player.location
-        self.player.location = dest.id
+        """moves the player to destination, unlocking it with the key if it was locked"""
+        key, floor_changed = self.parent.session.move(dest.id)
         self.current_location = self.player.current_location()
-        self.unlock()
+        if key:
+            self.update_info(f"Unlocked {self.current_location.desc} with {key.name}!")
         self.label_location.config(text=f"Floor {self.player.floor}")
         self.info_location.config(text=f"You are in {self.current_location.name}")
         self.update_info(self.current_location.print_location_info(self.current_location.dest))
         self.update_widgets()
-        self.floor_change_cut_scene(previous_pos)
+        if floor_changed:
+            self.parent.switch_frame(FloorCut)  # change to cut scene
         self.fight_start_immediately()
 
-    def floor_change_cut_scene(self, previous_pos):
-        """change to cut scene"""
-        floor_changes = ["I", "AA", "AS", "BA"]
-        floor_dict = {
-            1: ["I"],
-            2: ["AA", "AS"],
-            3: ["BA"]
-        }
-        if self.current_location.id in floor_changes:
-            if previous_pos in floor_changes:
-                for floor, staircases in floor_dict.items():
-                    for staircase in staircases:
-                        if self.current_location.id == staircase:
-                            self.player.floor = floor
-                            self.parent.switch_frame(FloorCut)
-
     def take_item(self, item):
         """take item"""
-        item_name = self.player.take_item(item, self.current_location)
+        item_name = self.parent.session.take(item.id)
         add_item_prompt = f"Added {item_name} to inventory!\n\n"
         self.update_info(add_item_prompt)
         self.update_widgets()
 
-    def update_widgets(self):
-        """update widgets to current info"""
-        for b in self.buttons:
-            b.destroy()
-        self.buttons.clear()
+    def button_specs(self):
+        """work out the move buttons and the talk, take and fight buttons the current location needs"""
+        location = self.current_location
+        dests = location.dest
 
-        col_num = 0
-        for i in range(len(self.current_location.dest)):
-            if i == 0:
-                col_num = 1
+        move_specs = []
+        first_column = 1 if len(dests) == 1 else 0  # centre a single destination
+        for column, dest in enumerate(dests, first_column):
+            if self.check_boss(dest):  # if dest has a boss warn player
+                move_specs.append(ButtonSpec(f"Move to {dest.name}\nFight will begin immediately!",
+                                             "danger.Outline.TButton", "normal", ("move", dest), column))
+            elif self.check_locked(dest.id):  # if dest is locked
+                move_specs.append(ButtonSpec(f"{dest.name} is locked!", "primary.Outline.TButton", "disabled",
+                                             ("move", dest), column))
             else:
-                col_num = 0
+                move_specs.append(ButtonSpec(f"Move to {dest.name}", "primary.Outline.TButton", "normal",
+                                             ("move", dest), column))
+
+        action_specs = []
+        if location.check_npc():
+            if isinstance(location.npc, Shop):  # if npc is a shop
+                action_specs.append(ButtonSpec("Enter Store", "success.Outline.TButton", "normal",
+                                               ("switch", Store), 0))
+            else:
+                action_specs.append(ButtonSpec("Talk", "success.Outline.TButton", "normal", ("switch", Dialogue), 0))
+        if location.check_item() == 1:
+            item = location.item[0]
+            if self.player.check_max_inv():
+                action_specs.append(ButtonSpec("Max inventory!", "success.Outline.TButton", "disabled",
+                                               ("take", item), 1))
+            else:
+                action_specs.append(ButtonSpec(f"Take {item.name}", "success.Outline.TButton", "normal",
+                                               ("take", item), 1))
+        if location.check_enemy():
+            action_specs.append(ButtonSpec("Fight", "success.Outline.TButton", "normal", ("switch", CombatScreen), 2))
+        return move_specs, action_specs
+
+    def press(self, action):
+        """run the action of a pooled button"""
+        kind, target = action
+        if kind == "move":
+            self.move(target)
+        elif kind == "take":
+            self.take_item(target)
+        elif kind == "switch":
+            self.parent.switch_frame(target)
+
+    def update_take_dropdown(self):
+        """show a dropdown to take from when there are multiple items, only rebuilt when the items change"""
+        items = self.current_location.item if self.current_location.check_item() > 1 else None
+        if not items:
+            if self.take_dropdown:
+                self.take_dropdown.destroy()
+                self.take_dropdown = None
+                self.take_items = None
+            return
+
+        if not self.take_dropdown:
+            self.take_dropdown = ttk.Menubutton(self, text="Take Items", style="success.Outline.TButton")
+            self.menu = tk.Menu(self.take_dropdown, tearoff=0)
+            self.take_dropdown['menu'] = self.menu
+            self.take_dropdown.grid(row=5, ipadx=10, ipady=2, padx=4, column=1, pady=50, sticky="nsew",
+                                    columnspan=1)
+        if items != self.take_items:
+            self.menu.delete(0, "end")
+            for item in items:
+                self.menu.add_radiobutton(label=f"{item.name} - {item.desc}",
+                                          command=lambda take_item=item: self.take_item(take_item))
+            self.take_items = items
 
-        for dest in self.current_location.dest:
-            self.move_button = ttk.Button(self, style="primary.Outline.TButton", text=f"Move to {dest.name}",
-                                          command=lambda destination=dest: self.move(destination))
-            if self.check_boss(dest):  # if dest has a boss warn player
-                self.move_button.config(style="danger.Outline.TButton", text=f"Move to {dest.name}\n"
-                                                                             f"Fight will begin immediately!")
-            elif self.check_locked(dest.id):
-                self.move_button.config(state="disabled", text=f"{dest.name} is locked!")
+        if self.player.check_max_inv():
+            self.take_dropdown.config(state="disabled", text="Max inventory!")
+        else:
+            self.take_dropdown.config(state="normal", text="Take Items")
 
-            self.move_button.grid(row=4, ipadx=10, ipady=2, padx=4, pady=(0, 50), column=col_num, sticky="nsew",
-                                  columnspan=1)
-            col_num += 1
-            self.buttons.append(self.move_button)
+    def update_widgets(self):
+        """update widgets to current info"""
+        move_specs, action_specs = self.button_specs()
+        self.move_buttons.update(move_specs)
+        self.action_buttons.update(action_specs)
+        self.update_take_dropdown()
 
+        # if there is no npc or item keep the row from collapsing
         if not self.current_location.check_npc() and not self.current_location.check_item():
-            self.filler = tk.Label(self)
             self.filler.grid(row=5, column=0, pady=60)
-
-        if self.current_location.check_npc():
-            self.talk_button = ttk.Button(self, style="success.Outline.TButton", text=f"Talk",
-                                          command=lambda: self.parent.switch_frame(Dialogue))
-            if isinstance(self.current_location.npc, Shop):  # if npc is a shop
-                self.talk_button.config(text="Enter Store", command=lambda: self.parent.switch_frame(Store))
-
-            self.talk_button.grid(row=5, ipadx=10, ipady=2, padx=4, column=0, pady=50, sticky="nsew", columnspan=1)
-            self.buttons.append(self.talk_button)
-
-        if self.current_location.check_item() == 1:
-            self.take_button = ttk.Button(self, text=f"Take {self.current_location.item[0].name}",
-                                          style="success.Outline.TButton",
-                                          command=lambda: self.take_item(self.current_location.item[0]))
-            self.take_button.grid(row=5, ipadx=10, ipady=2, padx=4, column=1, pady=50, sticky="nsew", columnspan=1)
-            self.can_take()
-            self.buttons.append(self.take_button)
-        elif self.current_location.check_item() > 1:
-            self.take_dropdown = ttk.Menubutton(self, text="Take Items", style="success.Outline.TButton")
-            self.menu = tk.Menu(self.take_dropdown, tearoff=0)
-            for item in self.current_location.item:
-                self.menu.add_radiobutton(label=f"{item.name} - {item.desc}",
-                                          command=lambda take_item=item: self.take_item(take_item))
-            self.take_dropdown.grid(row=5, ipadx=10, ipady=2, padx=4, column=1, pady=50, sticky="nsew",
-                                    columnspan=1)
-            self.take_dropdown['menu'] = self.menu
-            self.buttons.append(self.take_dropdown)
-            self.buttons.append(self.menu)
-            self.can_take()
-        if self.current_location.check_enemy():
-            self.fight_button = ttk.Button(self, style="success.Outline.TButton", text=f"Fight",
-                                           command=lambda: self.parent.switch_frame(CombatScreen))
-            self.fight_button.grid(row=5, ipadx=10, ipady=2, padx=4, column=2, pady=50, sticky="nsew", columnspan=1)
-            self.buttons.append(self.fight_button)
+        else:
+            self.filler.grid_remove()
 
 
 class StatusBar(ttk.Frame):
-    """frame to represent the status bar"""
+    """frame to represent the status bar, built once and changed to suit each frame"""
 
     def __init__(self, parent):
         super().__init__(parent)
-        self.player = parent.player
         self.parent = parent
-        self.previous_frame = parent.previous_frame[-1]
+        self.inv = ttk.Button(self)
+        self.inv.pack(fill="both", expand=True)
+        self.columnconfigure(0, weight=1)
 
+    def refresh(self):
+        """show the button the current frame needs"""
         no_status_bar = ["NewGame", "GameOver", "MainMenu", "FloorCut"]
         frame_inv = ["Menu", "CombatScreen", "Store"]
-
-        if parent.frame_name not in no_status_bar:
-            if parent.frame_name == "Dialogue":
-                self.inv = ttk.Button(parent, text=f"Bye.", style="danger.Outline.TButton",
-                                      command=lambda: self.switch_frame(Menu))
-                parent.previous_frame.append(getattr(sys.modules[__name__], parent.frame_name))
-                self.inv.grid(row=6, column=0, sticky="nsew")
-
-            elif parent.frame_name in frame_inv:
-                self.inv = ttk.Button(parent, text=f"Open {self.player.name}'s Inventory",
-                                      command=lambda: self.switch_frame(Inventory))
-                parent.previous_frame.append(getattr(sys.modules[__name__], parent.frame_name))
-                self.inv.grid(row=6, column=0, sticky="nsew")
-
-            elif parent.frame_name not in frame_inv:
-                self.inv = ttk.Button(parent, text=f"Back to game", style="danger.Outline.TButton",
-                                      command=lambda: self.switch_frame(self.previous_frame))
-                self.inv.grid(row=6, column=0, sticky="nsew")
-
+        frame_name = self.parent.frame_name
+
+        if frame_name in no_status_bar:
+            self.grid_remove()
+            return
+        if frame_name == "Dialogue":
+            self.inv.config(text=f"Bye.", style="danger.Outline.TButton",
+                            command=lambda: self.parent.switch_frame(Menu))
+        elif frame_name in frame_inv:
+            self.inv.config(text=f"Open {self.parent.player.name}'s Inventory", style="TButton",
+                            command=lambda: self.parent.switch_frame(Inventory))
+        else:
+            self.inv.config(text=f"Back to game", style="danger.Outline.TButton",
+                            command=lambda: self.parent.back())
         self.grid(row=6, column=0, sticky="nsew")
 
-    def switch_frame(self, frame):
-        """switch the frame"""
-        self.parent.switch_frame(frame)
-        self.inv.destroy()
-
-
-# generate all items, enemies, spells, npcs, and locations and create an object for each
-# noinspection PyTypeChecker
-ITEMS = chain(Consumable.generate_from_file("items.txt"), Weapon.generate_from_file("items.txt"),
-              Key.generate_from_file("items.txt"), Armour.generate_from_file("items.txt"))
-ALL_ITEMS = [item for item in ITEMS]
-ENEMIES = Enemy.generate_from_file("enemy.txt")
-# noinspection PyTypeChecker
-SPELLS = chain(Buff.generate_from_file("spells.txt"), Heal.generate_from_file("spells.txt"))
-ALL_SPELLS = [spell for spell in SPELLS]
-ALL_ENEMIES = [enemy for enemy in ENEMIES]
-
-NPCS = chain(NPC.generate_from_file("npc.json"), Shop.generate_from_file("shop.json"))
-ALL_NPCS = [npc for npc in NPCS]
-
-location_generator = Location.generate_from_file("map.txt")
-LOCATIONS = [loc for loc in location_generator]
-for loc in LOCATIONS:
-    loc.link_dest()
-
 
 def main():
     """ Start game """
     open('infosave.txt', 'w').close()
+    WORLD.load_or_compile()
 
     app = App()
     app.mainloop()
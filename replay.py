@@ -0,0 +1,56 @@
+"""
+Replay a recorded game session without any widgets.
+The game writes every action of a playthrough to session.jsonl after the seed and the player it started with.
+Replaying it runs the same actions against a fresh copy of the world, so a bug report or a slow run can be
+reproduced as many times as needed. Every replay must end in the same state. Run from the repository root:
+    python replay.py session.jsonl --runs 1000
+"""
+
+import io
+import time
+import argparse
+import contextlib
+
+import game
+
+
+def final_state(session):
+    """the parts of the game a replay has to reproduce"""
+    player = session.player
+    return {"location": player.location, "floor": player.floor, "level": player.level, "xp": player.xp,
+            "health": player.health, "coins": player.coins, "inv": [item.id for item in player.inv],
+            "actions": len(session.actions)}
+
+
+def replay_runs(file_name, runs):
+    """replay the recording the number of times, returns the final state and the seconds taken"""
+    header, actions = game.load_recording(file_name)
+    expected = None
+    start = time.perf_counter()
+    # the player methods print as they go, which would only slow the replays down
+    with contextlib.redirect_stdout(io.StringIO()):
+        for run in range(runs):
+            state = final_state(game.replay(header, actions))
+            if expected is None:
+                expected = state
+            elif state != expected:
+                raise RuntimeError(f"replay {run} ended in {state}, the first replay ended in {expected}")
+    return expected, time.perf_counter() - start
+
+
+def main():
+    """ replay a recording from the command line """
+    parser = argparse.ArgumentParser(description="Replay a recorded game session without the interface")
+    parser.add_argument("recording", nargs="?", default=game.RECORDING_FILE, help="the session.jsonl to replay")
+    parser.add_argument("--runs", type=int, default=1, help="how many times to replay it")
+    args = parser.parse_args()
+
+    state, seconds = replay_runs(args.recording, args.runs)
+    print(f"{args.runs} replay(s) of {state['actions']} actions in {seconds:.2f}s "
+          f"({args.runs / seconds * 60:.0f} per minute)")
+    for name, value in state.items():
+        print(f"{name}: {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Balance sweep over every player class, level, weapon, armour and enemy.
+Each combination is fought with simulate_battles across a process pool. Every finished chunk is written to
+its own .npz part file of result columns, so an interrupted sweep keeps its finished chunks and skips them
+when it is run again. Run from the repository root:
+    python sweep.py --levels 1-10 --fights 10000 --out sweep_results
+"""
+
+import io
+import os
+import json
+import argparse
+import contextlib
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import game
+
+COLUMNS = ["player_class", "level", "weapon", "armour", "enemy", "win_rate", "mean_turns", "p90_turns",
+           "mean_hp_left"]
+
+
+def build_grid(registry, classes, levels):
+    """list every (class, level, weapon id, armour id, enemy id) combination, id 0 means nothing equipped"""
+    weapons = [0] + [item.id for item in registry.items if isinstance(item, game.Weapon)]
+    armours = [0] + [item.id for item in registry.items if isinstance(item, game.Armour)]
+    enemies = [enemy.id for enemy in registry.enemies]
+    return list(product(classes, levels, weapons, armours, enemies))
+
+
+def build_player(player_class, level, weapon_id, armour_id):
+    """create a player of the class at the level with the gear equipped"""
+    items = game.WORLD.index("items")
+    # equip_item prints for the game's console, which isn't wanted for thousands of players
+    with contextlib.redirect_stdout(io.StringIO()):
+        player = game.new_player("Sweep", player_class)
+        for _ in range(level - 1):
+            player.level_up()
+        player.health = player.max_hp
+        if weapon_id:
+            player.equip_item(items[weapon_id])
+        if armour_id:
+            player.equip_item(items[armour_id])
+    return player
+
+
+def run_chunk(chunk_index, start, configs, fights, policy, seed, out_dir):
+    """simulate every combination in the chunk and write its results to a part file
+
+    start is the index in the grid of the chunk's first combination. Each combination is seeded from its
+    own grid index, so no two combinations share a random stream however the grid is chunked.
+    """
+    enemies = game.WORLD.index("enemies")
+    rows = {column: [] for column in COLUMNS}
+    for offset, (player_class, level, weapon_id, armour_id, enemy_id) in enumerate(configs):
+        player = build_player(player_class, level, weapon_id, armour_id)
+        results = game.simulate_battles(player, enemies[enemy_id], fights, policy=policy,
+                                          seed=seed + start + offset, registry=game.WORLD)
+        turns = results.turns_to_kill
+        rows["player_class"].append(player_class)
+        rows["level"].append(level)
+        rows["weapon"].append(weapon_id)
+        rows["armour"].append(armour_id)
+        rows["enemy"].append(enemy_id)
+        rows["win_rate"].append(results.win_rate)
+        rows["mean_turns"].append(turns.mean() if turns.size else np.nan)
+        rows["p90_turns"].append(np.percentile(turns, 90) if turns.size else np.nan)
+        rows["mean_hp_left"].append(results.hp_remaining.mean() if turns.size else np.nan)
+
+    part_file = os.path.join(out_dir, f"part-{chunk_index:05d}.npz")
+    # write to a temporary file first so a part file is either complete or missing
+    temp_file = os.path.join(out_dir, f"part-{chunk_index:05d}.tmp.npz")
+    np.savez(temp_file, **{column: np.array(values) for column, values in rows.items()})
+    os.replace(temp_file, part_file)
+    return part_file
+
+
+def load_results(out_dir):
+    """read every part file of a sweep back into one dictionary of columns"""
+    parts = sorted(name for name in os.listdir(out_dir) if name.startswith("part-") and ".tmp" not in name)
+    columns = {column: [] for column in COLUMNS}
+    for name in parts:
+        with np.load(os.path.join(out_dir, name)) as part:
+            for column in COLUMNS:
+                columns[column].append(part[column])
+    return {column: np.concatenate(values) if values else np.array([]) for column, values in columns.items()}
+
+
+def sweep(out_dir, classes, levels, fights=10000, policy="spells", seed=0, chunk_size=20, max_workers=None):
+    """run the whole grid, skipping the chunks that already have a part file"""
+    os.makedirs(out_dir, exist_ok=True)
+    # the part files are only valid for the same grid and settings, so a resumed sweep has to match them
+    manifest = {"classes": classes, "levels": levels, "fights": fights, "policy": policy, "seed": seed,
+                "chunk_size": chunk_size}
+    manifest_file = os.path.join(out_dir, "manifest.json")
+    if os.path.exists(manifest_file):
+        with open(manifest_file, "r") as file:
+            if json.load(file) != manifest:
+                raise ValueError(f"{out_dir} holds a sweep with different settings, use another --out")
+    else:
+        with open(manifest_file, "w") as file:
+            json.dump(manifest, file)
+
+    grid = build_grid(game.WORLD, classes, levels)
+    chunks = [grid[start:start + chunk_size] for start in range(0, len(grid), chunk_size)]
+    todo = [index for index in range(len(chunks))
+            if not os.path.exists(os.path.join(out_dir, f"part-{index:05d}.npz"))]
+    print(f"{len(grid)} combinations in {len(chunks)} chunks, {len(chunks) - len(todo)} already done")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(run_chunk, index, index * chunk_size, chunks[index], fights, policy, seed, out_dir)
+                   for index in todo]
+        for done, future in enumerate(as_completed(futures), 1):
+            print(f"[{done}/{len(todo)}] wrote {future.result()}")
+
+
+def parse_levels(text):
+    """turn '1-10' or '1,5,10' into a list of levels"""
+    if "-" in text:
+        start, end = text.split("-")
+        return list(range(int(start), int(end) + 1))
+    return [int(level) for level in text.split(",")]
+
+
+def main():
+    """ run the sweep from the command line """
+    parser = argparse.ArgumentParser(description="Balance sweep over classes, levels, gear and enemies")
+    parser.add_argument("--out", default="sweep_results", help="directory for the part files")
+    parser.add_argument("--classes", default=",".join(game.PLAYER_CLASSES), help="comma separated classes")
+    parser.add_argument("--levels", default="1-10", help="a range like 1-10 or a list like 1,5,10")
+    parser.add_argument("--fights", type=int, default=10000, help="fights per combination")
+    parser.add_argument("--policy", default="spells", choices=["attack", "spells"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=20, help="combinations per part file")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to every core")
+    args = parser.parse_args()
+
+    sweep(args.out, args.classes.split(","), parse_levels(args.levels), args.fights, args.policy, args.seed,
+          args.chunk_size, args.workers)
+
+
+if __name__ == '__main__':
+    main()
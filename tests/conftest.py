@@ -0,0 +1,42 @@
+"""
+A small hand-written world for the tests, so they never read the game's own content files.
+"""
+
+import pytest
+
+import game
+
+# room A has a potion and the cellar key, B a rat and an ogre, C is the locked cellar and D a rat and a brute
+CONTENT = {
+    "items.txt": "weapon,1,Wooden Sword,A plain looking sword.,2,5\n"
+                 "armour,2,Leather Armour,Soft but better than nothing.,3,2\n"
+                 "consumable,3,Small Potion,Heals 5HP.,1,0,0,5\n"
+                 "key,4,Cellar Key,Opens the cellar.,0\n",
+    "spells.txt": "buff,1,Attack Buff,+3 Attack for 2 turns,0,3,0,2,3\n"
+                  "heal,8,Heal,Heals 5HP,0,5,3\n",
+    "enemy.txt": "1,Rat,1,(1-1),(4-4),(1-1),(0-0),(2-2),1,1,1,0\n"
+                 "2,Ogre,2,(3-3),(30-30),(1-1),(0-0),(5-5),2,100,1,0\n"
+                 "3,Brute,5,(9-9),(50-50),(100-100),(0-0),(9-9),2,100,1,0\n",
+    "map.txt": 'A,Camp,Where it starts.,[B-C-D],"",[],[3-4],False\n'
+               'B,Den,Something moves in the dark.,[A],"",[1-2],False,False\n'
+               'C,Cellar,Dusty shelves.,[A],"",[],[2],4\n'
+               'D,Pit,Bones everywhere.,[A],"",[1-3],False,False\n',
+    "npc.json": "{}",
+    "shop.json": "{}",
+}
+
+# the WorldRegistry argument for each content file
+CONTENT_ARGS = {"items_file": "items.txt", "spells_file": "spells.txt", "enemies_file": "enemy.txt",
+                "npcs_file": "npc.json", "shops_file": "shop.json", "map_file": "map.txt",
+                "enemy_ai_file": "enemy_ai.json"}
+
+
+@pytest.fixture
+def make_world(tmp_path):
+    """write the content files, returns a function that loads a fresh copy of the world from them"""
+    for file_name, content in CONTENT.items():
+        (tmp_path / file_name).write_text(content)
+
+    def make():
+        return game.WorldRegistry(**{arg: str(tmp_path / file_name) for arg, file_name in CONTENT_ARGS.items()})
+    return make
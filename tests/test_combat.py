@@ -0,0 +1,94 @@
+"""
+Check CombatEngine fights against groups of enemies and that the session takes every defeated enemy off
+the map however the fight ends. Run from the repository root:
+    python -m pytest tests
+"""
+
+import pytest
+
+import game
+
+
+def make_player(health=30, attack=10, defence=5):
+    return game.Player("Tester", 1, 0, health, attack, defence, "A", 0, [], None, None, [], 1, health)
+
+
+def make_enemy(enemy_id=1, health=4, attack=1, speed=game.BASE_SPEED, boss=False):
+    enemy = game.Enemy(enemy_id, f"Enemy {enemy_id}", 1, 1, health, attack, 0, 2, None, health, [], boss)
+    enemy.speed = speed
+    return enemy
+
+
+def test_target_and_defeat_each_enemy():
+    enemies = [make_enemy(1), make_enemy(2), make_enemy(3)]
+    engine = game.CombatEngine(make_player(), enemies)
+
+    engine.step("target", target=2)
+    assert engine.state.enemy is enemies[2]
+    engine.step("attack")
+    assert engine.state.defeated == [enemies[2]]
+    # the target moves on to the next enemy still standing
+    assert engine.state.enemy is enemies[0]
+    assert engine.alive == 2
+
+    with pytest.raises(ValueError):
+        engine.step("attack", target=2)  # already dead
+    assert engine.state.defeated == [enemies[2]]
+
+    engine.step("attack", target=1)
+    engine.step("attack")
+    assert engine.state.defeated == [enemies[2], enemies[1], enemies[0]]
+    assert engine.state.outcome == "won"
+    with pytest.raises(ValueError):
+        engine.step("attack")
+
+
+def test_every_enemy_attacks_each_turn():
+    player = make_player(defence=0)
+    engine = game.CombatEngine(player, [make_enemy(1, health=50, attack=2), make_enemy(2, health=50, attack=3)])
+    events = engine.step("block")
+    assert [event.kind for event in events] == ["block", "enemy_attack", "enemy_attack"]
+    assert player.health == 30 - 2 - 3
+    engine.step("attack")
+    assert player.health == 30 - 2 * (2 + 3)
+    assert engine.state.turn == 2
+
+
+def test_faster_enemy_acts_more_often():
+    player = make_player(defence=0)
+    slow, fast = make_enemy(1, health=50), make_enemy(2, health=50, speed=game.BASE_SPEED * 2)
+    engine = game.CombatEngine(player, [slow, fast])
+    for _ in range(3):
+        engine.step("block")
+    attacks = [event.actor for event in engine.step("block") if event.kind == "enemy_attack"]
+    assert attacks.count(fast) == 2 * attacks.count(slow)
+
+
+def test_cannot_flee_from_a_boss():
+    engine = game.CombatEngine(make_player(), [make_enemy(1), make_enemy(2, boss=True)])
+    with pytest.raises(ValueError):
+        engine.step("flee")
+    assert engine.state.outcome is None
+
+
+def test_fled_fight_removes_defeated_enemies(make_world):
+    session = game.GameSession("Tester", "Warrior", seed=1, registry=make_world())
+    session.move("B")
+    engine = session.fight()
+    session.combat("attack")  # the rat goes down in one hit, the ogre is left
+    session.combat("flee")
+    assert engine.state.outcome == "fled"
+    assert list(session.location.enemy_index) == [2]
+    assert session.registry.tables.enemy_count[session.location.index] == 1
+
+
+def test_lost_fight_removes_defeated_enemies_and_respawns(make_world):
+    session = game.GameSession("Tester", "Warrior", seed=1, registry=make_world())
+    session.move("D")
+    engine = session.fight()
+    session.combat("attack")  # the rat goes down, then the brute hits for far more than the player has
+    assert engine.state.outcome == "lost"
+    assert list(session.location.enemy_index) == [3]
+    assert session.player.health == session.player.max_hp
+    with pytest.raises(ValueError):
+        session.combat("attack")
@@ -0,0 +1,76 @@
+"""
+Check the ItemBag the player's inventory is kept in. Run from the repository root:
+    python -m pytest tests
+"""
+
+import pytest
+
+import game
+
+SWORD = game.Weapon(1, "Wooden Sword", "", 2, 5)
+ARMOUR = game.Armour(2, "Leather Armour", "", 3, 2)
+POTION = game.Consumable(3, "Small Potion", "", 1, 0, 0, 5)
+# a different consumable with the same name shares the potion's slot
+OTHER_POTION = game.Consumable(5, "Small Potion", "", 1, 0, 0, 5)
+KEY = game.Key(4, "Cellar Key", "", 0)
+
+
+def test_counts_and_slots():
+    bag = game.ItemBag([SWORD, SWORD, POTION, POTION, OTHER_POTION, KEY])
+    assert len(bag) == 6
+    assert bag.count(SWORD) == 2
+    assert bag.count(ARMOUR) == 0
+    assert bag.stack("Small Potion") == 3
+    # every weapon takes a slot, the potions share one
+    assert bag.slots == 4
+    assert sorted(item.id for item in bag) == [1, 1, 3, 3, 4, 5]
+    assert KEY in bag and ARMOUR not in bag
+    assert bag.get(3) is POTION and bag.get(2) is None
+    assert bag.of_type("consumable") == [POTION, OTHER_POTION]
+    assert sorted((item.id, count) for item, count in bag.counts()) == [(1, 2), (3, 2), (4, 1), (5, 1)]
+
+
+def test_add_and_remove():
+    bag = game.ItemBag()
+    bag.append(POTION)
+    bag.append(OTHER_POTION)
+    bag.append(SWORD)
+    assert (len(bag), bag.slots) == (3, 2)
+
+    bag.remove(POTION)
+    assert POTION not in bag
+    assert bag.of_type("consumable") == [OTHER_POTION]
+    assert (len(bag), bag.slots) == (2, 2)
+    bag.remove(OTHER_POTION)
+    assert bag.stack("Small Potion") == 0
+    assert (len(bag), bag.slots) == (1, 1)
+
+    bag.append(SWORD)
+    bag.remove(SWORD, 2)
+    assert (len(bag), bag.slots) == (0, 0)
+    assert list(bag) == [] and bag.of_type("weapon") == []
+
+
+def test_removing_more_than_carried_changes_nothing():
+    bag = game.ItemBag([SWORD, POTION])
+    with pytest.raises(ValueError):
+        bag.remove(SWORD, 2)
+    with pytest.raises(ValueError):
+        bag.remove(ARMOUR)
+    assert (len(bag), bag.slots, bag.count(SWORD)) == (2, 2, 1)
+
+
+def test_clear():
+    bag = game.ItemBag([SWORD, POTION, POTION])
+    bag.clear()
+    assert (len(bag), bag.slots, bag.stack("Small Potion")) == (0, 0, 0)
+    assert list(bag) == []
+
+
+def test_player_inventory_capacity():
+    player = game.Player("Tester", 1, 0, 30, 10, 5, "A", 0, [POTION] * 20, None, None, [], 1, 30)
+    # twenty potions are one slot
+    assert not player.check_max_inv()
+    player.inv = [game.Weapon(item_id, "Sword", "", 1, 1) for item_id in range(10, 20)]
+    assert isinstance(player.inv, game.ItemBag)
+    assert player.check_max_inv()
@@ -0,0 +1,78 @@
+"""
+Check the EffectScheduler runs timed actions on the right turn and in order, and the cooldowns and timed
+effects built on it. Run from the repository root:
+    python -m pytest tests
+"""
+
+import game
+
+
+def make_spell(cooldown=0, max_cd=3):
+    return game.Heal(8, "Heal", "", cooldown, 5, max_cd)
+
+
+def test_actions_run_on_their_turn_in_order():
+    timers = game.EffectScheduler()
+    ran = []
+    timers.schedule(2, lambda: ran.append("second"))
+    timers.schedule(1, lambda: ran.append("first"))
+    timers.schedule(2, lambda: ran.append("third"))
+    timers.schedule(3, lambda: ran.append("last"))
+
+    timers.advance()
+    assert ran == ["first"]
+    timers.advance()
+    # actions due on the same turn keep the order they were scheduled in
+    assert ran == ["first", "second", "third"]
+    timers.advance()
+    timers.advance()
+    assert ran == ["first", "second", "third", "last"]
+    assert timers.turn == 4
+
+
+def test_action_scheduled_while_running_waits_for_its_turn():
+    timers = game.EffectScheduler()
+    ran = []
+    timers.schedule(1, lambda: timers.schedule(1, lambda: ran.append(timers.turn)))
+    timers.advance()
+    assert ran == []
+    timers.advance()
+    assert ran == [2]
+
+
+def test_cooldowns():
+    timers = game.EffectScheduler()
+    spell = make_spell(cooldown=2)
+    # the starting cooldown counts from turn 0
+    assert timers.cooldown(spell) == 2
+    timers.advance()
+    timers.advance()
+    assert timers.cooldown(spell) == 0
+
+    timers.start_cooldown(spell)
+    assert timers.cooldown(spell) == 3
+    timers.advance()
+    assert timers.cooldown(spell) == 2
+
+
+def test_character_cooldown_without_scheduler():
+    enemy = game.Enemy(1, "Rat", 1, 1, 10, 1, 0, 0, None, 10, [], False)
+    spell = make_spell(cooldown=2)
+    enemy.advance_turn()
+    assert enemy.cooldown(spell) == 1
+    # the scheduler made on first use picks up the turns already gone by
+    enemy.timers.start_cooldown(spell)
+    assert enemy.timers.turn == 1
+    assert enemy.cooldown(spell) == 3
+
+
+def test_timed_effects_tick_then_run_out():
+    enemy = game.Enemy(1, "Rat", 1, 1, 10, 1, 0, 0, None, 10, [], False)
+    enemy.add_effect("Poison", -2, 3)
+    enemy.add_effect("Regen", 1, 1)
+    health = []
+    for _ in range(4):
+        enemy.advance_turn()
+        health.append(enemy.health)
+    assert health == [9, 7, 5, 5]
+    assert not enemy.effects
@@ -0,0 +1,62 @@
+"""
+Check a recorded GameSession replays to the same game. Run from the repository root:
+    python -m pytest tests
+"""
+
+import pytest
+
+import game
+
+
+def state(session):
+    player = session.player
+    return (player.location, player.level, player.xp, player.health, player.coins,
+            sorted(item.id for item in player.inv), player.weapon and player.weapon.id,
+            [list(loc.enemy_index) + list(loc.item_index) for loc in session.registry.locations])
+
+
+def play(session):
+    """a short run through every room of the test world"""
+    with pytest.raises(ValueError):
+        session.move("C")  # locked until the key is taken
+    session.take(3)
+    session.take(4)
+    session.move("B")
+    session.fight()
+    session.combat("attack")
+    session.combat("flee")
+    session.move("A")
+    session.move("C")
+    session.take(2)
+    session.equip(1)
+    session.use_item(3)
+
+
+def test_recording_replays_to_the_same_game(make_world, tmp_path):
+    recording = str(tmp_path / "session.jsonl")
+    session = game.GameSession("Tester", "Warrior", seed=7, registry=make_world(), recording_file=recording)
+    play(session)
+
+    header, actions = game.load_recording(recording)
+    assert header == {"version": game.RECORDING_VERSION, "seed": 7, "name": "Tester", "player_class": "Warrior"}
+    # the move that raised was left out
+    assert actions == session.actions
+    assert actions[0] == ["take", 3]
+
+    replayed = game.replay(header, actions, make_world())
+    assert state(replayed) == state(session)
+    assert replayed.actions == session.actions
+
+
+def test_same_seed_plays_the_same(make_world):
+    first = game.GameSession("Tester", "Warrior", seed=3, registry=make_world())
+    second = game.GameSession("Tester", "Warrior", seed=3, registry=make_world())
+    play(first)
+    play(second)
+    assert state(first) == state(second)
+
+
+def test_replay_rejects_unknown_actions(make_world):
+    header = {"version": game.RECORDING_VERSION, "seed": 1, "name": "Tester", "player_class": "Warrior"}
+    with pytest.raises(ValueError):
+        game.replay(header, [["inv_item", 3]], make_world())
@@ -0,0 +1,71 @@
+"""
+Check the world snapshot loads the same world as the content files and is rebuilt when one of them changes.
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import os
+import struct
+
+import game
+
+
+def describe(world):
+    """the parts of a world a snapshot has to keep"""
+    return ([(item.id, type(item).__name__, item.name) for item in world.items],
+            [(enemy.id, enemy.health, [spell.id for spell in enemy.spells]) for enemy in world.enemies],
+            [(loc.id, [dest.id for dest in loc.dest], list(loc.enemy_index), list(loc.item_index), loc.key_id)
+             for loc in world.locations])
+
+
+def test_snapshot_matches_content_files(make_world, tmp_path):
+    snapshot = str(tmp_path / "world.snapshot")
+    world = make_world()
+    world.compile_snapshot(snapshot)
+
+    loaded = make_world()
+    assert loaded.load_snapshot(snapshot)
+    assert describe(loaded) == describe(world)
+    # the locations point back to the registry they were loaded into, not a copy
+    assert all(loc.dest[0].dest for loc in loaded.locations)
+    assert loaded.locations[1].enemy[0] is loaded.index("enemies")[1]
+
+
+def test_changed_content_file_invalidates_snapshot(make_world, tmp_path):
+    snapshot = str(tmp_path / "world.snapshot")
+    make_world().compile_snapshot(snapshot)
+
+    items_file = tmp_path / "items.txt"
+    items_file.write_text(items_file.read_text().replace("Wooden Sword", "Oak Sword"))
+    world = make_world()
+    assert not world.load_snapshot(snapshot)
+    world.load_or_compile(snapshot)
+    assert world.index("items")[1].name == "Oak Sword"
+    assert make_world().load_snapshot(snapshot)
+
+
+def test_touched_content_file_keeps_snapshot(make_world, tmp_path):
+    snapshot = str(tmp_path / "world.snapshot")
+    make_world().compile_snapshot(snapshot)
+
+    # only the modification time changed, the hash still matches
+    map_file = str(tmp_path / "map.txt")
+    stat = os.stat(map_file)
+    os.utime(map_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert make_world().load_snapshot(snapshot)
+
+
+def test_damaged_or_old_snapshot_is_recompiled(make_world, tmp_path):
+    snapshot = tmp_path / "world.snapshot"
+    make_world().compile_snapshot(str(snapshot))
+    data = snapshot.read_bytes()
+
+    snapshot.write_bytes(data[:len(data) // 2])
+    assert not make_world().load_snapshot(str(snapshot))
+
+    old_version = struct.pack(">H", game.SNAPSHOT_VERSION - 1)
+    snapshot.write_bytes(game.SNAPSHOT_MAGIC + old_version + data[len(game.SNAPSHOT_MAGIC) + 2:])
+    assert not make_world().load_snapshot(str(snapshot))
+
+    make_world().load_or_compile(str(snapshot))
+    assert make_world().load_snapshot(str(snapshot))
@@ -0,0 +1,95 @@
+"""
+Check BattleSolver against a brute force search of every play on small fights, and that a full sized
+fight is solved quickly.
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import math
+import time
+
+import game
+
+# how deep the brute force search goes, every play of this many turns is tried
+BRUTE_FORCE_TURNS = 6
+# seconds test_solver_time_budget may take, solving every state of every roll took over a minute
+SOLVER_TIME_BUDGET = 10
+
+
+def make_player(health=8, attack=2, defence=1):
+    spells = [game.Buff(1, "Attack Buff", "", 0, 3, 0, 2, 3), game.Heal(8, "Heal", "", 0, 4, 3)]
+    return game.Player("Tester", 1, 0, health, attack, defence, "A", 0, [], None, None, spells, 1, health)
+
+
+def make_template(health=(5, 9), attack=(2, 5), defence=(0, 1)):
+    spells = [game.Buff(4, "Power Buff", "", 1, 2, 2, 2, 3)]
+    return game.EnemyTemplate(99, "Dummy", 1, 5, health, attack, defence, 1, [], 1, spells, False)
+
+
+def brute_force(solver, state, turns_left):
+    """the fewest turns to a win from the state by trying every play of up to turns_left turns, or None"""
+    best = None
+    for _, result, turns in solver.transitions(state):
+        if result == "won":
+            later = 0
+        elif result == "lost" or turns > turns_left:
+            continue
+        else:
+            later = brute_force(solver, result, turns_left - turns)
+            if later is None:
+                continue
+        if best is None or turns + later < best:
+            best = turns + later
+    return best
+
+
+def play(solver, state, policy):
+    """follow the policy from the state, returns the turns it takes to win"""
+    turns = 0
+    while True:
+        action, result, step = next(move for move in solver.transitions(state) if move[0] == policy[state])
+        turns += step
+        if result == "won":
+            return turns
+        assert result != "lost"
+        state = result
+
+
+def test_solver_matches_brute_force():
+    solver = game.BattleSolver(make_player(), make_template())
+    probability, outcomes = solver.win_probability()
+    for roll, (won, turns) in outcomes.items():
+        policy = solver.policy(*roll)
+        root = solver.start_state(roll[0])
+        expected = brute_force(solver, root, BRUTE_FORCE_TURNS)
+        if won and turns <= BRUTE_FORCE_TURNS:
+            assert turns == expected, roll
+            assert play(solver, root, policy) == turns, roll
+        else:
+            assert expected is None, roll
+    assert probability == sum(won for won, _ in outcomes.values()) / len(outcomes)
+    assert 0 < probability < 1
+
+
+def test_fight_that_cannot_end():
+    # neither side can hurt the other, so blocking forever is the longest loss
+    solver = game.BattleSolver(make_player(attack=1, defence=5), make_template(attack=(1, 1), defence=(5, 5)))
+    won, turns = solver.solve_fight(6, 1, 5)
+    assert not won
+    assert turns == math.inf
+
+
+def test_solver_time_budget():
+    # a level one mage against a buffing and healing enemy, 66 rolls of a few ten thousand states each
+    spells = [game.Buff(1, "Attack Buff", "", 3, 5, 0, 2, 3), game.Buff(2, "Defence Buff", "", 3, 0, 5, 2, 3),
+              game.Heal(8, "Heal", "", 3, 10, 3)]
+    player = game.Player("Tester", 1, 0, 20, 6, 5, "A", 0, [], None, None, spells, 1, 20)
+    template = game.EnemyTemplate(99, "Dummy", 1, 5, (20, 30), (6, 8), (1, 2), 1, [], 1,
+                                  [game.Buff(4, "Power Buff", "", 4, 3, 3, 2, 3), game.Heal(9, "Heal", "", 3, 10, 3)],
+                                  False)
+    solver = game.BattleSolver(player, template)
+    start = time.perf_counter()
+    probability, outcomes = solver.win_probability()
+    assert time.perf_counter() - start < SOLVER_TIME_BUDGET
+    assert len(outcomes) == 66
+    assert probability == 1
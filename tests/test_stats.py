@@ -0,0 +1,100 @@
+"""
+Check character stats are built from the base stats and the StatModifier layers. Run from the repository root:
+    python -m pytest tests
+"""
+
+import pytest
+
+import game
+
+
+def make_character(attack=10, defence=5, max_hp=30):
+    return game.Character("Tester", 1, 0, max_hp, attack, defence, 0, [], max_hp, [])
+
+
+def make_player():
+    return game.Player("Tester", 1, 0, 30, 10, 5, "A", 0, [], None, None, [], 1, 30)
+
+
+def stats(character):
+    return character.attack, character.defence, character.max_hp
+
+
+def test_layers_stack_and_come_off():
+    character = make_character()
+    character.set_modifier("equipment", "weapon", attack=5)
+    character.set_modifier("level", "level", attack=2, defence=1, max_hp=20)
+    character.add_modifier("level", "level", attack=2, defence=1)
+    assert stats(character) == (19, 7, 50)
+    assert character.modifier("level", "level") == game.StatModifier(4, 2, 20)
+
+    # setting a source again replaces what it added
+    character.set_modifier("equipment", "weapon", attack=8)
+    assert character.attack == 22
+    assert character.remove_modifier("equipment", "weapon") == game.StatModifier(attack=8)
+    assert stats(character) == (14, 7, 50)
+    character.remove_modifier("level", "level")
+    assert stats(character) == (10, 5, 30)
+    assert character.remove_modifier("level", "level") == game.NO_MODIFIER
+
+
+def test_setting_a_stat_keeps_the_modifiers():
+    character = make_character()
+    character.set_modifier("buff", "spell", attack=3)
+    character.attack = 20
+    assert character.attack == 20
+    character.remove_modifier("buff", "spell")
+    assert character.attack == 17
+
+
+def test_unknown_layer():
+    with pytest.raises(KeyError):
+        make_character().set_modifier("curse", "witch", attack=-1)
+
+
+def test_buff_runs_out():
+    character = make_character()
+    buff = game.Buff(1, "Attack Buff", "", 0, 3, 2, 2, 3)
+    assert character.use_spell(buff)
+    assert (character.attack, character.defence, character.attk_buff) == (13, 7, 3)
+    assert character.buff_duration == 2
+    # only one buff at a time
+    assert not character.use_spell(game.Buff(2, "Defence Buff", "", 0, 0, 5, 2, 3))
+
+    character.advance_turn()
+    assert character.attack == 13
+    character.advance_turn()
+    assert (character.attack, character.defence, character.buff_duration) == (10, 5, 0)
+
+
+def test_equipment_level_and_consumables():
+    player = make_player()
+    sword = game.Weapon(1, "Wooden Sword", "", 2, 5)
+    armour = game.Armour(2, "Leather Armour", "", 3, 2)
+    potion = game.Consumable(3, "Strength Potion", "", 1, 4, 0, 0)
+    player.inv = [sword, armour, potion]
+
+    player.equip_item(sword)
+    player.equip_item(armour)
+    player.use_item(potion)
+    player.get_xp(1)  # one xp takes a level one player to level two
+    assert player.level == 2
+    assert (player.attack, player.defence) == (10 + 5 + 4 + 2, 5 + 2 + 1)
+
+    player.unequip_item(sword)
+    player.unequip_item(armour)
+    assert (player.attack, player.defence) == (10 + 4 + 2, 5 + 1)
+
+
+def test_take_damage():
+    # take_damage lives on Character, so it has to work without the Player or Enemy properties
+    character = make_character(defence=3)
+    assert character.take_damage(10) == 7
+    character.set_modifier("equipment", "armour", defence=2)
+    character.action_block()
+    assert character.take_damage(10) == 0
+    assert character.is_alive()
+
+    enemy = game.Enemy(1, "Rat", 1, 1, 10, 1, 1, 0, None, 10, [], False)
+    assert enemy.take_damage(4) == 3
+    assert enemy.health == 7